@@ -0,0 +1,72 @@
+"""
+`map_index_to_coordinates` on a map-sized result against the former mapping, which rebuilt a pandas index with
+`location_gdf.set_index('index')` and looked the codes up with `.loc` on every call.
+
+A synthetic location index of the size of the WTK-LED grid is written to a temporary directory and a frame of
+--rows shuffled grid index codes is mapped, with the codes as Arrow-backed strings (the pandas default) and as
+Python object strings. The one-time build of the dense lookup array is timed separately, and the coordinates of
+both mappings are checked to be identical.
+
+Usage: python benchmarks/bench_index_mapping.py [--rows 2500000] [--locations 2510000]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from common import best_time, offline_client, report, synthetic_location_index
+from windwatts_data.windwatts_wtk_client import WindwattsWTKClient
+
+
+def legacy_mapping(location_gdf: pd.DataFrame, df: pd.DataFrame) -> pd.DataFrame:
+    """map_index_to_coordinates before the dense lookup."""
+    spatial_data = location_gdf.set_index('index').loc[df['index']]
+    df['latitude'] = spatial_data['latitude'].values
+    df['longitude'] = spatial_data['longitude'].values
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=2_500_000)
+    parser.add_argument('--locations', type=int, default=2_510_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='windwatts_mapping_bench_')
+    try:
+        prefix = os.path.join(directory, 'wtk_location')
+        synthetic_location_index(prefix, args.locations)
+        client = offline_client(WindwattsWTKClient, ['windspeed_100m', 'year', 'mohr', 'varset', 'index'],
+                                location_index_prefix=prefix)
+        rng = np.random.default_rng(0)
+        codes = client.location_index.index_codes(rng.permutation(args.locations)[:args.rows])
+        frames = {
+            'str (Arrow)': pd.DataFrame({'windspeed_100m': rng.weibull(2.0, args.rows) * 8, 'index': codes}),
+            'object': pd.DataFrame({'windspeed_100m': rng.weibull(2.0, args.rows) * 8,
+                                    'index': pd.Series(codes.tolist(), dtype=object)}),
+        }
+        print(f"Frame: {args.rows:,} rows, location index: {args.locations:,} locations")
+
+        start = time.perf_counter()
+        client.location_index.row_lookup
+        lookup_build = time.perf_counter() - start
+        location_gdf = client.location_gdf
+
+        rows = []
+        for dtype, frame in frames.items():
+            legacy = best_time(lambda: legacy_mapping(location_gdf, frame.copy()), repeat=1)
+            dense = best_time(lambda: client.map_index_to_coordinates(frame.copy()), repeat=args.repeat)
+            identical = legacy_mapping(location_gdf, frame.copy())[['latitude', 'longitude']].equals(
+                client.map_index_to_coordinates(frame.copy())[['latitude', 'longitude']])
+            rows.append((dtype, f"{legacy:.2f}", f"{dense:.3f}", f"{legacy / dense:.0f}x", identical))
+        report(rows, ('index dtype', 'set_index + .loc (s)', 'dense lookup (s)', 'speedup', 'identical'))
+        print(f"One-time build of the dense lookup: {lookup_build:.3f} s")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Vectorized windspeed interpolation against the former row-wise path.
+
+Builds a synthetic 1224-shaped frame of 8760 rows per year over 20 years (175,200 rows) and times
+`WindwattsWTKClient.interpolate_windspeed` against `DataFrame.apply(..., axis=1)` calling
+`windspeed_interpolated_d1` once per row, as interpolate_windspeed did before.
+
+Usage: python benchmarks/bench_interpolation.py [--years 20] [--rows-per-year 8760]
+"""
+import argparse
+import numpy as np
+import pandas as pd
+from common import best_time, offline_client, report
+from windwatts_data.windwatts_wtk_client import WindwattsWTKClient
+
+MODEL_HEIGHTS = [40, 60, 80, 100, 120, 140]
+
+
+def synthetic_frame(years: int, rows_per_year: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    n_rows = years * rows_per_year
+    reference = rng.weibull(2.0, n_rows) * 8.0
+    frame = {f"windspeed_{height}m": (reference * (height / 100) ** 0.14).round(3) for height in MODEL_HEIGHTS}
+    frame['year'] = np.repeat(np.arange(2001, 2001 + years), rows_per_year)
+    frame['mohr'] = np.tile(np.arange(rows_per_year) % 288, years)
+    return pd.DataFrame(frame)
+
+
+def row_wise(client: WindwattsWTKClient, df: pd.DataFrame, height: int) -> pd.Series:
+    lower = max(h for h in MODEL_HEIGHTS if h <= height)
+    upper = min(h for h in MODEL_HEIGHTS if h >= height)
+    model_df = df[[f"windspeed_{lower}m", f"windspeed_{upper}m"]]
+    return model_df.apply(lambda windspeeds: client.windspeed_interpolated_d1(windspeeds, [lower, upper], height), axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--years', type=int, default=20)
+    parser.add_argument('--rows-per-year', type=int, default=8760)
+    args = parser.parse_args()
+
+    client = offline_client(WindwattsWTKClient, [f"windspeed_{h}m" for h in MODEL_HEIGHTS] + ['year', 'mohr', 'varset', 'index'])
+    df = synthetic_frame(args.years, args.rows_per_year)
+    print(f"Frame: {len(df):,} rows, model heights {MODEL_HEIGHTS}")
+
+    def vectorized(heights, method='linear'):
+        client.df = df.copy()
+        return client.interpolate_windspeed(heights, method=method)
+
+    rows = []
+    row_wise_time = best_time(lambda: row_wise(client, df, 90), repeat=1)
+    rows.append(('row-wise apply', '90', 'linear', f"{row_wise_time:.3f}", '1.0x'))
+    for heights, method in [(90, 'linear'), (90, 'log'), (90, 'power'), ([50, 70, 90, 110, 130], 'linear')]:
+        elapsed = best_time(lambda: vectorized(heights, method))
+        rows.append(('vectorized', str(heights), method, f"{elapsed:.3f}", f"{row_wise_time / elapsed:.0f}x"))
+    report(rows, ('path', 'height(s)', 'method', 'seconds', 'speedup vs row-wise (1 height)'))
+
+    identical = np.array_equal(row_wise(client, df, 90).to_numpy(), vectorized(90)['windspeed_90m'].to_numpy())
+    print(f"Linear results identical to the row-wise path: {identical}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Accuracy and latency of the great-circle `SpatialIndex` against the former degree-space KDTree, a
+`cKDTree(location_index.coordinates())` over (longitude, latitude) in degrees.
+
+Accuracy: for random points within the grid, the nearest location of each method is compared with the exact nearest
+location by haversine distance, found by brute force over all locations. A degree-space KDTree treats one degree of
+longitude as long as one degree of latitude, so it can return a location that is not the nearest one.
+
+Latency: construction (build, save, and load of the persisted index), single-point queries as made by
+`find_nearest_location`, and a batch as made by `find_nearest_locations_bulk`.
+
+By default a synthetic location index of the size of the WTK-LED grid is used; --prefix loads a saved
+LocationIndex (e.g. the packaged data/wtk_location) instead.
+
+Usage:
+    python benchmarks/bench_spatial_index.py [--locations 2510000] [--accuracy-points 200] [--batch 10000]
+    python benchmarks/bench_spatial_index.py --prefix windwatts_data/data/wtk_location
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+from scipy.spatial import cKDTree
+from common import best_time, report, synthetic_location_index
+from windwatts_data.location_index import LocationIndex
+from windwatts_data.spatial_index import SpatialIndex, haversine_km
+
+
+def random_points(location_index: LocationIndex, n: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    """Points near random grid locations, so they fall inside the grid and not in its gaps."""
+    rng = np.random.default_rng(seed)
+    positions = rng.integers(0, len(location_index), n)
+    lats = np.asarray(location_index.latitudes[positions], dtype=np.float64) + rng.uniform(-0.05, 0.05, n)
+    lons = np.asarray(location_index.longitudes[positions], dtype=np.float64) + rng.uniform(-0.05, 0.05, n)
+    return lats, lons
+
+
+def accuracy(name: str, positions: np.ndarray, lats, lons, location_lats, location_lons, exact_km) -> tuple:
+    found_km = haversine_km(lats, lons, location_lats[positions], location_lons[positions])
+    extra_m = (found_km - exact_km) * 1000
+    wrong = extra_m > 1e-6
+    return (name, f"{wrong.mean():.1%}", f"{extra_m[wrong].mean() if wrong.any() else 0:.0f}",
+            f"{extra_m.max():.0f}")
+
+
+def median_latency_ms(function, lats, lons) -> float:
+    times = []
+    for lat, lon in zip(lats, lons):
+        start = time.perf_counter()
+        function(lat, lon)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--locations', type=int, default=2_510_000)
+    parser.add_argument('--prefix', help='Prefix of a saved LocationIndex to use instead of a synthetic one.')
+    parser.add_argument('--accuracy-points', type=int, default=200)
+    parser.add_argument('--latency-points', type=int, default=1000)
+    parser.add_argument('--batch', type=int, default=10_000)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='windwatts_spatial_bench_')
+    try:
+        if args.prefix:
+            location_index = LocationIndex.load(args.prefix)
+        else:
+            location_index = synthetic_location_index(os.path.join(directory, 'wtk_location'), args.locations)
+        location_lats = np.asarray(location_index.latitudes, dtype=np.float64)
+        location_lons = np.asarray(location_index.longitudes, dtype=np.float64)
+        print(f"Location index: {len(location_index):,} locations")
+
+        start = time.perf_counter()
+        degree_tree = cKDTree(location_index.coordinates())
+        degree_build = time.perf_counter() - start
+        start = time.perf_counter()
+        spatial_index = SpatialIndex.build(location_index)
+        spatial_build = time.perf_counter() - start
+        prefix = os.path.join(directory, 'spatial')
+        spatial_save = best_time(lambda: spatial_index.save(prefix), repeat=1)
+        spatial_load = best_time(lambda: SpatialIndex.load(prefix))
+        start = time.perf_counter()
+        _ = spatial_index.tree
+        unit_tree_build = time.perf_counter() - start
+        report([
+            ('degree cKDTree', 'build', f"{degree_build:.3f}"),
+            ('SpatialIndex', 'build (cell grid)', f"{spatial_build:.3f}"),
+            ('SpatialIndex', 'save', f"{spatial_save:.3f}"),
+            ('SpatialIndex', 'load (memory-mapped)', f"{spatial_load:.4f}"),
+            ('SpatialIndex', 'unit-sphere KDTree, first batch query', f"{unit_tree_build:.3f}"),
+        ], ('index', 'step', 'seconds'))
+        print()
+
+        lats, lons = random_points(location_index, args.accuracy_points, seed=1)
+        exact_km = np.array([haversine_km(lat, lon, location_lats, location_lons).min() for lat, lon in zip(lats, lons)])
+        _, degree_positions = degree_tree.query(np.column_stack((lons, lats)))
+        point_index = SpatialIndex.load(prefix)
+        cell_positions = np.array([point_index.query(lat, lon)[1][0, 0] for lat, lon in zip(lats, lons)])
+        _, tree_positions = spatial_index.query(lats, lons)
+        report([
+            accuracy('degree cKDTree', degree_positions, lats, lons, location_lats, location_lons, exact_km),
+            accuracy('SpatialIndex, single points', cell_positions, lats, lons, location_lats, location_lons, exact_km),
+            accuracy('SpatialIndex, batch', tree_positions[:, 0], lats, lons, location_lats, location_lons, exact_km),
+        ], ('method', 'not the nearest', 'mean extra distance when wrong (m)', 'max extra distance (m)'))
+        print(f"({args.accuracy_points} random points, checked against a brute-force haversine search)")
+        print()
+
+        lats, lons = random_points(location_index, args.latency_points, seed=2)
+        batch_lats, batch_lons = random_points(location_index, args.batch, seed=3)
+        report([
+            ('degree cKDTree', 'single point, median (ms)',
+             f"{median_latency_ms(lambda lat, lon: degree_tree.query([lon, lat]), lats, lons):.3f}"),
+            ('SpatialIndex', 'single point, median (ms)',
+             f"{median_latency_ms(lambda lat, lon: point_index.query(lat, lon), lats, lons):.3f}"),
+            ('degree cKDTree', f"batch of {args.batch:,} (ms)",
+             f"{best_time(lambda: degree_tree.query(np.column_stack((batch_lons, batch_lats)))) * 1000:.1f}"),
+            ('SpatialIndex', f"batch of {args.batch:,} (ms)",
+             f"{best_time(lambda: spatial_index.query(batch_lats, batch_lons)) * 1000:.1f}"),
+        ], ('index', 'query', 'latency'))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Time to first call of a client constructed eagerly (`lazy=False`) against lazily (`lazy=True`).
+
+Each run is a fresh subprocess that imports the package, constructs a client and calls `find_nearest_location`
+once; import, construction and first call are timed separately. Runs are made with a cold spatial index (nothing
+persisted yet, so it is built from the location index and saved) and a warm one (loaded from `spatial_index_prefix`).
+
+By default the runs are offline: a synthetic location index of the size of the WTK-LED grid is written with
+`LocationIndex.save` and passed as `location_index_prefix`, and the schema cache is prepopulated so the eager
+constructor needs no DESCRIBE query. With --config the given config is used as is, so the eager constructor also
+includes the DESCRIBE query (on a cold schema cache) and the packaged location index.
+
+Usage:
+    python benchmarks/bench_startup.py [--locations 2510000] [--repeat 3]
+    python benchmarks/bench_startup.py --config config.json
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from common import offline_config, report, synthetic_location_index
+
+COLUMN_NAMES = [f"windspeed_{height}m" for height in (40, 60, 80, 100, 120, 140)] + ['year', 'mohr', 'varset', 'index']
+
+
+def run_client(config: str, mode: str, lat: float, lon: float) -> dict:
+    """Import, construct and make the first call; runs in a subprocess."""
+    start = time.perf_counter()
+    from windwatts_data.windwatts_wtk_client import WindwattsWTKClient
+    imported = time.perf_counter()
+    client = WindwattsWTKClient(config, lazy=(mode == 'lazy'))
+    constructed = time.perf_counter()
+    index = client.find_nearest_location(lat, lon)
+    called = time.perf_counter()
+    return {'import': imported - start, 'construct': constructed - imported, 'first_call': called - constructed,
+            'index': index}
+
+
+def child(config: str, mode: str, lat: float, lon: float) -> dict:
+    command = [sys.executable, os.path.abspath(__file__), '--child', config, mode, str(lat), str(lon)]
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def with_spatial_index_prefix(config: str, prefix: str) -> str:
+    """Copy of `config` with `spatial_index_prefix` replaced, written next to it."""
+    with open(config) as f:
+        values = json.load(f)
+    values['spatial_index_prefix'] = prefix
+    os.makedirs(os.path.dirname(prefix), exist_ok=True)
+    path = f"{prefix}_config.json"
+    with open(path, 'w') as f:
+        json.dump(values, f)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--locations', type=int, default=2_510_000)
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per case; the best run is reported.')
+    parser.add_argument('--lat', type=float, default=39.74)
+    parser.add_argument('--lon', type=float, default=-105.17)
+    parser.add_argument('--config', help='Client config; uses its tables, location index and schema cache as is.')
+    parser.add_argument('--child', nargs=4, metavar=('CONFIG', 'MODE', 'LAT', 'LON'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        config, mode, lat, lon = args.child
+        print(json.dumps(run_client(config, mode, float(lat), float(lon))))
+        return
+
+    directory = tempfile.mkdtemp(prefix='windwatts_startup_bench_')
+    try:
+        config = args.config
+        if not config:
+            location_prefix = os.path.join(directory, 'location', 'wtk_location')
+            synthetic_location_index(location_prefix, args.locations)
+            config = offline_config(location_index_prefix=location_prefix)
+            with open(config) as f:
+                values = json.load(f)
+            with open(values['schema_cache_path'], 'w') as f:
+                json.dump({f"{values['database']}.{values['athena_table_name']}": COLUMN_NAMES}, f)
+            print(f"Synthetic location index: {args.locations:,} locations")
+
+        warm_config = with_spatial_index_prefix(config, os.path.join(directory, 'warm', 'spatial'))
+        child(warm_config, 'lazy', args.lat, args.lon)
+
+        rows = []
+        for spatial in ('cold', 'warm'):
+            for mode in ('eager', 'lazy'):
+                runs = []
+                for run in range(args.repeat):
+                    if spatial == 'cold':
+                        run_config = with_spatial_index_prefix(config, os.path.join(directory, f"cold_{mode}_{run}", 'spatial'))
+                    else:
+                        run_config = warm_config
+                    runs.append(child(run_config, mode, args.lat, args.lon))
+                best = min(runs, key=lambda result: result['construct'] + result['first_call'])
+                total = best['construct'] + best['first_call']
+                rows.append((mode, spatial, f"{best['import']:.3f}", f"{best['construct']:.3f}",
+                             f"{best['first_call']:.3f}", f"{total:.3f}", best['index']))
+        report(rows, ('init', 'spatial index', 'import (s)', 'constructor (s)', 'first call (s)',
+                      'time to first call (s)', 'nearest index'))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
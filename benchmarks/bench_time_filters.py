@@ -0,0 +1,161 @@
+"""
+Bytes scanned by month/day/hour filters: the former SUBSTRING(CAST(time_index AS VARCHAR), ...) predicates against
+the range predicates of `query_builder.time_filter_predicates`.
+
+Local fixture (default): hourly Parquet files shaped like the WTK-LED hourly table (time_index sorted within a file)
+are written to a temporary directory. For every filter the script counts the bytes of the referenced column chunks
+in the row groups a Parquet reader has to scan: the row-wise cast predicates prune nothing, while a range predicate
+skips row groups whose time_index min/max statistics do not intersect it, as Athena does. It also checks that both
+predicate sets select exactly the same rows.
+
+With --config, both versions of every query are run in Athena and DataScannedInBytes is read from
+`get_query_execution` (needs AWS credentials and scans data).
+
+Usage:
+    python benchmarks/bench_time_filters.py [--locations 20] [--row-group-hours 168]
+    python benchmarks/bench_time_filters.py --config config.json --index 0a1b2c [--year 2018]
+"""
+import argparse
+import os
+import re
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from common import report
+from windwatts_data.query_builder import time_filter_predicates
+
+SELECT_COLUMNS = ['windspeed_100m', 'time_index']
+
+SCENARIOS = [
+    ('January', dict(months=[1])),
+    ('Summer months', dict(months=[6, 7, 8])),
+    ('1st of every month', dict(days=[1])),
+    ('March 5, 12:00-14:00', dict(months=[3], days=[5], hours=[12, 13])),
+    ('Hours 0-5, all days', dict(hours=[0, 1, 2, 3, 4, 5])),
+]
+
+RANGE = re.compile(r"time_index >= '(\d{10})' AND time_index < '(\d{10})'")
+RESIDUAL = re.compile(r"CAST\(time_index AS BIGINT\)(?: / (\d+))? % 100 IN \(([\d, ]+)\)")
+
+
+def legacy_predicates(months=None, days=None, hours=None) -> list[str]:
+    """The predicates the hourly client built before the range predicates, one cast per row and component."""
+    predicates = []
+    for values, position in [(months, 5), (days, 7), (hours, 9)]:
+        if values:
+            values = ', '.join(f"'{value:02}'" for value in values)
+            predicates.append(f"SUBSTRING(CAST(time_index AS VARCHAR), {position}, 2) IN ({values})")
+    return predicates
+
+
+def selected_rows(time_index: pd.Series, predicates: list[str], legacy: bool) -> np.ndarray:
+    """Evaluate the predicates on a time_index column, to check both versions select the same rows."""
+    keep = np.ones(len(time_index), dtype=bool)
+    numbers = time_index.astype(np.int64).to_numpy()
+    for predicate in predicates:
+        if legacy:
+            position, values = re.search(r"VARCHAR\), (\d+), 2\) IN \((.*)\)", predicate).groups()
+            part = time_index.str.slice(int(position) - 1, int(position) + 1)
+            keep &= part.isin([value.strip(" '") for value in values.split(',')]).to_numpy()
+        elif RANGE.search(predicate):
+            in_range = np.zeros(len(time_index), dtype=bool)
+            for start, end in RANGE.findall(predicate):
+                in_range |= ((time_index >= start) & (time_index < end)).to_numpy()
+            keep &= in_range
+        else:
+            divisor, values = RESIDUAL.search(predicate).groups()
+            part = numbers // int(divisor or 1) % 100
+            keep &= np.isin(part, [int(value) for value in values.split(',')])
+    return keep
+
+
+def scanned_bytes(paths: list[str], predicates: list[str]) -> int:
+    """Bytes of the referenced column chunks in the row groups that min/max statistics cannot rule out."""
+    ranges = [match for predicate in predicates for match in RANGE.findall(predicate)]
+    total = 0
+    for path in paths:
+        metadata = pq.ParquetFile(path).metadata
+        names = [metadata.schema.column(i).name for i in range(metadata.num_columns)]
+        for g in range(metadata.num_row_groups):
+            row_group = metadata.row_group(g)
+            chunks = {names[c]: row_group.column(c) for c in range(row_group.num_columns)}
+            statistics = chunks['time_index'].statistics
+            if ranges and not any(start <= statistics.max and statistics.min < end for start, end in ranges):
+                continue
+            total += sum(chunks[column].total_compressed_size for column in SELECT_COLUMNS)
+    return total
+
+
+def write_fixture(directory: str, n_locations: int, row_group_hours: int, year: int) -> list[str]:
+    rng = np.random.default_rng(0)
+    time_index = pd.date_range(f"{year}-01-01", f"{year}-12-31 23:00", freq='h').strftime('%Y%m%d%H')
+    paths = []
+    for location in range(n_locations):
+        df = pd.DataFrame({
+            'windspeed_100m': (rng.weibull(2.0, len(time_index)) * 8).round(3),
+            'winddirection_100m': rng.uniform(0, 360, len(time_index)).round(2),
+            'temperature_100m': rng.normal(10, 8, len(time_index)).round(2),
+            'time_index': time_index,
+        })
+        path = os.path.join(directory, f"location_{location:04d}.parquet")
+        df.to_parquet(path, index=False, row_group_size=row_group_hours)
+        paths.append(path)
+    return paths
+
+
+def run_local(args):
+    directory = tempfile.mkdtemp(prefix='windwatts_time_filter_bench_')
+    try:
+        paths = write_fixture(directory, args.locations, args.row_group_hours, args.year)
+        time_index = pd.read_parquet(paths[0], columns=['time_index'])['time_index']
+        rows = []
+        for name, filters in SCENARIOS:
+            legacy = legacy_predicates(**filters)
+            ranged = time_filter_predicates([args.year], **filters)
+            same_rows = np.array_equal(selected_rows(time_index, legacy, True), selected_rows(time_index, ranged, False))
+            before, after = scanned_bytes(paths, legacy), scanned_bytes(paths, ranged)
+            rows.append((name, f"{before / 1024:.0f}", f"{after / 1024:.0f}", f"{after / before:.1%}", same_rows))
+        print(f"Fixture: {args.locations} locations, {args.year}, row groups of {args.row_group_hours} hours")
+        report(rows, ('filter', 'KiB scanned before', 'KiB scanned after', 'after / before', 'same rows'))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def run_athena(args):
+    from windwatts_data.client_base import client_base
+    from windwatts_data.query_builder import QueryPlan
+
+    client = client_base(args.config, lazy=True)
+    rows = []
+    for name, filters in SCENARIOS:
+        scanned = []
+        for predicates in (legacy_predicates(**filters), time_filter_predicates([args.year], **filters)):
+            plan = QueryPlan(client.athena_table_name, SELECT_COLUMNS).where_in('year', args.year).where_in('index', args.index)
+            for predicate in predicates:
+                plan.where(predicate)
+            client.query_athena(plan)
+            scanned.append(client.last_query_statistics['DataScannedInBytes'])
+        rows.append((name, f"{scanned[0] / 1024:.0f}", f"{scanned[1] / 1024:.0f}", f"{scanned[1] / scanned[0]:.1%}"))
+    report(rows, ('filter', 'KiB scanned before', 'KiB scanned after', 'after / before'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--locations', type=int, default=20)
+    parser.add_argument('--row-group-hours', type=int, default=168, help='Rows per Parquet row group of the fixture.')
+    parser.add_argument('--year', type=int, default=2018)
+    parser.add_argument('--config', help='Client config; runs the queries in Athena instead of on the local fixture.')
+    parser.add_argument('--index', help='Grid index to query in Athena.')
+    args = parser.parse_args()
+    if args.config:
+        if not args.index:
+            parser.error('--index is required with --config.')
+        run_athena(args)
+    else:
+        run_local(args)
+
+
+if __name__ == '__main__':
+    main()
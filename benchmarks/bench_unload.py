@@ -0,0 +1,167 @@
+"""
+Wall time and peak RSS of reading a query result through UNLOAD-to-Parquet against the CSV result path.
+
+By default a map-shaped result (hex index, two float columns) is written once to a temporary directory, both as the
+quoted CSV file Athena produces and as the SNAPPY Parquet files an UNLOAD writes. Each path then runs in its own
+subprocess against a stubbed S3 client serving those files, so the peak RSS of one path is not inflated by the other.
+
+With --config and --query the query is run for real, once with `query_athena(query)` and once with
+`query_athena(query, unload=True)`, which needs AWS credentials and scans data.
+
+Usage:
+    python benchmarks/bench_unload.py [--rows 2510000] [--files 4]
+    python benchmarks/bench_unload.py --config config.json --query "SELECT ..."
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from common import offline_client, report
+
+BUCKET = 'bench-results'
+
+
+def reset_peak_rss():
+    """Reset the peak RSS of this process (Linux), so the peak of client construction does not hide the read."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def rss_mb(peak: bool) -> float:
+    """Current or peak RSS of this process in MB, from /proc on Linux or getrusage (peak only) elsewhere."""
+    try:
+        field = 'VmHWM:' if peak else 'VmRSS:'
+        with open('/proc/self/status') as f:
+            return next(int(line.split()[1]) for line in f if line.startswith(field)) / 1024
+    except (OSError, StopIteration):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class LocalS3:
+    """Minimal stand-in for the S3 client calls used to read query results, serving files of a local directory."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def get_object(self, Bucket: str, Key: str) -> dict:
+        return {'Body': open(os.path.join(self.root, Key), 'rb')}
+
+    def get_paginator(self, operation: str):
+        root = self.root
+
+        class Paginator:
+            def paginate(self, Bucket: str, Prefix: str):
+                directory = os.path.join(root, Prefix)
+                yield {'Contents': [
+                    {'Key': f"{Prefix}{name}", 'Size': os.path.getsize(os.path.join(directory, name))}
+                    for name in sorted(os.listdir(directory))
+                ]}
+
+        return Paginator()
+
+
+def write_fixture(root: str, n_rows: int, n_files: int):
+    import numpy as np
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'windspeed_100m': (rng.weibull(2.0, n_rows) * 8).round(3),
+        'winddirection_100m': rng.uniform(0, 360, n_rows).round(2),
+        'index': pd.Series(np.arange(n_rows)).map('{:06x}'.format),
+    })
+    # Athena quotes every value of the CSV result
+    df.to_csv(os.path.join(root, 'result.csv'), index=False, quoting=1)
+    os.makedirs(os.path.join(root, 'unload'))
+    for i, part in enumerate(np.array_split(np.arange(n_rows), n_files)):
+        table = pa.Table.from_pandas(df.iloc[part], preserve_index=False)
+        pq.write_table(table, os.path.join(root, 'unload', f"part-{i:05d}.parquet"), compression='snappy')
+
+
+def run_path(root: str, mode: str) -> dict:
+    """Read the fixture through one path; runs in a subprocess."""
+    from windwatts_data.client_base import client_base
+
+    client = offline_client(client_base, ['windspeed_100m', 'winddirection_100m', 'index'])
+    client.s3 = LocalS3(root)
+    reset_peak_rss()
+    baseline = rss_mb(peak=False)
+    start = time.perf_counter()
+    if mode == 'csv':
+        df = client._read_csv_result(f"s3://{BUCKET}/result.csv")
+    else:
+        df = client._read_unload_result(f"s3://{BUCKET}/unload/")
+    elapsed = time.perf_counter() - start
+    peak = rss_mb(peak=True)
+    return {'seconds': elapsed, 'peak_rss_delta_mb': peak - baseline, 'rows': len(df),
+            'frame_mb': df.memory_usage(deep=True).sum() / 1024 ** 2}
+
+
+def run_query(config: str, query: str, mode: str) -> dict:
+    """Run a real query through one path; runs in a subprocess."""
+    from windwatts_data.client_base import client_base
+
+    client = client_base(config, lazy=True)
+    reset_peak_rss()
+    baseline = rss_mb(peak=False)
+    start = time.perf_counter()
+    df = client.query_athena(query, unload=(mode == 'parquet'))
+    elapsed = time.perf_counter() - start
+    peak = rss_mb(peak=True)
+    return {'seconds': elapsed, 'peak_rss_delta_mb': peak - baseline, 'rows': len(df),
+            'frame_mb': df.memory_usage(deep=True).sum() / 1024 ** 2,
+            'scanned_mb': (client.last_query_statistics or {}).get('DataScannedInBytes', 0) / 1024 ** 2}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=2_510_000)
+    parser.add_argument('--files', type=int, default=4, help='Number of Parquet files of the stubbed UNLOAD result.')
+    parser.add_argument('--config', help='Client config; runs --query against Athena instead of the stubbed result.')
+    parser.add_argument('--query')
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'TARGET'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        mode, target = args.child
+        result = run_query(args.config, args.query, mode) if args.config else run_path(target, mode)
+        print(json.dumps(result))
+        return
+
+    if args.config and not args.query:
+        parser.error('--query is required with --config.')
+    target = ''
+    if not args.config:
+        target = tempfile.mkdtemp(prefix='windwatts_unload_bench_')
+        write_fixture(target, args.rows, args.files)
+        csv_mb = os.path.getsize(os.path.join(target, 'result.csv')) / 1024 ** 2
+        parquet_mb = sum(os.path.getsize(os.path.join(target, 'unload', name)) for name in os.listdir(os.path.join(target, 'unload'))) / 1024 ** 2
+        print(f"Stubbed result: {args.rows:,} rows, CSV {csv_mb:.1f} MB, Parquet {parquet_mb:.1f} MB in {args.files} files")
+
+    rows = []
+    try:
+        for mode in ('csv', 'parquet'):
+            command = [sys.executable, os.path.abspath(__file__), '--child', mode, target]
+            if args.config:
+                command += ['--config', args.config, '--query', args.query]
+            output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            rows.append((mode, f"{result['rows']:,}", f"{result['seconds']:.2f}", f"{result['peak_rss_delta_mb']:.0f}",
+                         f"{result['frame_mb']:.0f}", f"{result['scanned_mb']:.1f}" if 'scanned_mb' in result else '-'))
+    finally:
+        if target:
+            shutil.rmtree(target, ignore_errors=True)
+    report(rows, ('path', 'rows', 'seconds', 'peak RSS increase (MB)', 'DataFrame (MB)', 'scanned (MB)'))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Helpers shared by the benchmark scripts. The scripts run offline: clients are built in lazy mode from a throwaway
+config, so no DESCRIBE query, location index or AWS credentials are needed unless a script asks for them.
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+# Run against the working tree when the scripts are called as `python benchmarks/<script>.py`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def offline_config(**overrides) -> str:
+    """Write a config file for an offline client and return its path."""
+    directory = tempfile.mkdtemp(prefix='windwatts_bench_')
+    config = {
+        'region_name': 'us-west-2',
+        'database': 'bench',
+        'athena_table_name': 'bench',
+        'alt_athena_table_name': 'bench_alt',
+        'output_location': 's3://bench-results/athena/',
+        'schema_cache_path': os.path.join(directory, 'schema_cache.json'),
+        'spatial_index_prefix': os.path.join(directory, 'spatial'),
+    }
+    config.update(overrides)
+    path = os.path.join(directory, 'config.json')
+    with open(path, 'w') as f:
+        json.dump(config, f)
+    return path
+
+
+def offline_client(client_class, column_names: list[str], **config):
+    """A client of `client_class` in lazy mode with the given table columns and no AWS access."""
+    client = client_class(offline_config(**config), lazy=True)
+    client.column_names = list(column_names)
+    return client
+
+
+def synthetic_location_index(prefix: str, n_locations: int = 2_510_000, seed: int = 0):
+    """
+    Write a location index of `n_locations` jittered grid points over the contiguous US under `prefix`, standing in
+    for the packaged WTK-LED index, and return it. Grid index codes are the hex positions, as in the real data.
+    """
+    from windwatts_data.location_index import LocationIndex
+
+    rng = np.random.default_rng(seed)
+    n_cols = int(np.sqrt(n_locations * 59 / 26))
+    rows, cols = np.divmod(np.arange(n_locations), n_cols)
+    lats = 24.5 + rows * (26.0 / (n_locations / n_cols)) + rng.normal(0, 0.002, n_locations)
+    lons = -125.0 + cols * (59.0 / n_cols) + rng.normal(0, 0.002, n_locations)
+    codes = np.char.encode(np.char.mod('%06x', np.arange(n_locations)), 'ascii')
+    location_index = LocationIndex(lats.astype(np.float32), lons.astype(np.float32), codes)
+    location_index.save(prefix)
+    return location_index
+
+
+def best_time(function, repeat: int = 3) -> float:
+    """Best wall time of `repeat` calls of `function` in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def report(rows: list[tuple], header: tuple):
+    """Print a small aligned table."""
+    rows = [tuple(str(value) for value in row) for row in [header] + rows]
+    widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+    for i, row in enumerate(rows):
+        print('  '.join(value.ljust(width) for value, width in zip(row, widths)))
+        if i == 0:
+            print('  '.join('-' * width for width in widths))
@@ -12,7 +12,7 @@ setup(
     packages=find_packages(),
     license="BSD-3-Clause",
     include_package_data=True,
-    package_data={'windwatts_data': ['data/*.pkl.gz']},
+    package_data={'windwatts_data': ['data/*.pkl.gz', 'data/*.npy']},
     install_requires=[
         'boto3',
         'pandas',
@@ -20,7 +20,8 @@ setup(
         'numpy',
         'scipy',
         'geopandas',
-        'tqdm'
+        'tqdm',
+        'pyarrow'
     ],
     python_requires='>=3.7',
     classifiers=[
@@ -0,0 +1,93 @@
+import io
+import json
+import pandas as pd
+import pytest
+from botocore.response import StreamingBody
+from botocore.stub import Stubber
+from windwatts_data.client_base import client_base
+
+QUERY = "SELECT windspeed_100m, year FROM wtk_table WHERE index = '0a1b2c'"
+RESULT_CSV = b'"windspeed_100m","year"\n7.25,"2018"\n6.5,"2019"\n'
+
+
+@pytest.fixture
+def client(tmp_path):
+    config_path = tmp_path / 'config.json'
+    config_path.write_text(json.dumps({
+        'region_name': 'us-west-2',
+        'database': 'windwatts',
+        'athena_table_name': 'wtk_table',
+        'output_location': 's3://results-bucket/athena/',
+        'athena_workgroup': 'primary',
+        'schema_cache_path': str(tmp_path / 'schema_cache.json'),
+        'result_cache_dir': str(tmp_path / 'result_cache'),
+    }))
+    return client_base(str(config_path), data='wtk', lazy=True)
+
+
+def stub_query(athena_stubber: Stubber, s3_stubber: Stubber, execution_id: str = 'execution-1'):
+    """Queue the Athena and S3 responses of one query returning RESULT_CSV."""
+    athena_stubber.add_response('start_query_execution', {'QueryExecutionId': execution_id})
+    athena_stubber.add_response(
+        'get_query_execution',
+        {'QueryExecution': {
+            'QueryExecutionId': execution_id,
+            'Status': {'State': 'SUCCEEDED'},
+            'ResultConfiguration': {'OutputLocation': f"s3://results-bucket/athena/{execution_id}.csv"},
+            'Statistics': {'DataScannedInBytes': 1024}
+        }},
+        {'QueryExecutionId': execution_id}
+    )
+    s3_stubber.add_response(
+        'get_object',
+        {'Body': StreamingBody(io.BytesIO(RESULT_CSV), len(RESULT_CSV))},
+        {'Bucket': 'results-bucket', 'Key': f"athena/{execution_id}.csv"}
+    )
+
+
+def test_repeated_query_is_served_from_cache(client):
+    with Stubber(client.athena) as athena_stubber, Stubber(client.s3) as s3_stubber:
+        stub_query(athena_stubber, s3_stubber)
+
+        first = client.query_athena(QUERY)
+        athena_stubber.assert_no_pending_responses()
+        s3_stubber.assert_no_pending_responses()
+        assert client.result_cache.stats()['misses'] == 1
+        assert client.result_cache.stats()['hits'] == 0
+
+        # No responses are queued any more: any call to Athena or S3 would raise a StubResponseError
+        second = client.query_athena("  " + QUERY.replace(' ', '\n  ') + ";")
+
+    pd.testing.assert_frame_equal(first, second)
+    stats = client.result_cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['entries'] == 1
+
+
+def test_different_workgroup_misses(client):
+    with Stubber(client.athena) as athena_stubber, Stubber(client.s3) as s3_stubber:
+        stub_query(athena_stubber, s3_stubber, 'execution-1')
+        stub_query(athena_stubber, s3_stubber, 'execution-2')
+
+        client.query_athena(QUERY)
+        client.athena_workgroup = 'other'
+        client.query_athena(QUERY)
+        athena_stubber.assert_no_pending_responses()
+
+    assert client.result_cache.stats()['misses'] == 2
+    assert client.result_cache.stats()['hits'] == 0
+
+
+def test_expired_entry_is_refetched(client):
+    client.result_cache.ttl_seconds = 1e-9
+    with Stubber(client.athena) as athena_stubber, Stubber(client.s3) as s3_stubber:
+        stub_query(athena_stubber, s3_stubber, 'execution-1')
+        stub_query(athena_stubber, s3_stubber, 'execution-2')
+
+        client.query_athena(QUERY)
+        client.query_athena(QUERY)
+        athena_stubber.assert_no_pending_responses()
+
+    assert client.result_cache.stats()['hits'] == 0
+    assert client.result_cache.stats()['misses'] == 2
@@ -0,0 +1,56 @@
+import gc
+import json
+import numpy as np
+import pytest
+from botocore.stub import Stubber
+from windwatts_data.client_base import client_base
+from windwatts_data.location_index import LocationIndex
+from windwatts_data.query_builder import QueryPlan
+
+# One index of the 1224 table over all 20 years: 20 files of 28 KiB
+BYTES_PER_INDEX = 20 * 28 * 1024
+
+
+@pytest.fixture
+def client(tmp_path):
+    config_path = tmp_path / 'config.json'
+    config_path.write_text(json.dumps({
+        'region_name': 'us-west-2',
+        'database': 'windwatts',
+        'athena_table_name': 'wtk_table',
+        'output_location': 's3://results-bucket/athena/',
+        'schema_cache_path': str(tmp_path / 'schema_cache.json'),
+        'max_bytes_per_session': int(2.5 * BYTES_PER_INDEX),
+    }))
+    client = client_base(str(config_path), data='wtk', lazy=True)
+    client.column_names = ['windspeed_100m', 'year', 'mohr', 'varset', 'index']
+    client._location_index = LocationIndex(
+        np.zeros(4, dtype=np.float32), np.zeros(4, dtype=np.float32), np.array([b'00000a', b'00000b', b'00000c', b'00000d'])
+    )
+    return client
+
+
+def plan(index: str) -> QueryPlan:
+    return QueryPlan('wtk_table', ['windspeed_100m', 'year', 'mohr']).where_in('index', index)
+
+
+def test_batch_over_session_budget_is_refused_before_any_query(client):
+    # Every query fits the budget alone, the three together do not. No responses are queued: any call to Athena raises.
+    with Stubber(client.athena):
+        with pytest.raises(RuntimeError, match='3 queries would scan'):
+            client.submit_queries([plan('00000a'), plan('00000b'), plan('00000c')])
+    assert client._session_bytes_reserved == 0
+
+
+def test_submitted_queries_reserve_the_session_budget(client):
+    first = client.query_athena_iter(plan('00000a'))
+    second = client.query_athena_iter(plan('00000b'))
+    assert client._session_bytes_reserved == 2 * BYTES_PER_INDEX
+    with pytest.raises(RuntimeError, match='of the session budget'):
+        client.query_athena_iter(plan('00000c'))
+
+    # Streams that are discarded without running release their reservations
+    del first, second
+    gc.collect()
+    assert client._session_bytes_reserved == 0
+    client.query_athena_iter(plan('00000c'))
@@ -0,0 +1,109 @@
+import numpy as np
+
+# Specific gas constant of dry air in J/(kg K)
+GAS_CONSTANT_DRY_AIR = 287.05
+
+# Air density (kg/m^3) of the ISO standard atmosphere at sea level, the reference density of power curves
+STANDARD_AIR_DENSITY = 1.225
+
+# Prefixes of the WTK-LED thermodynamic columns: temperature in degrees Celsius, pressure in Pa
+TEMPERATURE_PREFIX = 'temperature_'
+PRESSURE_PREFIX = 'pressure_'
+
+
+def bracketing_levels(levels, target_heights) -> list:
+    """
+    Levels needed to interpolate or extrapolate a variable at the target heights: the level itself on an exact match,
+    else the two levels around the height, or the two nearest levels when the height is outside the available levels.
+
+    :param levels: Available heights of the variable.
+    :type levels: list[int]
+    :param target_heights: Heights at which the variable is needed.
+    :type target_heights: list[float]
+    :return: Sorted list of the levels to fetch.
+    :rtype: list
+    """
+    levels = np.unique(np.asarray(levels))
+    needed = set()
+    for target in target_heights:
+        if target in levels or len(levels) == 1:
+            needed.add(levels[np.abs(levels - target).argmin()].item())
+            continue
+        upper = int(np.clip(np.searchsorted(levels, target), 1, len(levels) - 1))
+        needed.update((levels[upper - 1].item(), levels[upper].item()))
+    return sorted(needed)
+
+
+def interpolate_levels(values, heights, target_heights, log: bool = False) -> np.ndarray:
+    """
+    Interpolate a variable linearly in height between the two levels around every target height, for all rows at once.
+    Unlike `interpolate_profile`, heights outside the levels are extrapolated from the two nearest levels.
+
+    :param values: Array of shape (n_rows, n_levels) with the variable at each level.
+    :type values: numpy.ndarray
+    :param heights: Increasing heights of the levels, aligned with the columns of `values`.
+    :type heights: list[float]
+    :param target_heights: Heights at which to interpolate.
+    :type target_heights: list[float]
+    :param log: Interpolate the logarithm of the variable, e.g. for pressure, which decreases exponentially with height.
+    :type log: bool
+    :return: Array of shape (n_rows, n_targets).
+    :rtype: numpy.ndarray
+    """
+    values = np.asarray(values, dtype=np.float64)
+    heights = np.asarray(heights, dtype=np.float64)
+    if values.ndim != 2 or values.shape[1] != len(heights) or len(heights) == 0:
+        raise ValueError("Expected a (n_rows, n_levels) array with one height per level.")
+    if np.any(np.diff(heights) <= 0):
+        raise ValueError("Level heights must be strictly increasing.")
+    if log:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            values = np.log(values)
+
+    result = np.empty((len(values), len(target_heights)))
+    for j, target in enumerate(target_heights):
+        if len(heights) == 1:
+            result[:, j] = values[:, 0]
+            continue
+        upper = int(np.clip(np.searchsorted(heights, target), 1, len(heights) - 1))
+        fraction = (target - heights[upper - 1]) / (heights[upper] - heights[upper - 1])
+        result[:, j] = values[:, upper - 1] + fraction * (values[:, upper] - values[:, upper - 1])
+    return np.exp(result) if log else result
+
+
+def air_density(temperature, pressure) -> np.ndarray:
+    """
+    Density of dry air from the ideal gas law, rho = p / (R T).
+
+    :param temperature: Air temperature in degrees Celsius.
+    :param pressure: Air pressure in Pa.
+    :return: Air density in kg/m^3; NaN where an input is missing or not physical.
+    :rtype: numpy.ndarray
+    """
+    kelvin = np.asarray(temperature, dtype=np.float64) + 273.15
+    pressure = np.asarray(pressure, dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where((kelvin > 0) & (pressure > 0), pressure / (GAS_CONSTANT_DRY_AIR * kelvin), np.nan)
+
+
+def density_adjusted_windspeed(windspeed, density) -> np.ndarray:
+    """
+    Windspeed normalized to the standard air density, v * (rho / 1.225)^(1/3), as in IEC 61400-12-1 for
+    evaluating power curves given at standard density.
+
+    :param windspeed: Windspeed in m/s.
+    :param density: Air density in kg/m^3.
+    :rtype: numpy.ndarray
+    """
+    return np.asarray(windspeed, dtype=np.float64) * np.cbrt(np.asarray(density, dtype=np.float64) / STANDARD_AIR_DENSITY)
+
+
+def power_density(windspeed, density) -> np.ndarray:
+    """
+    Wind power density 0.5 * rho * v^3 in W/m^2.
+
+    :param windspeed: Windspeed in m/s.
+    :param density: Air density in kg/m^3.
+    :rtype: numpy.ndarray
+    """
+    return 0.5 * np.asarray(density, dtype=np.float64) * np.asarray(windspeed, dtype=np.float64) ** 3
@@ -0,0 +1,289 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import pandas as pd
+
+
+class ResultCache:
+    """
+    Persistent on-disk cache for Athena query results.
+
+    Results are stored as Parquet files named after a content hash of the normalized query text,
+    the Athena table and the workgroup. A SQLite index keeps track of size, creation and last access
+    time of every entry so that expired entries are dropped and the least recently used entries are
+    evicted once the cache grows beyond its size cap.
+    """
+
+    def __init__(self, cache_dir: str, ttl_seconds: float = 7 * 24 * 3600, max_bytes: int = 1024 ** 3):
+        """
+        Initialize the result cache.
+
+        :param cache_dir: Directory where the SQLite index and Parquet result files are stored. Created if missing.
+        :type cache_dir: str
+        :param ttl_seconds: Time to live of a cached result in seconds. Default is 7 days, matching Athena result reuse.
+        :type ttl_seconds: float
+        :param max_bytes: Maximum total size of the cached result files in bytes. Default is 1 GiB.
+        :type max_bytes: int
+        """
+        if not isinstance(cache_dir, str):
+            raise ValueError("cache_dir must be a string.")
+        if ttl_seconds is None or ttl_seconds <= 0:
+            raise ValueError("ttl_seconds must be a positive number.")
+        if max_bytes is None or max_bytes <= 0:
+            raise ValueError("max_bytes must be a positive number.")
+
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+        except OSError as e:
+            raise RuntimeError(f"Failed to create cache directory '{cache_dir}': {e}")
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(cache_dir, 'index.sqlite'), check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, size INTEGER, created_at REAL, last_access REAL, query TEXT)"
+            )
+
+    @staticmethod
+    def normalize_query(query_string: str) -> str:
+        """
+        Normalize query text so that formatting differences map to the same cache entry.
+        Whitespace runs are collapsed and a trailing semicolon is dropped; literals are kept as is.
+        """
+        return re.sub(r'\s+', ' ', query_string).strip().rstrip(';').strip()
+
+    def make_key(self, query_string: str, table_name: str = None, workgroup: str = None) -> str:
+        """
+        Build the content address of a query.
+
+        :param query_string: The SQL query.
+        :param table_name: Athena table the query runs against.
+        :param workgroup: Athena workgroup the query runs in.
+        :return: Hex digest identifying the query result.
+        """
+        payload = '\x1f'.join([self.normalize_query(query_string), str(table_name), str(workgroup)])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.parquet")
+
+    def get(self, key: str) -> pd.DataFrame:
+        """
+        Return the cached result for key, or None if it is missing or expired.
+        The lock is only held for the index lookups; the result file is read outside of it, so concurrent readers
+        do not wait on each other's file IO. Result files are replaced atomically, so a reader sees a complete file.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT created_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[0] > self.ttl_seconds:
+                if row is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+        try:
+            df = pd.read_parquet(self._path(key))
+        except Exception:
+            # Missing, evicted in the meantime or unreadable
+            with self._lock:
+                self._remove(key)
+                self.misses += 1
+            return None
+        with self._lock:
+            with self._conn:
+                self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return df
+
+    def put(self, key: str, df: pd.DataFrame, query_string: str = None):
+        """
+        Store a result and evict least recently used entries if the size cap is exceeded.
+        Results larger than the size cap are not cached.
+        """
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        # Write outside the lock; the atomic replace keeps concurrent readers from seeing a partial file
+        try:
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            print(f"Failed to cache query result: {e}")
+            return
+        size = os.path.getsize(path)
+        with self._lock:
+            if size > self.max_bytes:
+                self._remove(key)
+                return
+            now = time.time()
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, size, created_at, last_access, query) VALUES (?, ?, ?, ?, ?)",
+                    (key, size, now, now, query_string)
+                )
+            self._evict()
+
+    def _remove(self, key: str):
+        with self._conn:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        if os.path.exists(self._path(key)):
+            os.remove(self._path(key))
+
+    def _evict(self):
+        """Drop expired entries, then least recently used entries until the cache fits in max_bytes."""
+        expired = self._conn.execute(
+            "SELECT key FROM entries WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+        ).fetchall()
+        for (key,) in expired:
+            self._remove(key)
+            self.evictions += 1
+
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY last_access ASC").fetchall():
+            self._remove(key)
+            self.evictions += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        """Remove every cached result."""
+        with self._lock:
+            for (key,) in self._conn.execute("SELECT key FROM entries").fetchall():
+                self._remove(key)
+
+    def stats(self) -> dict:
+        """
+        Return cache statistics.
+
+        :return: Dictionary with hits, misses, evictions, number of entries and total size in bytes.
+        :rtype: dict
+        """
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": size
+        }
+
+
+class LocationCache:
+    """
+    Bounded in-memory LRU cache of location timeseries DataFrames keyed by grid index.
+
+    Coordinates that snap to the same grid cell share one entry. The cache is bounded both by the
+    number of entries and by the memory used by the cached frames (measured with DataFrame.memory_usage(deep=True)
+    when stored, so object string columns count their strings). Cached frames must not be modified; callers work on copies.
+    """
+
+    def __init__(self, max_entries: int = 32, max_bytes: int = 512 * 1024 ** 2):
+        """
+        Initialize the location cache.
+
+        :param max_entries: Maximum number of locations kept in memory. Default is 32.
+        :type max_entries: int
+        :param max_bytes: Maximum memory used by the cached frames in bytes. Default is 512 MiB.
+        :type max_bytes: int
+        """
+        if not isinstance(max_entries, int) or max_entries < 1:
+            raise ValueError("max_entries must be a positive integer.")
+        if max_bytes is None or max_bytes <= 0:
+            raise ValueError("max_bytes must be a positive number.")
+
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _sizeof(df: pd.DataFrame) -> int:
+        return int(df.memory_usage(index=True, deep=True).sum())
+
+    def __contains__(self, index) -> bool:
+        return index in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, index) -> pd.DataFrame:
+        """
+        Return the cached frame for a grid index and mark it as most recently used, or None if missing.
+        """
+        with self._lock:
+            df = self._entries.get(index)
+            if df is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(index)
+            self.hits += 1
+        return df
+
+    def peek(self, index) -> pd.DataFrame:
+        """
+        Return the cached frame for a grid index, or None if missing, without marking it as used or counting a hit.
+        """
+        with self._lock:
+            return self._entries.get(index)
+
+    def put(self, index, df: pd.DataFrame):
+        """
+        Store the frame for a grid index, evicting least recently used locations if a bound is exceeded.
+        The most recently stored frame is always kept, even if it alone exceeds max_bytes.
+        """
+        with self._lock:
+            self._entries[index] = df
+            self._entries.move_to_end(index)
+            self._sizes[index] = self._sizeof(df)
+            self._evict()
+
+    def _evict(self):
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries or sum(self._sizes.values()) > self.max_bytes
+        ):
+            index, _ = self._entries.popitem(last=False)
+            del self._sizes[index]
+            self.evictions += 1
+
+    def clear(self):
+        """Remove every cached location."""
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+
+    def stats(self) -> dict:
+        """
+        Return cache statistics.
+
+        :return: Dictionary with hits, misses, evictions, number of entries and memory used in bytes.
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": sum(self._sizes.values())
+            }
@@ -1,4 +1,5 @@
 import boto3
+from botocore.config import Config
 from botocore.exceptions import BotoCoreError, ClientError
 import pandas as pd
 import numpy as np
@@ -7,14 +8,36 @@ import gzip
 import pickle
 import os
 import json
+import uuid
+import asyncio
+import threading
+import weakref
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from importlib.resources import files
 from io import BytesIO
 from scipy.spatial import cKDTree
 from tqdm import tqdm
+import pyarrow as pa
+import pyarrow.parquet as pq
+from .air_density import PRESSURE_PREFIX, TEMPERATURE_PREFIX, air_density, bracketing_levels, interpolate_levels
+from .cache import ResultCache, LocationCache
+from .cost import TABLE_LAYOUTS, ScanCostEstimator, format_bytes
+from .interpolation import interpolate_profile
+from .location_index import LocationIndex, hex_codes_to_int
+from .spatial_index import MAX_SNAP_DISTANCE_KM, SpatialIndex
+from .query_builder import QueryPlan
+from .region import Region
+from .spatial_interpolation import DEFAULT_NEIGHBOURS, blend, blend_directions, interpolation_weights
+from .streaming import iter_csv_chunks, iter_parquet_batches
+
+class _DryRunStop(BaseException):
+    """Raised inside `client_base.dry_run` to stop a call before it reaches Athena. Not an Exception, so callers that wrap errors do not catch it."""
+
 
 class client_base:
     
-    def __init__(self, config_path=None, data :str = None):
+    def __init__(self, config_path=None, data :str = None, lazy: bool = False):
 
         # Parameter validation for config_path
         if config_path is None:
@@ -38,7 +61,9 @@ class client_base:
         
         # Load configuration from a file if provided
         self.config = self._load_config(config_path)
-        self.s3 = boto3.client('s3', region_name=self.config.get('region_name'))
+        # One pooled S3 client is shared by all threads (parallel downloads, concurrent result fetches).
+        self.s3 = boto3.client('s3', region_name=self.config.get('region_name'),
+                               config=Config(max_pool_connections=self.config.get('max_pool_connections', 32)))
         self.bucket_name = self.config.get('bucket_name')
         self.athena = boto3.client('athena', region_name=self.config.get('region_name'))
         self.database = self.config.get('database')
@@ -51,25 +76,65 @@ class client_base:
         # Path for location index file for era5 data
         if self.data == 'era5':
             self.era5_preprocessed_file_path = str(files('windwatts_data').joinpath('data/era5_location_data.pkl.gz'))
+        # Path prefix of the memory-mapped location index (<prefix>_lat.npy, <prefix>_lon.npy, <prefix>_index.npy),
+        # preferred over the pickled GeoDataFrame when present.
+        self.location_index_prefix = self.config.get(
+            'location_index_prefix', str(files('windwatts_data').joinpath(f'data/{self.data}_location'))
+        )
 
         # Load athena table
         self.default_athena_table_name = self.config.get('athena_table_name')
         self.alt_athena_table_name = self.config.get('alt_athena_table_name')
         self.athena_table_name = self.default_athena_table_name
         self.athena_workgroup=self.config.get('athena_workgroup')
-        self.location_gdf = None
-        self.kdtree = None
-        self.column_mapping=None
-        self.column_names = self._initialize_column_names()
-        self._load_preprocessed_data()
-        self._initialize_column_mapping()
-        self.build_kdtree()
+        self.result_cache = None
+        # Statistics (e.g. DataScannedInBytes) of the last query executed in Athena
+        self.last_query_statistics : dict = None
+        # Scan budgets in bytes (None disables a budget) and bytes scanned by the queries of this client so far
+        self.max_bytes_per_query = self.config.get('max_bytes_per_query')
+        self.max_bytes_per_session = self.config.get('max_bytes_per_session')
+        self.session_bytes_scanned = 0
+        # Estimated bytes of submitted queries whose statistics are not recorded yet
+        self._session_bytes_reserved = 0
+        self._statistics_lock = threading.Lock()
+        self._dry_run_estimates = None
+        if self.config.get('result_cache_dir'):
+            self.enable_result_cache(
+                self.config['result_cache_dir'],
+                ttl_seconds=self.config.get('result_cache_ttl_seconds', 7 * 24 * 3600),
+                max_bytes=self.config.get('result_cache_max_bytes', 1024 ** 3)
+            )
+        self._location_index = None
+        self._location_gdf = None
+        self._kdtree = None
+        self._spatial_index = None
+        self._column_mapping = None
+        self._column_names = None
+        self.schema_cache_path = self.config.get(
+            'schema_cache_path', os.path.join(os.path.expanduser('~'), '.cache', 'windwatts_data', 'schema_cache.json')
+        )
+        # Path prefix of the persisted spatial index, built from the location index on first use if missing.
+        self.spatial_index_prefix = self.config.get(
+            'spatial_index_prefix', os.path.join(os.path.expanduser('~'), '.cache', 'windwatts_data', f'{self.data}_spatial')
+        )
+        # In lazy mode the schema, location index and spatial index are only loaded when first needed.
+        self.lazy = lazy or self.config.get('lazy_init', False)
+        if not self.lazy:
+            self.column_names = self._load_column_names()
+            self._load_preprocessed_data()
+            self._initialize_column_mapping()
+            self._load_spatial_index()
 
         # vars for caching
         self.df : pd.DataFrame = None
         self.current_lat : float = None 
         self.current_long : float = None
+        self.current_index : str = None
         self.current_height : int = None
+        self.location_cache = LocationCache(
+            max_entries=self.config.get('location_cache_max_entries', 32),
+            max_bytes=self.config.get('location_cache_max_bytes', 512 * 1024 ** 2)
+        )
 
         # average types
         self.valid_avg_types: list[str] = []
@@ -80,6 +145,138 @@ class client_base:
         with open(config_path, 'r') as f:
             return json.load(f)
     
+    def enable_result_cache(self, cache_dir: str, ttl_seconds: float = 7 * 24 * 3600, max_bytes: int = 1024 ** 3) -> ResultCache:
+        """
+        Enable the persistent on-disk cache for query results returned as DataFrames.
+        Can also be enabled through the config keys result_cache_dir, result_cache_ttl_seconds and result_cache_max_bytes.
+
+        :param cache_dir: Directory to store cached results in.
+        :type cache_dir: str
+        :param ttl_seconds: Time to live of cached results in seconds. Default is 7 days.
+        :type ttl_seconds: float
+        :param max_bytes: Size cap of the cache in bytes, enforced with LRU eviction. Default is 1 GiB.
+        :type max_bytes: int
+        :return: The result cache used by the client.
+        :rtype: ResultCache
+        """
+        self.result_cache = ResultCache(cache_dir, ttl_seconds=ttl_seconds, max_bytes=max_bytes)
+        return self.result_cache
+    
+    @property
+    def column_names(self) -> list[str]:
+        """Column names of the Athena table, loaded on first access."""
+        if self._column_names is None:
+            self._column_names = self._load_column_names()
+        return self._column_names
+
+    @column_names.setter
+    def column_names(self, value: list[str]):
+        self._column_names = value
+
+    @property
+    def column_mapping(self) -> dict:
+        """Column names grouped by height, built on first access."""
+        if self._column_mapping is None:
+            self._initialize_column_mapping()
+        return self._column_mapping
+
+    @column_mapping.setter
+    def column_mapping(self, value: dict):
+        self._column_mapping = value
+
+    @property
+    def location_index(self) -> LocationIndex:
+        """Grid locations as (memory-mapped) columnar arrays, loaded from the package on first access."""
+        if self._location_index is None:
+            self._load_preprocessed_data()
+        return self._location_index
+
+    @property
+    def location_gdf(self):
+        """
+        Locations of the grid as a DataFrame with index, latitude and longitude columns (a GeoDataFrame if geopandas
+        is installed), built from the location index on first access.
+        """
+        if self._location_gdf is None:
+            self._location_gdf = self.location_index.to_frame()
+        return self._location_gdf
+
+    @location_gdf.setter
+    def location_gdf(self, value):
+        self._location_gdf = value
+
+    @property
+    def spatial_index(self) -> SpatialIndex:
+        """Great-circle nearest neighbour index over the grid locations, loaded or built on first access."""
+        if self._spatial_index is None:
+            self._load_spatial_index()
+        return self._spatial_index
+
+    @property
+    def kdtree(self) -> cKDTree:
+        """
+        KDTree over (longitude, latitude) in degrees, built on first access. Kept for compatibility;
+        nearest-location lookups use `spatial_index`, which ranks locations by great-circle distance.
+        """
+        if self._kdtree is None:
+            self.build_kdtree()
+        return self._kdtree
+
+    @kdtree.setter
+    def kdtree(self, value: cKDTree):
+        self._kdtree = value
+
+    def _schema_cache_key(self) -> str:
+        return f"{self.database}.{self.athena_table_name}"
+
+    def _read_schema_cache(self) -> dict:
+        try:
+            with open(self.schema_cache_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _load_column_names(self) -> list[str]:
+        """
+        Column names from the local schema cache, or from a DESCRIBE query whose result is then cached.
+        The cache is a JSON file keyed by database and table name (config key `schema_cache_path`).
+        """
+        cached = self._read_schema_cache().get(self._schema_cache_key())
+        if cached:
+            return list(cached)
+
+        column_names = self._initialize_column_names()
+        if self.schema_cache_path:
+            schema = self._read_schema_cache()
+            schema[self._schema_cache_key()] = column_names
+            tmp_path = f"{self.schema_cache_path}.{os.getpid()}.tmp"
+            try:
+                os.makedirs(os.path.dirname(self.schema_cache_path) or '.', exist_ok=True)
+                with open(tmp_path, 'w') as f:
+                    json.dump(schema, f, indent=2)
+                os.replace(tmp_path, self.schema_cache_path)
+            except OSError as e:
+                print(f"Failed to write schema cache '{self.schema_cache_path}': {e}")
+        return column_names
+
+    def refresh_schema(self) -> list[str]:
+        """
+        Re-run the DESCRIBE query, e.g. after the table definition changed, and update the schema cache.
+
+        :return: The column names of the table.
+        :rtype: list[str]
+        """
+        schema = self._read_schema_cache()
+        if schema.pop(self._schema_cache_key(), None) is not None:
+            try:
+                with open(self.schema_cache_path, 'w') as f:
+                    json.dump(schema, f, indent=2)
+            except OSError as e:
+                print(f"Failed to write schema cache '{self.schema_cache_path}': {e}")
+        self._column_mapping = None
+        self.column_names = self._load_column_names()
+        return self.column_names
+
     def _initialize_column_names(self):
         """
         Run the DESCRIBE query once during initialization to get column names.
@@ -121,84 +318,540 @@ class client_base:
     def _load_preprocessed_data(self):
         """
         Load the location index data with respect to the data source from package.
+        The memory-mapped .npy location index is used when available; otherwise the pickled GeoDataFrame is loaded,
+        which requires geopandas.
         """
-        if self.location_gdf is None:
-            if self.data == 'wtk':
-                with gzip.open(self.wtk_preprocessed_file_path, 'rb') as f:
-                    self.location_gdf = pickle.load(f)
-            elif self.data == 'era5':
-                with gzip.open(self.era5_preprocessed_file_path, 'rb') as f:
-                    self.location_gdf = pickle.load(f)
-            else:
-                raise Exception("Location index file for {self.data} is not yet available in this package.")
+        if self._location_index is not None:
+            return
+        if LocationIndex.exists(self.location_index_prefix):
+            self._location_index = LocationIndex.load(self.location_index_prefix)
+            return
+        if self.data == 'wtk':
+            with gzip.open(self.wtk_preprocessed_file_path, 'rb') as f:
+                self._location_gdf = pickle.load(f)
+        elif self.data == 'era5':
+            with gzip.open(self.era5_preprocessed_file_path, 'rb') as f:
+                self._location_gdf = pickle.load(f)
+        else:
+            raise Exception(f"Location index file for {self.data} is not yet available in this package.")
+        self._location_index = LocationIndex.from_frame(self._location_gdf)
 
     def build_kdtree(self):
-        """Precompute KDTree for fast nearest neighbor search."""
-        if self.kdtree is None:
-            coords = np.vstack((self.location_gdf.geometry.x, self.location_gdf.geometry.y)).T
-            self.kdtree = cKDTree(coords)
-        
-    def find_nearest_location(self, user_lat, user_long):
+        """Precompute KDTree over (longitude, latitude) in degrees."""
+        if self._kdtree is None:
+            self._kdtree = cKDTree(self.location_index.coordinates())
+
+    def _load_spatial_index(self):
+        """
+        Load the persisted spatial index, or build it from the location index and persist it
+        to `spatial_index_prefix` when it is missing or was built from a different location index,
+        as told by the checksum of the location index stored with it.
         """
-        Find the nearest location using a KDTree for extremely fast searches.
+        if self._spatial_index is not None:
+            return
+        if SpatialIndex.exists(self.spatial_index_prefix):
+            spatial_index = SpatialIndex.load(self.spatial_index_prefix)
+            if spatial_index.source == self.location_index.checksum():
+                self._spatial_index = spatial_index
+                return
+        self._spatial_index = SpatialIndex.build(self.location_index)
+        try:
+            self._spatial_index.save(self.spatial_index_prefix)
+        except OSError as e:
+            print(f"Could not persist spatial index to {self.spatial_index_prefix}: {str(e)}")
+
+    def find_nearest_location(self, user_lat, user_long, return_distance: bool = False):
+        """
+        Find the nearest location by great-circle distance.
         :param user_lat: User's latitude
         :param user_long: User's longitude
-        :return: The indexes of the n nearest locations.
+        :param return_distance: If True, also return the distance to the location in km.
+        :return: The index of the nearest location, or a tuple (index, distance_km) if return_distance is True.
         """
-        if self.location_gdf is None:
-            self._load_preprocessed_data()
-        
-        if self.kdtree is None:
-            self.build_kdtree()
-        
-        _, nearest_idx = self.kdtree.query([user_long, user_lat])
-        
-        return self.location_gdf.iloc[nearest_idx]['index']
+        distances, positions = self.spatial_index.query(user_lat, user_long, k=1)
+        index = str(self.location_index.index_codes(positions[0, 0]))
+        if return_distance:
+            return index, float(distances[0, 0])
+        return index
     
-    def find_n_nearest_locations(self, user_lat, user_long, n):
+    def find_n_nearest_locations(self, user_lat, user_long, n, return_distance: bool = False):
         """
-        Find the n nearest locations using a KDTree for extremely fast searches.
+        Find the n nearest locations by great-circle distance.
         :param user_lat: User's latitude
         :param user_long: User's longitude
         :param n: Number of nearest locations/indexes to find.
-        :return: The indexes of the n nearest locations.
+        :param return_distance: If True, also return the distances to the locations in km.
+        :return: The indexes of the n nearest locations, nearest first, or a tuple (indexes, distances_km)
+            if return_distance is True.
         """
-        if self.location_gdf is None:
-            self._load_preprocessed_data()
+        distances, positions = self.spatial_index.query(user_lat, user_long, k=n)
+        indexes = self.location_index.index_codes(positions[0]).tolist()
+        if return_distance:
+            return indexes, distances[0].tolist()
+        return indexes
+    
+    def find_nearest_locations_bulk(self, lats, longs, k: int = 1, max_distance_km: float = MAX_SNAP_DISTANCE_KM) -> dict:
+        """
+        Find the nearest grid locations of many coordinates in one call, e.g. to snap a table of sites to grid indexes.
 
-        if self.kdtree is None:
-            self.build_kdtree()
-        
-        # Query KDTree for the N nearest neighbors
-        _, nearest_idxs = self.kdtree.query([user_long, user_lat], k=n)  # k=N for multiple nearest
+        :param lats: Latitudes (array-like).
+        :type lats: numpy.ndarray
+        :param longs: Longitudes (array-like), aligned with `lats`.
+        :type longs: numpy.ndarray
+        :param k: Number of nearest locations per coordinate. Default is 1.
+        :type k: int
+        :param max_distance_km: Coordinates whose nearest location is farther than this are flagged as outside
+            the grid domain. Default is about 2.93 km: half the diagonal of a 4 km WTK-LED grid cell, the farthest a
+            point inside the domain can be from its nearest location, plus a 0.1 km margin. None disables the check.
+        :type max_distance_km: float
+        :return: Dictionary of arrays: 'index' (grid index codes), 'distance_km', 'latitude' and 'longitude'
+            (of the grid locations), each of shape (n,) for k=1 or (n, k) nearest first, and 'in_domain' of shape (n,).
+        :rtype: dict
+        """
+        if max_distance_km is not None and max_distance_km <= 0:
+            raise ValueError("max_distance_km must be positive.")
+        distances, positions = self.spatial_index.query(lats, longs, k=k)
+        if max_distance_km is None:
+            in_domain = np.ones(len(distances), dtype=bool)
+        else:
+            in_domain = distances[:, 0] <= max_distance_km
+        if k == 1:
+            distances, positions = distances[:, 0], positions[:, 0]
+        return {
+            'index': self.location_index.index_codes(positions),
+            'distance_km': distances,
+            'latitude': np.asarray(self.location_index.latitudes[positions], dtype=np.float64),
+            'longitude': np.asarray(self.location_index.longitudes[positions], dtype=np.float64),
+            'in_domain': in_domain
+        }
 
-        return self.location_gdf.iloc[nearest_idxs]['index'].tolist()
-    
+    def _find_nearest_indexes(self, user_lats, user_longs) -> np.ndarray:
+        """
+        Vectorized nearest grid index lookup for arrays of coordinates with a single spatial index query.
 
-    def query_athena(self, query_string, convert_to_dataframe=True, return_result_location=False, reduce_poll=False) -> pd.DataFrame:
+        :param user_lats: Array of latitudes.
+        :param user_longs: Array of longitudes, aligned with `user_lats`.
+        :return: Array of grid index codes, one per coordinate.
         """
-        Executes an Athena query and fetches results as a Pandas DataFrame or raw data.
+        _, positions = self.spatial_index.query(user_lats, user_longs, k=1)
+        return self.location_index.index_codes(positions[:, 0])
+
+    def _apply_location_filter(self, plan: QueryPlan, lat: float, long: float, n_nearest: int = 1) -> QueryPlan:
+        """
+        Restrict a query plan to the grid index (or the n nearest grid indexes) of a coordinate.
+
+        :raises ValueError: If no nearest location is found.
+        """
+        if n_nearest == 1:
+            indexes = [self.find_nearest_location(lat, long)]
+        else:
+            indexes = self.find_n_nearest_locations(lat, long, n_nearest)
+        if not indexes or not all(indexes):
+            raise ValueError("No valid nearest location found.")
+        return plan.where_in('index', indexes)
+
+    def find_indexes_in_region(self, region) -> np.ndarray:
+        """
+        Grid index codes of all locations inside a bounding box or polygon, resolved locally from the location index.
+
+        :param region: Bounding box (min_long, min_lat, max_long, max_lat), list of (long, lat) polygon vertices,
+            GeoJSON Polygon/MultiPolygon, shapely geometry or Region.
+        :return: Array of grid index codes.
+        :rtype: numpy.ndarray
+        """
+        region = Region.parse(region)
+        mask = region.contains(self.location_index.latitudes, self.location_index.longitudes)
+        return self.location_index.index_codes(np.flatnonzero(mask))
+
+    def _apply_region_filter(self, plan: QueryPlan, region) -> QueryPlan:
+        """
+        Restrict a query plan to the grid indexes inside a region, as a filter on the index partition.
+
+        :raises ValueError: If the region contains no grid location.
+        """
+        indexes = self.find_indexes_in_region(region)
+        if len(indexes) == 0:
+            raise ValueError("No grid locations found within the given region.")
+        print(f"Region contains {len(indexes)} grid locations.")
+        return plan.where_in('index', indexes)
+
+    @staticmethod
+    def _validate_region(region, lat, long):
+        if region is not None and (lat is not None or long is not None):
+            raise ValueError("Specify either 'lat' and 'long' or 'region', not both.")
+
+    def query_athena_split(self, plan: QueryPlan, column: str = 'index', max_values: int = None, unload: bool = False,
+                           chunksize: int = None, reduce_poll: bool = False):
+        """
+        Executes a query plan with a large IN filter (e.g. the grid indexes of a region) as several concurrent queries
+        of at most `max_values` values each, keeping every part small enough for Athena and partition pruning effective.
+
+        Rows of non-aggregating plans are concatenated. Aggregating plans are run as partial aggregates (AVG as SUM and
+        COUNT) that are combined locally, so AVG, SUM, COUNT, MIN and MAX results equal those of a single query.
+        Plans grouped by `column` are split as they are, since each group lies in one part, so any aggregate
+        (e.g. APPROX_PERCENTILE) can be used. Ordering and limit are applied to the combined result.
+
+        :param plan: The query plan.
+        :type plan: QueryPlan
+        :param column: The IN filter column to split. Default is 'index'.
+        :type column: str
+        :param max_values: Maximum number of values per query. Defaults to the `max_indexes_per_query` config key or 5000.
+        :type max_values: int or None
+        :param unload: If True, queries are executed as UNLOAD to Parquet, see `query_athena`.
+        :type unload: bool
+        :param chunksize: If given, a generator of DataFrames with at most `chunksize` rows is returned instead.
+        :type chunksize: int or None
+        :return: A pandas DataFrame, or a generator of DataFrames if chunksize is given.
+        :rtype: pandas.DataFrame
+        :raises ValueError: If the plan aggregates with a function that cannot be combined from partial results.
+        """
+        max_values = max_values or self.config.get('max_indexes_per_query', 5000)
+        values = plan.filter_values(column)
+        if values is None or len(values) <= max_values:
+            if chunksize:
+                return self.query_athena_iter(plan, chunksize=chunksize, unload=unload, reduce_poll=reduce_poll)
+            return self.query_athena(plan, unload=unload, reduce_poll=reduce_poll)
+
+        if (plan.aggregated or plan.group_by) and column not in plan.group_by:
+            result_df = plan.combine_partials(self.query_athena_many(plan.split_partial(column, max_values), unload=unload))
+        elif chunksize and not plan.order_by and plan.limit is None:
+            parts = plan.split(column, max_values)
+            # Dry run and budget checks of all parts happen now; the parts then run one after another as they are consumed
+            self._check_dry_run(parts)
+            plans = [query for part in parts for query in self._plans_within_budget(part)]
+            return self._stream_query_results(plans, chunksize, unload, False, reduce_poll)
+        else:
+            frames = self.query_athena_many(plan.split(column, max_values), unload=unload)
+            result_df = plan.finish_locally(pd.concat(frames, ignore_index=True))
+
+        if chunksize:
+            return self._frame_chunks(result_df, chunksize)
+        return result_df
+
+    @staticmethod
+    def _frame_chunks(df: pd.DataFrame, chunksize: int):
+        return (df.iloc[start:start + chunksize] for start in range(0, len(df), chunksize))
+
+    def _interpolation_neighbours(self, lats, longs, method: str = 'idw', n_nearest: int = None, idw_power: float = 2.0) -> tuple:
+        """
+        Nearest grid locations of every site and their interpolation weights.
+
+        :param method: 'idw' or 'bilinear'.
+        :param n_nearest: Number of neighbours per site. Defaults to 4 for IDW and 8 for bilinear.
+        :return: Tuple of (n_sites, k) grid index codes and (n_sites, k) weights.
+        :rtype: tuple
+        """
+        if method not in DEFAULT_NEIGHBOURS:
+            raise ValueError(f"Parameter 'interpolation' must be one of {list(DEFAULT_NEIGHBOURS)}, got '{method}'.")
+        k = n_nearest or DEFAULT_NEIGHBOURS[method]
+        if not isinstance(k, int) or not (1 <= k <= 16):
+            raise ValueError("Parameter 'n_nearest' must be an integer between 1 and 16.")
+        lats, longs = np.atleast_1d(np.asarray(lats, dtype=np.float64)), np.atleast_1d(np.asarray(longs, dtype=np.float64))
+        distances, positions = self.spatial_index.query(lats, longs, k=k)
+        weights = interpolation_weights(
+            method, lats, longs, self.location_index.latitudes[positions], self.location_index.longitudes[positions],
+            distances, power=idw_power
+        )
+        return self.location_index.index_codes(positions), weights
+
+    def blend_by_index(self, df: pd.DataFrame, codes: np.ndarray, weights: np.ndarray, key_columns: list[str],
+                       value_columns: list[str]) -> pd.DataFrame:
+        """
+        Blend the rows of neighbouring grid locations into one row per site and key (e.g. timestamp), vectorized
+        over sites and keys. Columns starting with 'winddirection' are blended as unit vectors. Missing neighbour
+        values are skipped and the remaining weights renormalized.
+
+        :param df: Rows with an 'index' column, the key columns and the value columns.
+        :type df: pandas.DataFrame
+        :param codes: (n_sites, k) grid index codes of the neighbours of every site.
+        :type codes: numpy.ndarray
+        :param weights: (n_sites, k) weights of the neighbours.
+        :type weights: numpy.ndarray
+        :param key_columns: Columns identifying a row of a location, e.g. ['year', 'time_index'].
+        :type key_columns: list[str]
+        :param value_columns: Columns to blend.
+        :type value_columns: list[str]
+        :return: A pandas DataFrame with a 'site' column (position of the site in the input), the key columns and the
+            blended value columns, sorted by site and keys.
+        :rtype: pandas.DataFrame
+        """
+        # Grid index codes decode to integers, which factorize much faster than strings
+        cells, cell_ids = pd.factorize(hex_codes_to_int(df['index']))
+        # Neighbours without rows point to an extra all-missing row
+        site_cells = pd.Index(cell_ids).get_indexer(hex_codes_to_int(np.asarray(codes).ravel())).reshape(np.shape(codes))
+        site_cells[site_cells < 0] = len(cell_ids)
+
+        # Factorize the key columns one at a time and combine their codes; a MultiIndex would build a tuple per row
+        key_codes, key_values = [], []
+        for column in key_columns:
+            column_codes, column_values = pd.factorize(df[column], sort=True)
+            key_codes.append(column_codes)
+            key_values.append(column_values)
+        shape = [len(values) for values in key_values]
+        combined = np.ravel_multi_index(key_codes, shape) if key_columns else np.zeros(len(df), dtype=np.int64)
+        times, time_ids = pd.factorize(combined, sort=True)
+        n_sites, n_times = len(site_cells), len(time_ids)
+
+        positions = np.unravel_index(np.tile(time_ids, n_sites), shape) if key_columns else ()
+        result = pd.DataFrame({'site': np.repeat(np.arange(n_sites), n_times)})
+        for column, values, position in zip(key_columns, key_values, positions):
+            result[column] = values[position]
+        for column in value_columns:
+            values = np.full((len(cell_ids) + 1, n_times), np.nan)
+            values[cells, times] = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=np.float64)
+            blend_values = blend_directions if column.startswith('winddirection') else blend
+            result[column] = blend_values(values, site_cells, weights).ravel()
+        return result
+
+    def _blend_statistic(self, plan: QueryPlan, result_df: pd.DataFrame, codes: np.ndarray, weights: np.ndarray) -> pd.DataFrame:
+        """
+        Blend the per-index result of an aggregating plan grouped by index into the statistic at a site. Exact for SUM
+        and for AVG over complete series, since both are linear in the blended values.
+        """
+        keys = [key for key in plan.output_keys() if key != 'index']
+        values = [alias for _, _, alias in plan.aggregates]
+        blended = self.blend_by_index(result_df, codes, weights, keys, values)
+        columns = [column for column in result_df.columns if column != 'index']
+        return plan.finish_locally(blended[columns])
+
+    def _fetch_interpolated_timeseries(self, lats, longs, columns: list[str], key_columns: list[str], years: list[int] = None,
+                                       method: str = 'idw', n_nearest: int = None, idw_power: float = 2.0,
+                                       varset: str = 'all') -> pd.DataFrame:
+        """
+        Fetch the series of the neighbours of all sites with chunked `index IN (...)` queries and blend them per site.
+        """
+        lats, longs = np.atleast_1d(np.asarray(lats, dtype=np.float64)), np.atleast_1d(np.asarray(longs, dtype=np.float64))
+        if lats.shape != longs.shape or lats.ndim != 1 or len(lats) == 0:
+            raise ValueError("Parameters 'lats' and 'longs' must be non-empty 1-D arrays of the same length.")
+        codes, weights = self._interpolation_neighbours(lats, longs, method, n_nearest, idw_power)
+
+        plan = QueryPlan(self.default_athena_table_name, columns + key_columns + ['index'])
+        if years:
+            plan.where_in("year", years)
+        plan.where_in("index", np.unique(codes))
+        if varset:
+            plan.where_in("varset", varset)
+        result_df = self.query_athena_split(plan)
+        return self.blend_by_index(result_df, codes, weights, key_columns, columns)
+
+    def fetch_data_for_indexes(self, indexes, columns: list[str] = None, max_indexes_per_query: int = 500):
+        """
+        Fetch timeseries data for many grid indexes, grouping them into a few `index IN (...)` queries that run concurrently.
+
+        :param indexes: Grid index codes to fetch. Duplicates are fetched once.
+        :type indexes: list[str]
+        :param columns: Columns to select. If None, all columns are fetched. The index column is always included.
+        :type columns: list[str] or None
+        :param max_indexes_per_query: Maximum number of indexes per Athena query. Default is 500.
+        :type max_indexes_per_query: int
+        :return: Generator yielding one pandas DataFrame per query, in the order the queries finish.
+        :rtype: Iterator[pandas.DataFrame]
+        """
+        if not isinstance(max_indexes_per_query, int) or max_indexes_per_query < 1:
+            raise ValueError("Parameter 'max_indexes_per_query' must be a positive integer.")
+
+        plan = QueryPlan(self.default_athena_table_name, ['*'] if columns is None else list(dict.fromkeys(columns + ['index'])))
+        plan.where_in('index', indexes)
+        queries = plan.split('index', max_indexes_per_query) if plan.in_filters['index'] else []
+
+        for future in as_completed(self.submit_queries(queries)):
+            yield future.result()
+
+
+    def _record_query_statistics(self, statistics: dict, reserved: int = 0):
+        """Record the statistics of a finished query, replacing the bytes reserved for it by the bytes it scanned."""
+        with self._statistics_lock:
+            self.last_query_statistics = statistics
+            self._session_bytes_reserved -= reserved
+            if statistics:
+                self.session_bytes_scanned += statistics.get('DataScannedInBytes', 0)
+
+    def _reserve_session_budget(self, queries: list) -> list:
+        """
+        Reserve the estimated scan of a batch of queries against the session budget before any of them is sent.
+        The batch is checked as a whole, together with the reservations of queries still running, so queries
+        submitted together or streamed later cannot exceed the budget in sum.
+
+        :return: Bytes reserved per query, aligned with `queries` (0 for plain SQL or without a session budget).
+            Each reservation is released when the statistics of its query are recorded or the query does not run.
+        :raises RuntimeError: If the batch would take the session over its budget.
+        """
+        if self.max_bytes_per_session is None:
+            return [0] * len(queries)
+        estimator = self._scan_cost_estimator()
+        reservations = [estimator.estimate(query)['bytes_scanned'] if isinstance(query, QueryPlan) else 0 for query in queries]
+        total = sum(reservations)
+        with self._statistics_lock:
+            committed = self.session_bytes_scanned + self._session_bytes_reserved
+            if committed + total > self.max_bytes_per_session:
+                raise RuntimeError(
+                    f"{'Query' if len(queries) == 1 else f'{len(queries)} queries'} would scan about {format_bytes(total)}, "
+                    f"but only {format_bytes(max(self.max_bytes_per_session - committed, 0))} of the session budget "
+                    f"of {format_bytes(self.max_bytes_per_session)} is left."
+                )
+            self._session_bytes_reserved += total
+        return reservations
+
+    def _release_session_budget(self, reserved: int):
+        """Release bytes reserved for queries that did not run."""
+        if reserved:
+            with self._statistics_lock:
+                self._session_bytes_reserved -= reserved
+
+    def _table_layout(self) -> dict:
+        """Partition layout of the table (see cost.TABLE_LAYOUTS), with the config keys scan_bytes_per_file and scan_years applied."""
+        layout = dict(TABLE_LAYOUTS['hourly' if 'time_index' in self.column_names else '1224'])
+        if self.config.get('scan_bytes_per_file'):
+            layout['bytes_per_file'] = self.config['scan_bytes_per_file']
+        if self.config.get('scan_years'):
+            layout['years'] = self.config['scan_years']
+        return layout
+
+    def _table_years(self, years: list[int] = None) -> list[int]:
+        """The given years, or all years of the table if None, e.g. to expand time filters into range predicates."""
+        return years or [int(year) for year in self._table_layout()['years']]
+
+    def _scan_cost_estimator(self) -> ScanCostEstimator:
+        return ScanCostEstimator(self._table_layout(), len(self.location_index), self.column_names)
+
+    def estimate_query_cost(self, plan: QueryPlan) -> dict:
+        """
+        Estimate bytes scanned and cost of a query plan without running it, from the year/varset/index partition
+        layout and typical file sizes of the table (about 28 KB per 1224 file, 1.3 MB per hourly Parquet file).
+        File sizes and available years can be overridden with the `scan_bytes_per_file` and `scan_years` config keys.
+
+        :param plan: The query plan to estimate.
+        :type plan: QueryPlan
+        :return: Dictionary with files, years, n_indexes, bytes_scanned, bytes_billed and cost_usd.
+        :rtype: dict
+        """
+        if not isinstance(plan, QueryPlan):
+            raise TypeError("Parameter 'plan' must be a QueryPlan.")
+        return self._scan_cost_estimator().estimate(plan)
+
+    def set_scan_budget(self, max_bytes_per_query: int = None, max_bytes_per_session: int = None):
+        """
+        Limit the bytes Athena may scan. Queries estimated above `max_bytes_per_query` are split into one query per year
+        when that brings every part under the limit, and refused otherwise. Queries that would take the bytes scanned by
+        this client over `max_bytes_per_session` are refused; queries submitted together are checked and refused as a
+        batch, and their estimates count against the budget from submission until their actual scan is recorded.
+        Budgets can also be set with the config keys of the same name.
+
+        :param max_bytes_per_query: Maximum estimated bytes scanned by a single Athena query, or None for no limit.
+        :type max_bytes_per_query: int or None
+        :param max_bytes_per_session: Maximum bytes scanned by this client in total, or None for no limit.
+        :type max_bytes_per_session: int or None
+        """
+        for name, value in (('max_bytes_per_query', max_bytes_per_query), ('max_bytes_per_session', max_bytes_per_session)):
+            if value is not None and (not isinstance(value, (int, float)) or value <= 0):
+                raise ValueError(f"Parameter '{name}' must be a positive number or None.")
+        self.max_bytes_per_query = max_bytes_per_query
+        self.max_bytes_per_session = max_bytes_per_session
+
+    @contextmanager
+    def dry_run(self):
+        """
+        Context manager that estimates the queries a call would run instead of running them.
+
+        Example::
+
+            with client.dry_run() as estimates:
+                client.fetch_windspeed_map(height=100, year=2018, month=1, day=1, hour=0)
+            print(estimates[0]['cost_usd'])
+
+        :return: List that receives one estimate (see `estimate_query_cost`, plus the query text) per query.
+            Queries given as plain SQL strings cannot be estimated and are recorded with only their text.
+        """
+        estimates = []
+        self._dry_run_estimates = estimates
+        try:
+            yield estimates
+        except _DryRunStop:
+            pass
+        finally:
+            self._dry_run_estimates = None
+
+    def _check_dry_run(self, queries: list):
+        if self._dry_run_estimates is None:
+            return
+        for query in queries:
+            estimate = self.estimate_query_cost(query) if isinstance(query, QueryPlan) else {}
+            self._dry_run_estimates.append({'query': str(query), **estimate})
+        raise _DryRunStop()
+
+    def _plans_within_budget(self, query, allow_chunking: bool = True) -> list:
+        """
+        Apply the per-query scan budget to a query before it is sent to Athena. The session budget is applied to the
+        resulting batch of queries by `_reserve_session_budget`.
+
+        :return: The queries to run instead: the query itself, or one plan per year if it was chunked.
+        :raises RuntimeError: If the query exceeds the budget and cannot be chunked under it.
+        """
+        if not isinstance(query, QueryPlan) or self.max_bytes_per_query is None:
+            return [query]
+
+        estimator = self._scan_cost_estimator()
+        estimate = estimator.estimate(query)
+        plans = [query]
+        if estimate['bytes_scanned'] > self.max_bytes_per_query:
+            # Rows of different years are independent unless they are aggregated together or globally ordered.
+            chunkable = (
+                allow_chunking and len(estimate['years']) > 1 and query.limit is None and not query.order_by
+                and (not (query.aggregated or query.group_by) or 'year' in query.group_by)
+            )
+            if chunkable:
+                plans = query.copy().where_in('year', estimate['years']).split('year', 1)
+                chunkable = all(estimator.estimate(plan)['bytes_scanned'] <= self.max_bytes_per_query for plan in plans)
+            if not chunkable:
+                raise RuntimeError(
+                    f"Query would scan about {format_bytes(estimate['bytes_scanned'])} "
+                    f"(${estimate['cost_usd']:.4f}), above the per-query budget of {format_bytes(self.max_bytes_per_query)}. "
+                    "Narrow the filters (years, location) or raise the budget with set_scan_budget."
+                )
+            print(f"Query would scan about {format_bytes(estimate['bytes_scanned'])}; running it as {len(plans)} queries, one per year.")
+        return plans
+
+    def _start_query(self, query_string, unload=False) -> tuple:
+        """
+        Starts an Athena query without waiting for it.
 
         :param query_string: The SQL query to execute.
-        :param convert_to_dataframe: If True, converts results into a Pandas DataFrame.
-        :param return_result_location: If True, returns the S3 result location.
-        :param reduce_poll: If True, reduces query status poll time to 0.1 Sec else default is 0.5 Sec.
-        :return: Pandas DataFrame (if convert_to_dataframe=True) or raw results (if False).
-        :raises RuntimeError: If the Athena query fails or encounters an AWS error.
+        :param unload: If True, the query is wrapped in an UNLOAD statement writing Parquet files to the output location.
+        :return: Tuple of the query execution id and the UNLOAD prefix (None if unload is False).
+        """
+        execution_args = dict(
+            QueryString=query_string,
+            QueryExecutionContext={'Database': self.database},
+            ResultConfiguration={'OutputLocation': self.output_location},
+            ResultReuseConfiguration={
+                'ResultReuseByAgeConfiguration': {'Enabled': True, 'MaxAgeInMinutes': 10080}
+            },
+            WorkGroup = self.athena_workgroup
+        )
+        unload_location = None
+        if unload:
+            # UNLOAD writes Parquet files to a fresh prefix; Athena result reuse does not apply to it.
+            unload_location = f"{self.output_location.rstrip('/')}/unload/{uuid.uuid4().hex}/"
+            execution_args['QueryString'] = f"UNLOAD ({query_string}) TO '{unload_location}' WITH (format = 'PARQUET', compression = 'SNAPPY')"
+            del execution_args['ResultReuseConfiguration']
+        response = self.athena.start_query_execution(**execution_args)
+        return response['QueryExecutionId'], unload_location
+
+    def _execute_query(self, query_string, reduce_poll=False, unload=False, reserved: int = 0) -> tuple:
         """
+        Starts an Athena query and waits for it to finish.
 
+        :param query_string: The SQL query to execute.
+        :param reduce_poll: If True, reduces query status poll time to 0.1 Sec else default is 0.5 Sec.
+        :param unload: If True, the query is wrapped in an UNLOAD statement writing Parquet files to the output location.
+        :param reserved: Bytes reserved for the query by `_reserve_session_budget`, released once it finishes.
+        :return: Tuple of the query execution id and the S3 location of the result (CSV file or UNLOAD prefix).
+            The execution statistics (e.g. DataScannedInBytes) are kept in `last_query_statistics`.
+        :raises RuntimeError: If the Athena query fails or is cancelled.
+        """
         try:
             # Start query execution
-            response = self.athena.start_query_execution(
-                QueryString=query_string,
-                QueryExecutionContext={'Database': self.database},
-                ResultConfiguration={'OutputLocation': self.output_location},
-                ResultReuseConfiguration={
-                    'ResultReuseByAgeConfiguration': {'Enabled': True, 'MaxAgeInMinutes': 10080}
-                },
-                WorkGroup = self.athena_workgroup
-            )
-            query_execution_id = response['QueryExecutionId']
+            query_execution_id, unload_location = self._start_query(query_string, unload=unload)
 
             # Poll query status with exponential backoff
             status = 'RUNNING'
@@ -215,48 +868,95 @@ class client_base:
                         time.sleep(wait_time)
                         wait_time = min(wait_time * 2, 5)  # Cap the backoff at 5 seconds
                         pbar.update(1)
+        except BaseException:
+            self._release_session_budget(reserved)
+            raise
+
+        # Handle query completion or failure
+        self._record_query_statistics(response['QueryExecution'].get('Statistics'), reserved)
+        if status == 'SUCCEEDED':
+            result_location = unload_location if unload else response['QueryExecution']['ResultConfiguration']['OutputLocation']
+            return query_execution_id, result_location
+
+        elif status == 'FAILED':
+            error_message = response['QueryExecution']['Status']['StateChangeReason']
+            raise RuntimeError(f"Athena query failed with error: {error_message}")
+
+        elif status == 'CANCELLED':
+            raise RuntimeError("Athena query was cancelled.")
+
+        else:
+            raise RuntimeError(f"Athena query ended with unexpected status: {status}")
+
+    def query_athena(self, query_string, convert_to_dataframe=True, return_result_location=False, reduce_poll=False, unload=False) -> pd.DataFrame:
+        """
+        Executes an Athena query and fetches results as a Pandas DataFrame or raw data.
+
+        :param query_string: The SQL query to execute, or a QueryPlan.
+        :param convert_to_dataframe: If True, converts results into a Pandas DataFrame.
+        :param return_result_location: If True, returns the S3 result location.
+        :param reduce_poll: If True, reduces query status poll time to 0.1 Sec else default is 0.5 Sec.
+        :param unload: If True, the query is wrapped in an UNLOAD statement writing Parquet files to the output location,
+            which are read column-wise with typed dtypes instead of parsing the CSV result. Recommended for results with millions of rows.
+        :return: Pandas DataFrame (if convert_to_dataframe=True) or raw results (if False).
+        :raises RuntimeError: If the Athena query fails or encounters an AWS error.
+        """
+        self._check_dry_run([query_string])
+        plan = query_string
+        query_string = str(query_string)
+
+        # Serve repeated queries from the local result cache without any AWS round trip
+        cache_key = None
+        if self.result_cache is not None and convert_to_dataframe:
+            cache_key = self.result_cache.make_key(query_string, self.athena_table_name, self.athena_workgroup)
+            cached_df = self.result_cache.get(cache_key)
+            if cached_df is not None:
+                return cached_df
+
+        plans = self._plans_within_budget(plan, allow_chunking=convert_to_dataframe)
+        if len(plans) > 1:
+            df = pd.concat(self.query_athena_many(plans, unload=unload), ignore_index=True)
+            if cache_key is not None:
+                self.result_cache.put(cache_key, df, query_string)
+            return df
+
+        if unload and not convert_to_dataframe:
+            raise ValueError("unload is only supported when convert_to_dataframe is True.")
 
-            # Handle query completion or failure
-            if status == 'SUCCEEDED':
-                result_location = response['QueryExecution']['ResultConfiguration']['OutputLocation']
-
-                # Return S3 location only
-                if return_result_location:
-                    print(f"Query result is stored at: {result_location}.")
-
-                # Handle raw results
-                if not convert_to_dataframe:
-                    paginator = self.athena.get_paginator('get_query_results')
-                    all_rows = []
-                    columns = None
-
-                    for page in paginator.paginate(QueryExecutionId=query_execution_id):
-                        if columns is None:
-                            columns = [col['Label'] for col in page['ResultSet']['ResultSetMetadata']['ColumnInfo']]
-                        all_rows.extend(page['ResultSet']['Rows'])
-
-                    data = [
-                        [field.get('VarCharValue', None) for field in row['Data']]
-                        for row in all_rows
-                    ]
-                    return {'columns': columns, 'data': data}
-
-                # Fetch and process results into a DataFrame
-                bucket, key = result_location.replace("s3://", "").split("/", 1)
-                csv_obj = self.s3.get_object(Bucket=bucket, Key=key)
-                df_chunks = pd.read_csv(BytesIO(csv_obj['Body'].read()), dtype={'index': str}, chunksize=100000)
-                df = pd.concat(df_chunks, ignore_index=True)
-                return df
-
-            elif status == 'FAILED':
-                error_message = response['QueryExecution']['Status']['StateChangeReason']
-                raise RuntimeError(f"Athena query failed with error: {error_message}")
-
-            elif status == 'CANCELLED':
-                raise RuntimeError("Athena query was cancelled.")
+        reserved, = self._reserve_session_budget(plans)
+        try:
+            query_execution_id, result_location = self._execute_query(query_string, reduce_poll=reduce_poll, unload=unload, reserved=reserved)
+
+            # Return S3 location only
+            if return_result_location:
+                print(f"Query result is stored at: {result_location}.")
+
+            # Handle raw results
+            if not convert_to_dataframe:
+                paginator = self.athena.get_paginator('get_query_results')
+                all_rows = []
+                columns = None
+
+                for page in paginator.paginate(QueryExecutionId=query_execution_id):
+                    if columns is None:
+                        columns = [col['Label'] for col in page['ResultSet']['ResultSetMetadata']['ColumnInfo']]
+                    all_rows.extend(page['ResultSet']['Rows'])
+
+                data = [
+                    [field.get('VarCharValue', None) for field in row['Data']]
+                    for row in all_rows
+                ]
+                return {'columns': columns, 'data': data}
 
+            # Fetch and process results into a DataFrame
+            if unload:
+                df = self._read_unload_result(result_location)
             else:
-                raise RuntimeError(f"Athena query ended with unexpected status: {status}")
+                df = self._read_csv_result(result_location)
+
+            if cache_key is not None:
+                self.result_cache.put(cache_key, df, query_string)
+            return df
 
         except (BotoCoreError, ClientError) as e:
             raise RuntimeError(f"AWS error occurred: {e}")
@@ -264,22 +964,254 @@ class client_base:
         except Exception as e:
             raise RuntimeError(f"Unexpected error: {e}")
 
+    def query_athena_iter(self, query_string, chunksize: int = 100000, unload: bool = False, as_arrow: bool = False, reduce_poll: bool = False):
+        """
+        Executes an Athena query and streams the result in chunks instead of materializing it.
+        The result object(s) are read from S3 with ranged GETs, so memory stays bounded by the chunk size.
+
+        :param query_string: The SQL query to execute, or a QueryPlan.
+        :param chunksize: Maximum number of rows per chunk. Default is 100000.
+        :param unload: If True, the query is wrapped in an UNLOAD statement and the Parquet files are streamed by record batch.
+        :param as_arrow: If True, yields pyarrow RecordBatches instead of pandas DataFrames.
+        :param reduce_poll: If True, reduces query status poll time to 0.1 Sec else default is 0.5 Sec.
+        :return: Generator yielding pandas DataFrames (or pyarrow RecordBatches) of at most `chunksize` rows.
+            The dry run and the scan budgets apply when this method is called; the query itself starts on the first chunk requested.
+            Can be passed directly to :func:`windwatts_data.streaming.write_parquet` or :func:`windwatts_data.streaming.write_csv`.
+        :raises RuntimeError: If the Athena query fails or encounters an AWS error.
+        """
+        if not isinstance(chunksize, int) or chunksize < 1:
+            raise ValueError("Parameter 'chunksize' must be a positive integer.")
+
+        # The dry run and the scan budgets are checked here, when the call is made, not on the first next()
+        self._check_dry_run([query_string])
+        plans = self._plans_within_budget(query_string)
+        return self._stream_query_results(plans, chunksize, unload, as_arrow, reduce_poll)
+
+    def _stream_query_results(self, plans: list, chunksize: int, unload: bool, as_arrow: bool, reduce_poll: bool):
+        """
+        Reserve the session budget for all queries now and return a generator running them one after another.
+        The reservations of queries that never run are released when the generator is finished or discarded.
+        """
+        reservations = self._reserve_session_budget(plans)
+        stream = self._iter_query_results(plans, reservations, chunksize, unload, as_arrow, reduce_poll)
+        weakref.finalize(stream, lambda: self._release_session_budget(sum(reservations)))
+        return stream
+
+    def _iter_query_results(self, plans: list, reservations: list, chunksize: int, unload: bool, as_arrow: bool, reduce_poll: bool):
+        """Run the queries of `query_athena_iter` one after another and stream their results."""
+        for query in plans:
+            # _execute_query releases the reservation of the query from here on
+            reserved = reservations.pop(0)
+            try:
+                _, result_location = self._execute_query(str(query), reduce_poll=reduce_poll, unload=unload, reserved=reserved)
+            except (BotoCoreError, ClientError) as e:
+                raise RuntimeError(f"AWS error occurred: {e}")
+
+            bucket, key = result_location.replace("s3://", "").split("/", 1)
+            if unload:
+                chunks = iter_parquet_batches(self.s3, bucket, key, batch_size=chunksize, as_arrow=as_arrow)
+            else:
+                chunks = iter_csv_chunks(self.s3, bucket, key, chunksize=chunksize, as_arrow=as_arrow)
+            yield from chunks
+
+    def submit_queries(self, query_strings: list[str], unload: bool = False, max_workers: int = 8) -> list[Future]:
+        """
+        Starts many Athena queries at once and returns a future per query.
+
+        All queries run concurrently in Athena. A single background thread polls them together with
+        `batch_get_query_execution` and each future is resolved with its DataFrame as soon as its query finishes,
+        so a sweep of many queries takes about as long as the slowest one. Results found in the local result
+        cache resolve immediately.
+
+        :param query_strings: SQL queries (or QueryPlans) to execute.
+        :type query_strings: list[str or QueryPlan]
+        :param unload: If True, queries are executed as UNLOAD to Parquet, see `query_athena`.
+        :type unload: bool
+        :param max_workers: Maximum number of results downloaded in parallel. Default is 8.
+        :type max_workers: int
+        :return: One concurrent.futures.Future per query, in the order of `query_strings`. Use
+            `concurrent.futures.as_completed` to consume results as they finish, or `asyncio.wrap_future` from asyncio code.
+        :rtype: list[concurrent.futures.Future]
+        """
+        if not isinstance(query_strings, list) or not all(isinstance(q, (str, QueryPlan)) for q in query_strings):
+            raise ValueError("Parameter 'query_strings' must be a list of strings or QueryPlans.")
+        self._check_dry_run(query_strings)
+        for query in query_strings:
+            self._plans_within_budget(query, allow_chunking=False)
+        # The whole batch is checked against the session budget and reserved before the first query starts
+        reservations = self._reserve_session_budget(query_strings)
+        query_strings = [str(q) for q in query_strings]
+
+        futures = [Future() for _ in query_strings]
+        pending = {}
+        for future, query_string, reserved in zip(futures, query_strings, reservations):
+            cache_key = None
+            if self.result_cache is not None:
+                cache_key = self.result_cache.make_key(query_string, self.athena_table_name, self.athena_workgroup)
+                cached_df = self.result_cache.get(cache_key)
+                if cached_df is not None:
+                    self._release_session_budget(reserved)
+                    future.set_result(cached_df)
+                    continue
+            try:
+                query_execution_id, unload_location = self._start_query(query_string, unload=unload)
+            except (BotoCoreError, ClientError) as e:
+                self._release_session_budget(reserved)
+                future.set_exception(RuntimeError(f"AWS error occurred: {e}"))
+                continue
+            pending[query_execution_id] = (future, query_string, cache_key, unload_location, reserved)
+
+        if pending:
+            threading.Thread(target=self._resolve_queries, args=(pending, max_workers), daemon=True).start()
+        return futures
+
+    def _resolve_queries(self, pending: dict, max_workers: int):
+        """
+        Poll running queries in batches and resolve their futures as they finish.
+        """
+        def download(future, query_string, cache_key, result_location, unload):
+            try:
+                df = self._read_unload_result(result_location) if unload else self._read_csv_result(result_location)
+                if cache_key is not None:
+                    self.result_cache.put(cache_key, df, query_string)
+                future.set_result(df)
+            except Exception as e:
+                future.set_exception(RuntimeError(f"Failed to fetch query result: {e}"))
+
+        wait_time = 0.1
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while pending:
+                ids = list(pending)
+                try:
+                    executions = []
+                    for start in range(0, len(ids), 50):  # API limit of ids per call
+                        response = self.athena.batch_get_query_execution(QueryExecutionIds=ids[start:start + 50])
+                        executions.extend(response['QueryExecutions'])
+                except (BotoCoreError, ClientError) as e:
+                    for future, *_, reserved in pending.values():
+                        self._release_session_budget(reserved)
+                        future.set_exception(RuntimeError(f"AWS error occurred: {e}"))
+                    return
+
+                for execution in executions:
+                    status = execution['Status']['State']
+                    if status in ['RUNNING', 'QUEUED']:
+                        continue
+                    future, query_string, cache_key, unload_location, reserved = pending.pop(execution['QueryExecutionId'])
+                    self._record_query_statistics(execution.get('Statistics'), reserved)
+                    if status == 'SUCCEEDED':
+                        result_location = unload_location or execution['ResultConfiguration']['OutputLocation']
+                        executor.submit(download, future, query_string, cache_key, result_location, unload_location is not None)
+                    elif status == 'FAILED':
+                        future.set_exception(RuntimeError(f"Athena query failed with error: {execution['Status'].get('StateChangeReason')}"))
+                    elif status == 'CANCELLED':
+                        future.set_exception(RuntimeError("Athena query was cancelled."))
+                    else:
+                        future.set_exception(RuntimeError(f"Athena query ended with unexpected status: {status}"))
+
+                if pending:
+                    time.sleep(wait_time)
+                    wait_time = min(wait_time * 2, 5)  # Cap the backoff at 5 seconds
+
+    def query_athena_many(self, query_strings: list[str], unload: bool = False, max_workers: int = 8) -> list[pd.DataFrame]:
+        """
+        Executes many Athena queries concurrently and returns their results in order.
+
+        :param query_strings: SQL queries to execute.
+        :type query_strings: list[str]
+        :param unload: If True, queries are executed as UNLOAD to Parquet, see `query_athena`.
+        :type unload: bool
+        :param max_workers: Maximum number of results downloaded in parallel. Default is 8.
+        :type max_workers: int
+        :return: One pandas DataFrame per query, in the order of `query_strings`.
+        :rtype: list[pandas.DataFrame]
+        :raises RuntimeError: If any of the queries fails.
+        """
+        return [future.result() for future in self.submit_queries(query_strings, unload=unload, max_workers=max_workers)]
+
+    def query_plans(self, plans: list[QueryPlan], merge_on: str = 'index', unload: bool = False, max_workers: int = 8) -> list[pd.DataFrame]:
+        """
+        Executes many query plans, merging plans that only differ in their filter on `merge_on` into one query.
+
+        For example, the same statistic requested for many single locations runs as one `index IN (...)` query
+        grouped by index instead of one query per location. The merged queries run concurrently.
+
+        :param plans: Query plans to execute.
+        :type plans: list[QueryPlan]
+        :param merge_on: Filter column whose values may differ between merged plans. Default is 'index'.
+        :type merge_on: str
+        :param unload: If True, queries are executed as UNLOAD to Parquet, see `query_athena`.
+        :type unload: bool
+        :param max_workers: Maximum number of results downloaded in parallel. Default is 8.
+        :type max_workers: int
+        :return: One pandas DataFrame per plan, in the order of `plans`.
+        :rtype: list[pandas.DataFrame]
+        """
+        merged = QueryPlan.merge(plans, merge_on)
+        frames = self.query_athena_many([plan for plan, _ in merged], unload=unload, max_workers=max_workers)
+        results = {}
+        for (plan, members), df in zip(merged, frames):
+            for member in members:
+                rows = df
+                if len(members) > 1:
+                    rows = member.select_rows(df, merge_on)
+                    if '*' not in member.select and merge_on not in [item.split(" AS ")[-1] for item in member.select]:
+                        rows = rows.drop(columns=merge_on)
+                results[id(member)] = rows.reset_index(drop=True)
+        return [results[id(plan)] for plan in plans]
+
+    async def query_athena_async(self, query_string: str, unload: bool = False) -> pd.DataFrame:
+        """
+        Awaitable variant of `query_athena` that does not block the event loop while the query runs.
+
+        :param query_string: The SQL query to execute.
+        :param unload: If True, the query is executed as UNLOAD to Parquet.
+        :return: Pandas DataFrame of the query result.
+        """
+        return await asyncio.wrap_future(self.submit_queries([query_string], unload=unload)[0])
+
+    def _read_csv_result(self, result_location: str) -> pd.DataFrame:
+        """
+        Read the CSV result file of a query into one DataFrame.
+
+        :param result_location: S3 location of the CSV result.
+        :return: A pandas DataFrame of the query result.
+        """
+        bucket, key = result_location.replace("s3://", "").split("/", 1)
+        csv_obj = self.s3.get_object(Bucket=bucket, Key=key)
+        df_chunks = pd.read_csv(BytesIO(csv_obj['Body'].read()), dtype={'index': str}, chunksize=100000)
+        return pd.concat(df_chunks, ignore_index=True)
+
+    def _read_unload_result(self, result_location: str) -> pd.DataFrame:
+        """
+        Read the Parquet files written by an UNLOAD query into one DataFrame.
+
+        :param result_location: S3 prefix the UNLOAD query wrote to.
+        :return: A pandas DataFrame with the typed columns of the query result.
+        """
+        bucket, prefix = result_location.replace("s3://", "").split("/", 1)
+        tables = []
+        paginator = self.s3.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+            for obj in page.get('Contents', []):
+                body = self.s3.get_object(Bucket=bucket, Key=obj['Key'])['Body'].read()
+                tables.append(pq.read_table(pa.BufferReader(body)))
+                del body
+
+        if not tables:
+            return pd.DataFrame()
+        return pa.concat_tables(tables).to_pandas()
 
     def get_column_names(self):
         """
         Fucntion to fetch and return column names of the data.
         """
-        if self.column_names is None:
-            self.column_names=self._initialize_column_names()
-        
         return self.column_names
     
     def find_relevant_columns(self,heights,windspeed_interpolation=False):
         """
         Function to fetch columns with adjacent heights for the given heights.
         """
-        if self.column_mapping is None:
-            self._initialize_column_mapping()
         available_heights = sorted(self.column_mapping.keys())  # Get available heights
         relevant_columns = []
 
@@ -313,27 +1245,25 @@ class client_base:
         """
         if df is None:
             raise ValueError("Please provide a pandas dataframe with index column to map it to latitude and longitude.")
-        if self.location_gdf is None:
-            self._load_preprocessed_data()
-        
-        spatial_data = self.location_gdf.set_index('index').loc[df['index']]
-        # Add latitude and longitude to your DataFrame
-        df['latitude'] = spatial_data['latitude'].values
-        df['longitude'] = spatial_data['longitude'].values
+        # Decode the hex index codes and gather coordinates from the location index
+        positions = self.location_index.positions(df['index'])
+        df['latitude'] = np.asarray(self.location_index.latitudes[positions], dtype=np.float64)
+        df['longitude'] = np.asarray(self.location_index.longitudes[positions], dtype=np.float64)
 
         return df
     
-    def _reset_index_(self,lat,long):
+    def _reset_index_(self,lat,long,region=None):
         '''
         Ensures column names are initialized based on query type(location based and non-location based.)
+        Region queries are location based: they filter the index partition of the default table.
         '''
-        if self.column_names is None:
+        if self._column_names is None:
             try:
-                self.column_names = self._initialize_column_names()
+                self.column_names = self._load_column_names()
             except Exception as e:
                 raise RuntimeError("Failed to initialize column names. Check your configuration.") from e
 
-        if lat is not None and long is not None:
+        if (lat is not None and long is not None) or region is not None:
             self.athena_table_name = self.default_athena_table_name
             if 'index' not in self.column_names:
                 self.column_names.append('index')
@@ -346,9 +1276,6 @@ class client_base:
         '''
         returns location_gdf of the respective data to investigate grid locations if needed.
         '''
-        if self.location_gdf is None:
-            self._load_preprocessed_data()
-        
         return self.location_gdf
     
     def pre_check(self, 
@@ -371,17 +1298,91 @@ class client_base:
         if not height or not isinstance(height,int):
             raise TypeError("Parameter height of int type is required.")
         
+    def _time_key_columns(self) -> list[str]:
+        """
+        Columns that identify a row of a location timeseries: year plus mohr (1224 data) or time_index (hourly data).
+        """
+        if 'time_index' in self.get_column_names():
+            return ['year', 'time_index']
+        return ['year', 'mohr']
+
+    def _columns_for_heights(self, heights: list[int], prefixes: tuple = None) -> list[str]:
+        """
+        Columns needed to serve the given heights, restricted to variables with the given prefixes.
+        Defaults to the windspeed columns of the data source.
+        """
+        if prefixes is None:
+            prefixes = ('windspeed',) if self.data == 'wtk' else ('ws',)
+        return [col for col in self.find_relevant_columns(heights) if col.startswith(prefixes)]
+
+    def _thermodynamic_levels(self, prefix: str) -> dict:
+        """
+        Columns of a thermodynamic variable ('temperature_' or 'pressure_') keyed by height, from `column_mapping`.
+        """
+        return {height: col for height, cols in self.column_mapping.items() for col in cols if col.startswith(prefix)}
+
+    def _air_density_columns(self, heights: list[int]) -> list[str]:
+        """
+        Temperature and pressure columns needed to compute the air density at the given heights, see `bracketing_levels`.
+        """
+        columns = []
+        for prefix in (TEMPERATURE_PREFIX, PRESSURE_PREFIX):
+            levels = self._thermodynamic_levels(prefix)
+            if not levels:
+                raise ValueError(f"The data has no '{prefix}*' columns to compute the air density from.")
+            columns.extend(levels[level] for level in bracketing_levels(list(levels), heights))
+        return columns
+
+    def _hub_height_conditions(self, df: pd.DataFrame, heights: list[int], method: str = 'linear', with_air_density: bool = False) -> tuple:
+        """
+        Windspeed and air density at the given heights in a single pass over the frame.
+
+        The needed windspeed, temperature and pressure columns of `df` are converted to one array once and sliced, so the
+        windspeed profile, temperature (linear in height) and pressure (log-linear in height) are all interpolated
+        from the same array.
+
+        :return: Tuple of (n_rows, n_heights) windspeeds and air densities in kg/m^3, or None if `with_air_density` is False.
+        :rtype: tuple
+        """
+        needed = self._columns_for_heights(heights) + (self._air_density_columns(heights) if with_air_density else [])
+        groups = {}
+        for prefix in ('windspeed_', TEMPERATURE_PREFIX, PRESSURE_PREFIX):
+            levels = sorted((int(col[len(prefix):-1]), col) for col in needed if col.startswith(prefix))
+            if levels:
+                groups[prefix] = levels
+        columns = [col for levels in groups.values() for _, col in levels]
+        values = df[columns].to_numpy(dtype=np.float64)
+
+        arrays, start = {}, 0
+        for prefix, levels in groups.items():
+            arrays[prefix] = (values[:, start:start + len(levels)], [height for height, _ in levels])
+            start += len(levels)
+
+        windspeeds = interpolate_profile(*arrays['windspeed_'], heights, method=method)
+        if not with_air_density:
+            return windspeeds, None
+        temperature = interpolate_levels(*arrays[TEMPERATURE_PREFIX], heights)
+        pressure = interpolate_levels(*arrays[PRESSURE_PREFIX], heights, log=True)
+        return windspeeds, air_density(temperature, pressure)
+
     def fetch_data(self,
         lat: float = None,
-        long: float = None) -> bool:
+        long: float = None,
+        columns: list[str] = None) -> bool:
         """
         Fetch timeseries data for all years for a given location from s3 using athena.
+        Frames are cached per grid index in `location_cache`, so coordinates snapping to an already fetched grid cell are served from memory.
 
         :param lat: Latitude of the location. This parameter is required.
         :type lat: float
         :param long: Longitude of the location. This parameter is required.
         :type long: float
-        :return: A pandas DataFrame containing all the columns(e.g. windspeed_30m, windspeed_100m, winddirection_30m, winddirection_100m, year, varset, index).
+        :param columns: Columns to fetch. The time key columns (year, mohr/time_index) and index are always included.
+            If None, all columns are fetched. If the cached frame for the location lacks some of the columns,
+            only the missing ones are fetched and joined onto it.
+        :type columns: list[str] or None
+        :return: True if `self.df` now holds a different location than before, False if it was already loaded.
+            `self.df` is a copy of the cached frame, so it can be modified freely; it is a pandas DataFrame containing the requested columns(e.g. windspeed_30m, windspeed_100m, winddirection_30m, winddirection_100m, year, varset, index).
         :rtype: bool
         """
         
@@ -390,66 +1391,51 @@ class client_base:
     
         if long is None or not isinstance(long, (float, int)):
             raise ValueError("Longitude (long) is required and must be a float or int.")
+
+        if columns is not None and (not isinstance(columns, list) or not all(isinstance(col, str) for col in columns)):
+            raise ValueError("Parameter 'columns' must be a list of column names.")
         
-        # Prevent re-fetching if the coordinates are the same and data is already loaded when fetch_data is directly called.
-        if self.df is not None and self.current_lat == lat and self.current_long == long:
-            print("Data is already up-to-date for these coordinates.")
-            return False
+        index = self.find_nearest_location(lat, long)
+        key_columns = self._time_key_columns()
+
+        df = self.location_cache.get(index)
+        fetched = df is None
+        if df is not None:
+            missing_columns = [] if columns is None else [col for col in columns if col not in df.columns]
+            # A full frame is required but only a projection is cached.
+            if columns is None and not set(self.get_column_names()) <= set(df.columns):
+                missing_columns = [col for col in self.get_column_names() if col not in df.columns]
         
         self._reset_index_(lat,long)
 
-        query = f"SELECT * FROM {self.athena_table_name} WHERE 1=1"
-        query += f" AND index in ('{self.find_nearest_location(lat, long)}')"
-        print(f"Fetching data for coordinated ({lat},{long})")
-        df = self.query_athena(query, reduce_poll=True)
+        if df is None:
+            select = ['*'] if columns is None else list(dict.fromkeys(columns + key_columns + ['index']))
+            query = QueryPlan(self.athena_table_name, select).where_in('index', index)
+            print(f"Fetching data for coordinated ({lat},{long})")
+            df = self.query_athena(query, reduce_poll=True)
+            self.location_cache.put(index, df)
+        elif missing_columns:
+            # Widen the cached projection with only the columns that are still missing.
+            query = QueryPlan(self.athena_table_name, list(dict.fromkeys(missing_columns + key_columns))).where_in('index', index)
+            print(f"Fetching columns {missing_columns} for coordinated ({lat},{long})")
+            extra_df = self.query_athena(query, reduce_poll=True)
+            df = df.merge(extra_df, on=key_columns, how='left')
+            self.location_cache.put(index, df)
+            fetched = True
 
-        self.df = df
+        is_new_location = self.df is None or self.current_index != index
+        requested_columns = self.get_column_names() if columns is None else columns
+        if not is_new_location and not fetched and set(requested_columns) <= set(self.df.columns):
+            # Keep the loaded frame, with any interpolated columns, if the coordinates snap to the same grid cell.
+            print("Data is already up-to-date for these coordinates.")
+        else:
+            # A private copy, so columns added to self.df (e.g. by interpolate_windspeed) never change the cached frame.
+            self.df = df.copy()
         self.current_lat = lat
         self.current_long = long
+        self.current_index = index
 
-        return True
-    
-    def _prepare_df_for_aggregation(self, lat: float, long: float, height: int, avg_type: str) -> bool:
-        """
-        Centralized logic for all fetch_*_avg_at_height methods.
-        Handles pre-checks, interpolation, and resets.
-
-        :param avg_type: One of the supported aggregation types for the client.
-        :return: Whether new data was fetched.
-        """
-        self.pre_check(lat, long, height)
-        self.reset_averages_if_height_changes(height)
-
-        # ✅ Validate avg_type using client-provided valid_avg_types
-        if avg_type not in self.valid_avg_types:
-            raise ValueError(f"Aggregation type '{avg_type}' is not supported for data source '{self.data}'.")
-
-        try:
-            is_data_fetched = self.fetch_data(lat, long)
-        except Exception as e:
-            self.df = None
-            raise RuntimeError("Failed to fetch timeseries data.") from e
-
-        if self.df is None or self.df.empty:
-            raise RuntimeError("No data available after fetching.")
-        
-        if self.data == 'wtk':
-            if f'windspeed_{height}m' not in self.df.columns:
-                self.interpolate_windspeed(height)
-        elif self.data == 'era5':
-            if f'ws{height}' not in self.df.columns:
-                self.interpolate_windspeed(height)
-
-        if avg_type == 'global' and not is_data_fetched and self.global_avg is not None:
-            return False
-        if avg_type == 'yearly' and not is_data_fetched and self.yearly_avg is not None:
-            return False
-        if avg_type == 'monthly' and not is_data_fetched and self.monthly_avg is not None:
-            return False
-        if avg_type == 'hourly' and not is_data_fetched and self.hourly_avg is not None:
-            return False
-
-        return True
+        return is_new_location
     
     def reset_averages_if_height_changes(self, height: int):
         """
@@ -468,22 +1454,27 @@ class client_base:
                 self.hourly_avg = None
             self.current_height = height  # Update stored height
     
-    def fetch_df(self, lat: float, long: float, height: int = None) -> pd.DataFrame:
+    def fetch_df(self, lat: float, long: float, height=None) -> pd.DataFrame:
         """
-        Returns timeseries data for the given location and optionally interpolates at height.
+        Returns timeseries data for the given location and optionally interpolates at height(s).
 
         :param lat: Latitude.
         :param long: Longitude.
-        :param height: Optional hub height.
+        :param height: Optional hub height or list of hub heights. Missing heights are interpolated together in one pass.
         :return: DataFrame with windspeed columns.
         """
-        if self.df is None or self.current_lat != lat or self.current_long != long:
+        if height is None:
             self.fetch_data(lat, long)
+            return self.df
+
+        heights = height if isinstance(height, list) else [height]
+        # Only the columns bracketing the requested heights are fetched (or added to the cached frame).
+        self.fetch_data(lat, long, columns=self._columns_for_heights(heights))
         if self.data == 'wtk':
-            if height is not None and f'windspeed_{height}m' not in self.df.columns:
-                self.interpolate_windspeed(height)
+            missing_heights = [h for h in heights if f'windspeed_{h}m' not in self.df.columns]
         elif self.data == 'era5':
-            if height is not None and f'ws{height}' not in self.df.columns:
-                self.interpolate_windspeed(height)
+            missing_heights = [h for h in heights if f'ws{h}' not in self.df.columns]
+        if missing_heights:
+            self.interpolate_windspeed(missing_heights)
         
-        return self.df
\ No newline at end of file
+        return self.df
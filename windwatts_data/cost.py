@@ -0,0 +1,89 @@
+import math
+from .query_builder import QueryPlan
+
+# Athena pricing: $5 per TB scanned, at least 10 MB billed per query, rounded up to the next MB.
+PRICE_PER_TB = 5.0
+MIN_BYTES_PER_QUERY = 10 * 1024 ** 2
+BYTES_PER_TB = 1024 ** 4
+
+PARTITION_COLUMNS = ('year', 'varset', 'index')
+
+# Storage layout of the WTK-LED tables: one file per (year, varset, index) partition.
+# 1224 files are gzipped CSV, which Athena reads in full; hourly files are Parquet, which are read column-wise.
+TABLE_LAYOUTS = {
+    '1224': {'format': 'csv.gz', 'bytes_per_file': 28 * 1024, 'years': list(range(2001, 2021))},
+    'hourly': {'format': 'parquet', 'bytes_per_file': int(1.3 * 1024 ** 2), 'years': [2018]},
+}
+
+
+class ScanCostEstimator:
+    """
+    Predicts the bytes Athena scans for a QueryPlan from the partition layout of the table.
+
+    Partition filters on year and index determine how many files a query reads; locations are never pruned
+    for the alt tables or for queries without a location filter. For Parquet tables only the referenced
+    columns are read, which is approximated as the referenced share of the file size.
+    """
+
+    def __init__(self, layout: dict, n_locations: int, columns: list[str]):
+        """
+        :param layout: Dictionary with 'format', 'bytes_per_file' and 'years', see TABLE_LAYOUTS.
+        :type layout: dict
+        :param n_locations: Number of grid locations (index partitions) in the table.
+        :type n_locations: int
+        :param columns: Column names of the table, including partition columns.
+        :type columns: list[str]
+        """
+        if layout.get('format') not in ('csv.gz', 'parquet'):
+            raise ValueError(f"Unknown table format: {layout.get('format')}")
+        self.layout = layout
+        self.n_locations = n_locations
+        self.columns = list(columns)
+        self.data_columns = [col for col in self.columns if col not in PARTITION_COLUMNS]
+
+    def years(self, plan: QueryPlan) -> list[int]:
+        """Years of the table a plan reads."""
+        available = [int(year) for year in self.layout['years']]
+        selected = plan.filter_values('year')
+        if selected is None:
+            return available
+        return [year for year in available if str(year) in selected]
+
+    def estimate(self, plan: QueryPlan) -> dict:
+        """
+        Estimate the scan of a query plan.
+
+        :param plan: The query plan.
+        :type plan: QueryPlan
+        :return: Dictionary with the number of files read, estimated bytes scanned, bytes billed
+            (at least 10 MB) and cost in USD.
+        :rtype: dict
+        """
+        years = self.years(plan)
+        indexes = plan.filter_values('index')
+        n_indexes = self.n_locations if indexes is None else len(indexes)
+        files = len(years) * n_indexes
+
+        bytes_per_file = self.layout['bytes_per_file']
+        if self.layout['format'] == 'parquet' and '*' not in plan.select and self.data_columns:
+            referenced = plan.referenced_columns(self.data_columns)
+            bytes_per_file *= max(len(referenced), 1) / len(self.data_columns)
+
+        bytes_scanned = int(files * bytes_per_file)
+        bytes_billed = max(math.ceil(bytes_scanned / 1024 ** 2) * 1024 ** 2, MIN_BYTES_PER_QUERY)
+        return {
+            "files": files,
+            "years": years,
+            "n_indexes": n_indexes,
+            "bytes_scanned": bytes_scanned,
+            "bytes_billed": bytes_billed,
+            "cost_usd": bytes_billed / BYTES_PER_TB * PRICE_PER_TB
+        }
+
+
+def format_bytes(n: float) -> str:
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(n) < 1024:
+            return f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TB"
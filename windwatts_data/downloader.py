@@ -0,0 +1,183 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+from botocore.exceptions import BotoCoreError, ClientError
+
+PARQUET_OUTPUT_FORMATS = {'parquet': 'parquet', 'feather': 'feather', 'csv.gz': 'csv.gz', 'csv': 'csv'}
+
+
+class Manifest:
+    """
+    JSON record of completed downloads in a local directory, used to resume interrupted downloads.
+    Each entry maps an S3 key to the local path, size and ETag of the downloaded object.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                print(f"Ignoring unreadable manifest: {path}")
+
+    def is_complete(self, s3_key: str, etag: str, local_path: str) -> bool:
+        entry = self.entries.get(s3_key)
+        return (
+            entry is not None
+            and entry.get('etag') == etag
+            and entry.get('local_path') == local_path
+            and os.path.exists(local_path)
+            and os.path.getsize(local_path) == entry.get('local_size')
+        )
+
+    def record(self, s3_key: str, etag: str, size: int, local_path: str):
+        with self._lock:
+            self.entries[s3_key] = {
+                'etag': etag,
+                'size': size,
+                'local_path': local_path,
+                'local_size': os.path.getsize(local_path)
+            }
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.entries, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+
+def download_objects(s3, bucket: str, tasks: list, local_dir: str, max_workers: int = 8, max_retries: int = 3,
+                     transform=None, extra_args: dict = None) -> list[str]:
+    """
+    Download many S3 objects concurrently with retries, skipping objects that are already present locally.
+
+    A `manifest.json` in `local_dir` records every completed download with the object's ETag, so an interrupted
+    run can be resumed by calling this function again with the same tasks. Files without a manifest entry are also
+    skipped when they were downloaded unchanged (`transform` is None) and their size matches the S3 object.
+
+    :param s3: boto3 S3 client shared by all worker threads.
+    :param bucket: Bucket to download from.
+    :param tasks: List of (s3_key, local_file_name) tuples.
+    :param local_dir: Directory the files are written to.
+    :param max_workers: Maximum number of concurrent downloads. Default is 8.
+    :param max_retries: Number of retries per object with exponential backoff. Default is 3.
+    :param transform: Optional callable(body: bytes, local_path: str) that writes the object to local_path itself,
+        e.g. to convert its format. If None, the object is streamed to disk unchanged.
+    :param extra_args: Extra arguments passed to the S3 calls, e.g. {'RequestPayer': 'requester'}.
+    :return: Local file paths of the objects that are available after the run, in the order of `tasks`.
+    :rtype: list[str]
+    """
+    extra_args = extra_args or {}
+    manifest = Manifest(os.path.join(local_dir, 'manifest.json'))
+
+    def fetch(task):
+        s3_key, file_name = task
+        local_path = os.path.join(local_dir, file_name)
+        for attempt in range(max_retries + 1):
+            try:
+                head = s3.head_object(Bucket=bucket, Key=s3_key, **extra_args)
+                etag, size = head['ETag'], head['ContentLength']
+
+                if manifest.is_complete(s3_key, etag, local_path):
+                    print(f"Skipping {s3_key}, already downloaded: {local_path}")
+                    return local_path
+                if transform is None and os.path.exists(local_path) and os.path.getsize(local_path) == size:
+                    print(f"Skipping {s3_key}, already present: {local_path}")
+                    manifest.record(s3_key, etag, size, local_path)
+                    return local_path
+
+                print(f"Downloading {s3_key} from S3...")
+                tmp_path = f"{local_path}.part"
+                if transform is None:
+                    s3.download_file(bucket, s3_key, tmp_path, ExtraArgs=extra_args or None)
+                    os.replace(tmp_path, local_path)
+                else:
+                    body = s3.get_object(Bucket=bucket, Key=s3_key, **extra_args)['Body'].read()
+                    transform(body, tmp_path)
+                    os.replace(tmp_path, local_path)
+                manifest.record(s3_key, etag, size, local_path)
+                print(f"Downloaded: {local_path}")
+                return local_path
+            except (BotoCoreError, ClientError, OSError) as e:
+                missing = isinstance(e, ClientError) and e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', '403', 'AccessDenied')
+                if missing or attempt == max_retries:
+                    print(f"Failed to download {s3_key}: {str(e)}")
+                    return None
+                time.sleep(0.5 * 2 ** attempt)
+            except Exception as e:
+                print(f"Failed to process {s3_key}: {str(e)}")
+                return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(fetch, tasks))
+
+    return [path for path in results if path is not None]
+
+
+def parquet_transform(output_format: str):
+    """
+    Return the `transform` for `download_objects` that converts a downloaded Parquet object to `output_format`.
+
+    :param output_format: One of 'parquet', 'feather', 'csv.gz' or 'csv'.
+    :raises ValueError: If the output format is unknown.
+    :return: None for 'parquet', which streams the object to disk without decoding it, otherwise a callable.
+    """
+    if output_format not in PARQUET_OUTPUT_FORMATS:
+        raise ValueError(f"Output format must be one of {list(PARQUET_OUTPUT_FORMATS)}, got '{output_format}'.")
+    if output_format == 'parquet':
+        return None
+
+    def transform(body: bytes, local_path: str):
+        table = pq.read_table(pa.BufferReader(body))
+        if output_format == 'feather':
+            feather.write_feather(table, local_path)
+        else:
+            table.to_pandas().to_csv(local_path, index=False, compression='gzip' if output_format == 'csv.gz' else None)
+    return transform
+
+
+def read_local_table(path: str) -> pa.Table:
+    """Read a file written by `download_objects` with one of the PARQUET_OUTPUT_FORMATS."""
+    if path.endswith('.parquet'):
+        return pq.read_table(path)
+    if path.endswith('.feather'):
+        return feather.read_table(path)
+    return pa.Table.from_pandas(pd.read_csv(path), preserve_index=False)
+
+
+def consolidate_dataset(files: list, dataset_dir: str) -> str:
+    """
+    Write downloaded per index-year files into one local Parquet dataset partitioned as year=<year>/index=<index>.
+
+    Files are processed one at a time, so memory stays bounded by the largest single file. Every index-year is
+    written to a fixed file name, so consolidating again (e.g. after resuming a download) replaces rather than
+    duplicates data. The result can be read with `pandas.read_parquet(dataset_dir)` or `pyarrow.dataset.dataset`.
+
+    :param files: List of (local_path, index, year) tuples.
+    :param dataset_dir: Root directory of the dataset. Created if missing.
+    :return: The dataset directory.
+    :rtype: str
+    """
+    partitioning = ds.partitioning(pa.schema([('year', pa.int32()), ('index', pa.string())]), flavor='hive')
+    for local_path, index, year in files:
+        table = read_local_table(local_path)
+        for name in ('year', 'index'):
+            if name in table.column_names:
+                table = table.drop_columns([name])
+        table = table.append_column('year', pa.array([year] * table.num_rows, pa.int32()))
+        table = table.append_column('index', pa.array([index] * table.num_rows, pa.string()))
+        ds.write_dataset(
+            table, dataset_dir, format='parquet', partitioning=partitioning,
+            basename_template=f"{index}_{year}_{{i}}.parquet",
+            existing_data_behavior='overwrite_or_ignore'
+        )
+        print(f"Consolidated {local_path} into {dataset_dir}")
+    return dataset_dir
@@ -0,0 +1,226 @@
+import numpy as np
+import pandas as pd
+
+HOURS_PER_YEAR = 8760
+
+# Reference turbines as (rated power kW, cut-in, rated and cut-out windspeed m/s). Their power curves are
+# idealized: cubic from cut-in to rated speed and constant up to cut-out, see PowerCurve.parametric.
+REFERENCE_TURBINES = {
+    'NREL 5MW': (5000.0, 3.0, 11.4, 25.0),
+    'IEA 3.4MW': (3370.0, 4.0, 9.8, 25.0),
+    'IEA 15MW': (15000.0, 3.0, 10.59, 25.0),
+}
+
+
+class PowerCurve:
+    """
+    Turbine power curve: electrical power (kW) as a piecewise linear function of the hub height windspeed.
+    Power is 0 below the first and above the last windspeed of the table (cut-out).
+    """
+
+    def __init__(self, windspeeds, power_kw, name: str = None, rated_power_kw: float = None):
+        """
+        :param windspeeds: Increasing windspeeds (m/s) of the table.
+        :type windspeeds: list[float] or numpy.ndarray
+        :param power_kw: Power (kW) at each windspeed.
+        :type power_kw: list[float] or numpy.ndarray
+        :param name: Name of the turbine. Optional.
+        :type name: str or None
+        :param rated_power_kw: Rated power (kW) used for capacity factors. Defaults to the maximum of the table.
+        :type rated_power_kw: float or None
+        """
+        self.windspeeds = np.asarray(windspeeds, dtype=np.float64)
+        self.power_kw = np.asarray(power_kw, dtype=np.float64)
+        if self.windspeeds.ndim != 1 or self.windspeeds.shape != self.power_kw.shape or len(self.windspeeds) < 2:
+            raise ValueError("A power curve needs at least 2 windspeeds and as many power values.")
+        if not np.all(np.isfinite(self.windspeeds)) or not np.all(np.isfinite(self.power_kw)):
+            raise ValueError("Power curve windspeeds and power values must be finite numbers.")
+        if np.any(np.diff(self.windspeeds) <= 0):
+            raise ValueError("Power curve windspeeds must be strictly increasing.")
+        if np.any(self.power_kw < 0):
+            raise ValueError("Power curve power values must not be negative.")
+        self.name = name or 'custom'
+        self.rated_power_kw = float(rated_power_kw) if rated_power_kw is not None else float(self.power_kw.max())
+        if self.rated_power_kw <= 0:
+            raise ValueError("Rated power must be positive.")
+
+    def __repr__(self) -> str:
+        return f"PowerCurve(name={self.name!r}, rated_power_kw={self.rated_power_kw:g})"
+
+    @classmethod
+    def parametric(cls, rated_power_kw: float, cut_in: float, rated_speed: float, cut_out: float,
+                   name: str = None, step: float = 0.1) -> 'PowerCurve':
+        """
+        Idealized power curve: P = rated * (v^3 - cut_in^3) / (rated_speed^3 - cut_in^3) between cut-in and rated
+        speed, rated power up to cut-out and 0 outside.
+
+        :param step: Windspeed resolution of the generated table in m/s. Default is 0.1.
+        """
+        if not 0 <= cut_in < rated_speed <= cut_out:
+            raise ValueError("Expected 0 <= cut_in < rated_speed <= cut_out.")
+        ramp = np.append(np.arange(cut_in, rated_speed, step), rated_speed)
+        power = rated_power_kw * (ramp ** 3 - cut_in ** 3) / (rated_speed ** 3 - cut_in ** 3)
+        if cut_out > rated_speed:
+            ramp, power = np.append(ramp, cut_out), np.append(power, rated_power_kw)
+        return cls(ramp, power, name=name, rated_power_kw=rated_power_kw)
+
+    @classmethod
+    def reference(cls, name: str) -> 'PowerCurve':
+        """
+        Power curve of a reference turbine in REFERENCE_TURBINES ('NREL 5MW', 'IEA 3.4MW' or 'IEA 15MW').
+
+        :raises ValueError: If the turbine is unknown.
+        """
+        if name not in REFERENCE_TURBINES:
+            raise ValueError(f"Unknown reference turbine '{name}'. Available turbines: {list(REFERENCE_TURBINES)}.")
+        return cls.parametric(*REFERENCE_TURBINES[name], name=name)
+
+    @classmethod
+    def from_table(cls, table, speed_column: str = 'windspeed', power_column: str = 'power_kw',
+                   name: str = None, rated_power_kw: float = None) -> 'PowerCurve':
+        """
+        Power curve from a table with windspeed and power columns.
+
+        :param table: A pandas DataFrame, a dict of columns or the path of a CSV file.
+        :type table: pandas.DataFrame, dict or str
+        """
+        if isinstance(table, str):
+            table = pd.read_csv(table)
+        table = pd.DataFrame(table).sort_values(speed_column)
+        return cls(table[speed_column].to_numpy(), table[power_column].to_numpy(), name=name, rated_power_kw=rated_power_kw)
+
+    @classmethod
+    def parse(cls, turbine) -> 'PowerCurve':
+        """A PowerCurve, or the reference curve of a turbine name."""
+        if isinstance(turbine, PowerCurve):
+            return turbine
+        if isinstance(turbine, str):
+            return cls.reference(turbine)
+        raise TypeError("Turbines must be PowerCurve instances or names of reference turbines.")
+
+    def power(self, windspeeds) -> np.ndarray:
+        """
+        Power (kW) at the given windspeeds, for arrays of any shape. Missing windspeeds give NaN.
+        """
+        windspeeds = np.asarray(windspeeds, dtype=np.float64)
+        return np.interp(windspeeds, self.windspeeds, self.power_kw, left=0.0, right=0.0)
+
+
+def hours_per_row(year, month=None) -> np.ndarray:
+    """
+    Hours of the period each row stands for: for 12x24 rows (the mean of one hour of day over a month of a year)
+    the number of days of the month, for hourly rows (`month` None) 1.
+    """
+    year = np.asarray(year, dtype=np.int64)
+    if month is None:
+        return np.ones(year.shape)
+    start = ((year - 1970) * 12 + np.asarray(month, dtype=np.int64) - 1).astype('datetime64[M]')
+    return ((start + 1).astype('datetime64[D]') - start.astype('datetime64[D]')).astype(np.float64)
+
+
+def _small_int_codes(values) -> tuple:
+    """Sorted distinct values of a small-range integer array and the code of every element, without sorting."""
+    values = np.asarray(values, dtype=np.int64)
+    low = values.min() if values.size else 0
+    present = np.flatnonzero(np.bincount(values - low))
+    lookup = np.zeros(present[-1] + 1 if present.size else 1, dtype=np.int64)
+    lookup[present] = np.arange(len(present))
+    return present + low, lookup[values - low]
+
+
+def energy_yield(windspeed, year, month, hour, hours, curves: list, groups=None) -> dict:
+    """
+    Gross energy production of power curves over windspeed series, for many groups (e.g. sites) at once.
+
+    Each power curve is evaluated once over all rows, and all sums per group, curve, month and hour are reduced
+    with `numpy.bincount`. Rows are weighted by the hours they stand for, so hourly series (1 hour per row) and
+    12x24 series (month-hour means, each standing for the days of the month) give comparable results. For 12x24 data
+    the power of the mean windspeed is used, which underestimates the energy of a variable wind.
+
+    :param windspeed: Hub height windspeed per row.
+    :param year: Year per row.
+    :param month: Month (1-12) per row.
+    :param hour: Hour of day per row.
+    :param hours: Hours each row stands for, see :func:`hours_per_row`.
+    :param curves: List of PowerCurve.
+    :param groups: Non-negative integer group (e.g. site) code per row. Defaults to a single group.
+    :return: Dictionary of arrays:
+        'aep_kwh' (n_groups, n_curves) mean annual energy, 'capacity_factor' (n_groups, n_curves),
+        'months' and 'hours' (the month and hour values present), 'monthly_kwh' (n_groups, n_curves, n_months) and
+        'hourly_kwh' (n_groups, n_curves, n_hours) mean annual energy per month and per hour of day,
+        'monthly_capacity_factor' and 'hourly_capacity_factor' of the same shapes.
+    :rtype: dict
+    """
+    windspeed = np.asarray(windspeed, dtype=np.float64)
+    hours = np.asarray(hours, dtype=np.float64)
+    groups = np.zeros(windspeed.shape, dtype=np.int64) if groups is None else np.asarray(groups, dtype=np.int64)
+    valid = np.isfinite(windspeed)
+    months, month_codes = _small_int_codes(month)
+    hour_values, hour_codes = _small_int_codes(hour)
+    years, year_codes = _small_int_codes(year)
+
+    n_groups = int(groups.max()) + 1 if groups.size else 1
+    weights = np.where(valid, hours, 0.0)
+    # (n_curves, n_rows) energy of every row in kWh
+    energy = np.stack([np.where(valid, curve.power(windspeed), 0.0) for curve in curves]) * weights
+    rated = np.array([curve.rated_power_kw for curve in curves])
+
+    def reduce(codes: np.ndarray, n_codes: int, values: np.ndarray) -> np.ndarray:
+        # (n_values, n_groups, n_codes) sums of every row of `values`, one bincount each
+        flat = groups * n_codes + codes
+        values = np.atleast_2d(values)
+        sums = [np.bincount(flat, weights=row, minlength=n_groups * n_codes) for row in values]
+        return np.stack(sums).reshape(len(values), n_groups, n_codes)
+
+    # Years with data per group, to turn sums into mean annual values
+    n_years = np.maximum((reduce(year_codes, len(years), weights)[0] > 0).sum(axis=1), 1)
+
+    def mean_annual(codes: np.ndarray, n_codes: int) -> tuple:
+        # (n_groups, n_curves, n_codes) mean annual energy and capacity factor per code
+        energy_sums = reduce(codes, n_codes, energy).transpose(1, 0, 2) / n_years[:, None, None]
+        covered_hours = reduce(codes, n_codes, weights)[0] / n_years[:, None]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return energy_sums, energy_sums / (covered_hours[:, None, :] * rated[None, :, None])
+
+    _, capacity_factor = mean_annual(np.zeros_like(groups), 1)
+    monthly, monthly_capacity_factor = mean_annual(month_codes, len(months))
+    hourly, hourly_capacity_factor = mean_annual(hour_codes, len(hour_values))
+    return {
+        # Mean power over the covered hours extrapolated to a full year, so incomplete years are not penalized
+        'aep_kwh': capacity_factor[:, :, 0] * rated[None, :] * HOURS_PER_YEAR,
+        'capacity_factor': capacity_factor[:, :, 0],
+        'months': months,
+        'hours': hour_values,
+        'monthly_kwh': monthly,
+        'hourly_kwh': hourly,
+        'monthly_capacity_factor': monthly_capacity_factor,
+        'hourly_capacity_factor': hourly_capacity_factor,
+    }
+
+
+def energy_summary(result: dict, curves: list, group: int = 0) -> dict:
+    """
+    Energy yield of one group from :func:`energy_yield` as records, with energies in MWh rounded to 2 decimals
+    and capacity factors rounded to 4.
+
+    :return: Dictionary with 'aep' (turbine, aep_mwh, capacity_factor), 'monthly_energy' and 'hourly_energy'
+        (turbine, month or hour, energy_mwh, capacity_factor) lists.
+    :rtype: dict
+    """
+    def records(key: str, period: str, values: np.ndarray) -> list:
+        return [
+            {"turbine": curve.name, period: int(value),
+             "energy_mwh": round(float(result[f"{key}_kwh"][group, c, i]) / 1000, 2),
+             "capacity_factor": round(float(result[f"{key}_capacity_factor"][group, c, i]), 4)}
+            for c, curve in enumerate(curves) for i, value in enumerate(values)
+        ]
+
+    return {
+        "aep": [
+            {"turbine": curve.name, "aep_mwh": round(float(result['aep_kwh'][group, c]) / 1000, 2),
+             "capacity_factor": round(float(result['capacity_factor'][group, c]), 4)}
+            for c, curve in enumerate(curves)
+        ],
+        "monthly_energy": records('monthly', 'month', result['months']),
+        "hourly_energy": records('hourly', 'hour', result['hours'])
+    }
@@ -0,0 +1,121 @@
+import numpy as np
+
+INTERPOLATION_METHODS = ('linear', 'log', 'power')
+
+def interpolate_profile(values, heights, target_heights, method: str = 'linear') -> np.ndarray:
+    """
+    Interpolate a vertical wind profile at one or many target heights for all rows in a single array operation.
+
+    For every target height the two model heights bracketing it are located once, and the whole column
+    of rows is interpolated with NumPy broadcasting instead of a per-row Python call.
+
+    :param values: Array of shape (n_rows, n_heights) with the variable (e.g. windspeed) at each model height.
+    :type values: numpy.ndarray or pandas.DataFrame
+    :param heights: Model heights aligned with the columns of `values`.
+    :type heights: list[float]
+    :param target_heights: Height or list of heights at which to interpolate.
+    :type target_heights: float or list[float]
+    :param method: Vertical profile used between the two bracketing heights.
+        'linear' interpolates linearly in height, 'log' linearly in ln(height) (log law) and
+        'power' fits the power law exponent from the two bracketing values (falls back to linear where a value is <= 0).
+    :type method: str
+    :raises ValueError: If the method is unknown or a target height is outside the range of model heights.
+    :return: Array of shape (n_rows, n_targets) with the interpolated values.
+    :rtype: numpy.ndarray
+    """
+    if method not in INTERPOLATION_METHODS:
+        raise ValueError(f"Interpolation method must be one of {INTERPOLATION_METHODS}, got '{method}'.")
+
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[:, np.newaxis]
+    heights = np.asarray(heights, dtype=np.float64)
+    targets = np.atleast_1d(np.asarray(target_heights, dtype=np.float64))
+
+    if values.shape[1] != heights.size:
+        raise ValueError(f"Expected {heights.size} value columns for heights {heights.tolist()}, got {values.shape[1]}.")
+
+    order = np.argsort(heights)
+    heights = heights[order]
+    values = values[:, order]
+
+    if targets.min() < heights[0] or targets.max() > heights[-1]:
+        raise ValueError(f"Target heights {targets.tolist()} must lie within model heights {heights.tolist()}.")
+
+    # Single model height: only exact matches are possible.
+    if heights.size == 1:
+        return np.repeat(values, targets.size, axis=1)
+
+    # Index of the bracketing heights for every target, so h1 <= target <= h2.
+    upper = np.clip(np.searchsorted(heights, targets, side='left'), 1, heights.size - 1)
+    lower = upper - 1
+    h1, h2 = heights[lower], heights[upper]
+    w1, w2 = values[:, lower], values[:, upper]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        linear = w1 + (targets - h1) / (h2 - h1) * (w2 - w1)
+        if method == 'linear':
+            return linear
+        if method == 'log':
+            return w1 + np.log(targets / h1) / np.log(h2 / h1) * (w2 - w1)
+
+        # Power law: the shear exponent is derived per row from the two bracketing values.
+        alpha = np.log(w2 / w1) / np.log(h2 / h1)
+        power = w1 * (targets / h1) ** alpha
+        return np.where((w1 > 0) & (w2 > 0), power, linear)
+
+
+def round_half_away(values, decimals: int = 2) -> np.ndarray:
+    """
+    Round half away from zero, like ROUND(x, d) in Athena, instead of half to even like :func:`numpy.round`.
+    Used wherever a value can be computed either locally or in Athena, so both give the same result.
+
+    :param values: Values to round (array-like).
+    :param decimals: Number of decimals. Default is 2.
+    :return: Array of rounded values; NaN stays NaN.
+    :rtype: numpy.ndarray
+    """
+    values = np.asarray(values, dtype=np.float64)
+    factor = 10.0 ** decimals
+    scaled = np.abs(values) * factor
+    rounded = np.floor(scaled)
+    rounded += (scaled - rounded) >= 0.5
+    return np.copysign(rounded / factor, values)
+
+
+def profile_sql_expression(columns: list[str], heights: list[float], target_height: float, method: str = 'linear') -> str:
+    """
+    SQL expression interpolating a vertical profile at one target height from the two bracketing columns, the
+    row-wise equivalent of :func:`interpolate_profile` for aggregations computed in Athena.
+
+    :param columns: Model height columns, e.g. ['windspeed_80m', 'windspeed_100m'].
+    :type columns: list[str]
+    :param heights: Model heights aligned with `columns`.
+    :type heights: list[float]
+    :param target_height: Height at which to interpolate.
+    :type target_height: float
+    :param method: 'linear', 'log' or 'power', see :func:`interpolate_profile`.
+    :type method: str
+    :raises ValueError: If the method is unknown or the target height is outside the range of model heights.
+    :return: SQL expression, e.g. "(windspeed_80m + 0.5 * (windspeed_100m - windspeed_80m))", or the column itself for a model height.
+    :rtype: str
+    """
+    if method not in INTERPOLATION_METHODS:
+        raise ValueError(f"Interpolation method must be one of {INTERPOLATION_METHODS}, got '{method}'.")
+    profile = sorted(zip(heights, columns))
+    for height, column in profile:
+        if height == target_height:
+            return column
+    if not profile[0][0] < target_height < profile[-1][0]:
+        raise ValueError(f"Target height {target_height} must lie within model heights {[h for h, _ in profile]}.")
+
+    upper = next(i for i, (height, _) in enumerate(profile) if height > target_height)
+    (h1, c1), (h2, c2) = profile[upper - 1], profile[upper]
+    linear = f"{c1} + {float((target_height - h1) / (h2 - h1))!r} * ({c2} - {c1})"
+    log_fraction = float(np.log(target_height / h1) / np.log(h2 / h1))
+    if method == 'linear':
+        return f"({linear})"
+    if method == 'log':
+        return f"({c1} + {log_fraction!r} * ({c2} - {c1}))"
+    # w1 * (target / h1) ** alpha with alpha = ln(w2 / w1) / ln(h2 / h1) equals w1 * (w2 / w1) ** log_fraction
+    return f"(CASE WHEN {c1} > 0 AND {c2} > 0 THEN {c1} * power({c2} / {c1}, {log_fraction!r}) ELSE {linear} END)"
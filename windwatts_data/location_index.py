@@ -0,0 +1,248 @@
+import argparse
+import gzip
+import hashlib
+import os
+import pickle
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# File suffixes of the three arrays making up a location index, e.g. data/wtk_location_lat.npy.
+ARRAY_SUFFIXES = {'latitudes': '_lat.npy', 'longitudes': '_lon.npy', 'indexes': '_index.npy'}
+
+# Value of every ASCII byte as a hex digit, -1 for bytes that are not hex digits.
+_HEX_DIGITS = np.full(256, -1, dtype=np.int64)
+for _i, _c in enumerate(b'0123456789abcdef'):
+    _HEX_DIGITS[_c] = _i
+    _HEX_DIGITS[ord(chr(_c).upper())] = _i
+
+
+def _code_bytes(codes):
+    """Flat byte buffer of grid index codes with the start and end offset of every code."""
+    if isinstance(codes, np.ndarray) and codes.dtype.kind == 'S':
+        codes = np.ascontiguousarray(codes).ravel()
+        width = codes.dtype.itemsize
+        data = np.frombuffer(codes.tobytes(), dtype=np.uint8)
+        starts = np.arange(len(codes), dtype=np.int64) * width
+        # Fixed-width bytes are null padded on the right.
+        lengths = (data.reshape(-1, width) != 0).sum(axis=1) if width else np.zeros(len(codes), dtype=np.int64)
+        return data, starts, starts + lengths, np.ones(len(codes), dtype=bool)
+    if isinstance(codes, np.ndarray) and codes.dtype.kind == 'U':
+        codes = codes.ravel()
+    if isinstance(codes, (pa.Array, pa.ChunkedArray)):
+        array = codes
+    else:
+        try:
+            array = pa.array(codes, type=pa.string())
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # e.g. codes without letters that were parsed as integers
+            array = pa.array(np.asarray(codes).astype(str), type=pa.string())
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks()
+    array = array.cast(pa.string())
+    _, offset_buffer, data_buffer = array.buffers()
+    offsets = np.frombuffer(offset_buffer, dtype=np.int32)[array.offset:array.offset + len(array) + 1].astype(np.int64)
+    data = np.frombuffer(data_buffer, dtype=np.uint8) if data_buffer is not None else np.zeros(0, dtype=np.uint8)
+    valid = np.asarray(array.is_valid())
+    return data, offsets[:-1], offsets[1:], valid
+
+
+def hex_codes_to_int(codes) -> np.ndarray:
+    """
+    Decode grid index codes (hex strings of up to 6 characters) to integers. Accepts numpy str, bytes or object
+    arrays, pandas Series and pyarrow arrays; Arrow-backed strings are decoded straight from their buffers.
+
+    :raises ValueError: If a code is longer than 6 characters or is not a hex number.
+    :return: Array of int64 values, -1 for empty or missing codes.
+    """
+    if isinstance(codes, np.ndarray) and codes.dtype.kind == 'O':
+        codes = codes.astype(str)
+    data, starts, ends, valid = _code_bytes(codes)
+    lengths = np.where(valid, ends - starts, 0)
+    if np.any(lengths > 6):
+        raise ValueError("Grid index codes must have at most 6 characters.")
+    if len(data) and np.all(lengths == 6) and np.array_equal(starts, np.arange(len(starts)) * 6 + starts[:1]):
+        raw = data[starts[0]:starts[0] + 6 * len(starts)].reshape(-1, 6)
+    else:
+        # Right-align every code in 6 bytes, padding with '0'.
+        raw = np.full((len(starts), 6), ord('0'), dtype=np.uint8)
+        for j in range(6):
+            source = ends - (6 - j)
+            present = source >= starts
+            raw[present, j] = data[source[present]]
+    digits = _HEX_DIGITS[raw]
+    if np.any(digits < 0):
+        raise ValueError("Grid index codes must be hex numbers.")
+    values = digits @ (16 ** np.arange(5, -1, -1, dtype=np.int64))
+    values[lengths == 0] = -1
+    return values
+
+
+class LocationIndex:
+    """
+    Grid locations stored as columnar arrays: float32 latitudes and longitudes and the 6 character hex
+    grid index as fixed-width bytes (numpy dtype S6), in the same order.
+
+    Loaded with memory mapping, the arrays are read lazily from the .npy files and their pages are shared between
+    processes (e.g. forked web workers), instead of every process unpickling millions of Python objects.
+    """
+
+    def __init__(self, latitudes: np.ndarray, longitudes: np.ndarray, indexes: np.ndarray):
+        """
+        :param latitudes: Latitude of every location.
+        :type latitudes: numpy.ndarray
+        :param longitudes: Longitude of every location.
+        :type longitudes: numpy.ndarray
+        :param indexes: Grid index code of every location, as bytes or strings.
+        :type indexes: numpy.ndarray
+        """
+        if not len(latitudes) == len(longitudes) == len(indexes):
+            raise ValueError("Latitudes, longitudes and indexes must have the same length.")
+        self.latitudes = latitudes
+        self.longitudes = longitudes
+        self.indexes = indexes if indexes.dtype.kind == 'S' else np.char.encode(np.asarray(indexes, dtype=str), 'ascii')
+        self._row_lookup = None
+        self._checksum = None
+
+    def __len__(self) -> int:
+        return len(self.indexes)
+
+    @staticmethod
+    def paths(prefix: str) -> dict:
+        """Paths of the array files of the index stored under `prefix`."""
+        return {name: f"{prefix}{suffix}" for name, suffix in ARRAY_SUFFIXES.items()}
+
+    @classmethod
+    def exists(cls, prefix: str) -> bool:
+        return all(os.path.exists(path) for path in cls.paths(prefix).values())
+
+    @classmethod
+    def load(cls, prefix: str, mmap: bool = True) -> 'LocationIndex':
+        """
+        Load an index written by :meth:`save`.
+
+        :param prefix: Path prefix of the array files.
+        :param mmap: If True (default), the arrays are memory-mapped read-only instead of read into memory.
+        """
+        mmap_mode = 'r' if mmap else None
+        arrays = {name: np.load(path, mmap_mode=mmap_mode) for name, path in cls.paths(prefix).items()}
+        return cls(**arrays)
+
+    def save(self, prefix: str):
+        """Write the arrays as .npy files under `prefix`."""
+        directory = os.path.dirname(prefix)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        np.save(self.paths(prefix)['latitudes'], np.asarray(self.latitudes, dtype=np.float32))
+        np.save(self.paths(prefix)['longitudes'], np.asarray(self.longitudes, dtype=np.float32))
+        np.save(self.paths(prefix)['indexes'], np.asarray(self.indexes, dtype='S6'))
+
+    def checksum(self) -> str:
+        """
+        SHA-256 hex digest of the arrays as they are saved, computed on first call. Identifies the location index
+        that derived data such as a persisted spatial index was built from.
+        """
+        if self._checksum is None:
+            digest = hashlib.sha256()
+            for array, dtype in [(self.latitudes, np.float32), (self.longitudes, np.float32), (self.indexes, 'S6')]:
+                digest.update(np.ascontiguousarray(array, dtype=dtype))
+            self._checksum = digest.hexdigest()
+        return self._checksum
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> 'LocationIndex':
+        """
+        Build an index from a (Geo)DataFrame with an 'index' column and either 'latitude'/'longitude' columns
+        or point geometries.
+        """
+        if 'latitude' in df.columns and 'longitude' in df.columns:
+            latitudes, longitudes = df['latitude'].to_numpy(), df['longitude'].to_numpy()
+        else:
+            latitudes, longitudes = df.geometry.y.to_numpy(), df.geometry.x.to_numpy()
+        return cls(
+            np.asarray(latitudes, dtype=np.float32),
+            np.asarray(longitudes, dtype=np.float32),
+            np.char.encode(df['index'].to_numpy().astype(str), 'ascii').astype('S6')
+        )
+
+    def coordinates(self) -> np.ndarray:
+        """(n, 2) array of longitude/latitude pairs, the axis order used by the KDTree."""
+        return np.column_stack((self.longitudes, self.latitudes))
+
+    def index_codes(self, positions) -> np.ndarray:
+        """Grid index codes as strings for an array of positions."""
+        return self.indexes[positions].astype(str)
+
+    @property
+    def row_lookup(self) -> np.ndarray:
+        """
+        Dense array mapping the integer value of every grid index code to its position, -1 where no location
+        has that code. Built on first access by decoding the hex codes (about 10 MB for the WTK-LED grid).
+        """
+        if self._row_lookup is None:
+            values = hex_codes_to_int(self.indexes)
+            lookup = np.full(int(values.max()) + 1 if len(values) else 0, -1, dtype=np.int32)
+            lookup[values] = np.arange(len(values), dtype=np.int32)
+            self._row_lookup = lookup
+        return self._row_lookup
+
+    def positions(self, codes) -> np.ndarray:
+        """
+        Positions of grid index codes, with a single vectorized gather.
+
+        :param codes: Array-like of grid index codes.
+        :raises KeyError: If a code is not a location of the index.
+        :return: Array of positions.
+        :rtype: numpy.ndarray
+        """
+        values = hex_codes_to_int(codes)
+        lookup = self.row_lookup
+        valid = (values >= 0) & (values < len(lookup))
+        positions = np.full(values.shape, -1, dtype=np.int64)
+        positions[valid] = lookup[values[valid]]
+        if np.any(positions < 0):
+            unknown = np.asarray(codes)[positions < 0]
+            raise KeyError(f"Unknown grid index: {', '.join(map(str, unknown[:5]))}")
+        return positions
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        The locations as a DataFrame with 'index', 'latitude' and 'longitude' columns.
+        If geopandas is installed, a GeoDataFrame with point geometries is returned, matching the pickled location data.
+        """
+        df = pd.DataFrame({
+            'index': self.indexes.astype(str),
+            'latitude': np.asarray(self.latitudes, dtype=np.float64),
+            'longitude': np.asarray(self.longitudes, dtype=np.float64)
+        })
+        try:
+            import geopandas as gpd
+        except ImportError:
+            return df
+        return gpd.GeoDataFrame(df, geometry=gpd.points_from_xy(df['longitude'], df['latitude']), crs='EPSG:4326')
+
+
+def convert_location_pickle(pkl_path: str, prefix: str) -> LocationIndex:
+    """
+    Convert a gzipped pickled location GeoDataFrame (e.g. data/wtk_location_data.pkl.gz) into .npy location index files.
+    Unpickling the source requires geopandas; loading the result does not.
+
+    :param pkl_path: Path of the .pkl.gz file.
+    :param prefix: Path prefix of the output files, e.g. 'windwatts_data/data/wtk_location'.
+    :return: The converted location index.
+    :rtype: LocationIndex
+    """
+    with gzip.open(pkl_path, 'rb') as f:
+        df = pickle.load(f)
+    location_index = LocationIndex.from_frame(df)
+    location_index.save(prefix)
+    print(f"Wrote {len(location_index)} locations to {prefix}{{_lat,_lon,_index}}.npy")
+    return location_index
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Convert a pickled location GeoDataFrame into a memory-mappable location index.")
+    parser.add_argument('pkl_path', help="Path of the .pkl.gz location file.")
+    parser.add_argument('prefix', help="Path prefix of the .npy files to write.")
+    args = parser.parse_args()
+    convert_location_pickle(args.pkl_path, args.prefix)
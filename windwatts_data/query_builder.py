@@ -0,0 +1,440 @@
+import calendar
+import copy
+import hashlib
+import re
+from datetime import datetime, timedelta
+import pandas as pd
+
+# Position of each time component in the YYYYMMDDHH `time_index` of the hourly table, as integer divisors.
+TIME_INDEX_DIVISORS = {'year': 1000000, 'month': 10000, 'day': 100, 'hour': 1}
+TIME_INDEX_LEVELS = ('month', 'day', 'hour')
+
+# Month and hour of the MMHH `mohr` column of the 1224 tables (stored as a string without guaranteed zero padding).
+MOHR_MONTH = "CAST(mohr AS INT) / 100"
+MOHR_HOUR = "CAST(mohr AS INT) % 100"
+
+# The alt tables are not partitioned by index; the index is read from the S3 path of each file instead.
+INDEX_FROM_PATH = "regexp_extract(\"$path\", '.*/index=([^/]+)/.*', 1)"
+
+# Aggregates that can be computed from per-chunk partial results, and the partials each one needs.
+PARTIAL_AGGREGATES = {'AVG': ('SUM', 'COUNT'), 'SUM': ('SUM',), 'COUNT': ('COUNT',), 'MIN': ('MIN',), 'MAX': ('MAX',)}
+
+
+def time_part_expression(part: str, column: str = 'time_index') -> str:
+    """
+    SQL expression extracting a component of the YYYYMMDDHH time index as an integer.
+
+    :param part: One of 'year', 'month', 'day' or 'hour'.
+    :param column: Name of the time index column. Default is 'time_index'.
+    :raises ValueError: If the part is unknown.
+    :return: SQL expression, e.g. "CAST(time_index AS BIGINT) / 10000 % 100" for the month.
+    """
+    if part not in TIME_INDEX_DIVISORS:
+        raise ValueError(f"Time part must be one of {list(TIME_INDEX_DIVISORS)}, got '{part}'.")
+    expression = f"CAST({column} AS BIGINT)"
+    divisor = TIME_INDEX_DIVISORS[part]
+    if divisor > 1:
+        expression += f" / {divisor}"
+    if part != 'year':
+        expression += " % 100"
+    return expression
+
+
+def _hour_ranges(years, months, days, hours, level):
+    """Half-open [start, end) hour ranges selected by the filters down to `level`, merged where contiguous."""
+    step = {'month': None, 'day': timedelta(days=1), 'hour': timedelta(hours=1)}[level]
+    starts = []
+    for year in sorted(set(years)):
+        for month in sorted(set(months or range(1, 13))):
+            if level == 'month':
+                end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+                starts.append((datetime(year, month, 1), end))
+                continue
+            last_day = calendar.monthrange(year, month)[1]
+            for day in sorted(d for d in set(days or range(1, 32)) if d <= last_day):
+                if level == 'day':
+                    start = datetime(year, month, day)
+                    starts.append((start, start + step))
+                    continue
+                for hour in sorted(set(hours or range(24))):
+                    start = datetime(year, month, day, hour)
+                    starts.append((start, start + step))
+
+    ranges = []
+    for start, end in starts:
+        if ranges and ranges[-1][1] == start:
+            ranges[-1] = (ranges[-1][0], end)
+        else:
+            ranges.append((start, end))
+    return ranges
+
+
+def time_filter_predicates(years: list[int] = None, months: list[int] = None, days: list[int] = None,
+                           hours: list[int] = None, column: str = 'time_index', max_ranges: int = 32) -> list[str]:
+    """
+    Build WHERE predicates for month, day and hour filters on the YYYYMMDDHH string time index.
+
+    When the years are known, the selected periods are expressed as sargable range predicates on the raw column
+    (e.g. "time_index >= '2018010100' AND time_index < '2018020100'"), which Athena can push down to the Parquet
+    min/max statistics instead of evaluating an expression on every row. Contiguous periods are merged into one
+    range, and if the finest filter would produce more than `max_ranges` ranges (e.g. a few hours of every day),
+    the ranges are built at the coarser level and the finer component is checked with integer arithmetic.
+
+    Integer arithmetic predicates (CAST({column} AS BIGINT) / ... % ...), which are evaluated on every row, remain in
+    two cases: without years, as ranges cannot be built; callers should pass the years of the table then (the clients
+    use the years listed in cost.TABLE_LAYOUTS). And for a component whose ranges cannot be kept within `max_ranges`
+    even at its own level, e.g. an hours-only filter, which selects one range per hour of every day of every year;
+    the range predicate would then be longer than the scan it saves.
+
+    :param years: Years the query is restricted to, or None.
+    :type years: list[int] or None
+    :param months: Months to keep (1-12), or None for all.
+    :type months: list[int] or None
+    :param days: Days of the month to keep (1-31), or None for all.
+    :type days: list[int] or None
+    :param hours: Hours to keep (0-23), or None for all.
+    :type hours: list[int] or None
+    :param column: Name of the time index column. Default is 'time_index'.
+    :type column: str
+    :param max_ranges: Maximum number of range predicates. Default is 32.
+    :type max_ranges: int
+    :return: List of predicates to be combined with AND. Empty if no time component is filtered.
+    :rtype: list[str]
+    """
+    filters = {'month': months, 'day': days, 'hour': hours}
+    filtered = [level for level in TIME_INDEX_LEVELS if filters[level]]
+    if not filtered:
+        return []
+
+    # Deepest level whose ranges stay within max_ranges; components below it become residual predicates.
+    range_level = None
+    ranges = []
+    if years:
+        levels = TIME_INDEX_LEVELS[TIME_INDEX_LEVELS.index(filtered[0]):TIME_INDEX_LEVELS.index(filtered[-1]) + 1]
+        for level in reversed(levels):
+            ranges = _hour_ranges(years, months, days if level != 'month' else None,
+                                  hours if level == 'hour' else None, level)
+            if len(ranges) <= max_ranges:
+                range_level = level
+                break
+
+    predicates = []
+    if range_level is not None:
+        if not ranges:
+            return ["1=0"]  # e.g. only February 30th was requested
+        range_terms = [
+            f"({column} >= '{start:%Y%m%d%H}' AND {column} < '{end:%Y%m%d%H}')" for start, end in ranges
+        ]
+        predicates.append(range_terms[0] if len(range_terms) == 1 else f"({' OR '.join(range_terms)})")
+        residual = [level for level in filtered if TIME_INDEX_LEVELS.index(level) > TIME_INDEX_LEVELS.index(range_level)]
+    else:
+        residual = filtered
+
+    for level in residual:
+        values = ', '.join(str(value) for value in sorted(set(filters[level])))
+        predicates.append(f"{time_part_expression(level, column)} IN ({values})")
+    return predicates
+
+
+class QueryPlan:
+    """
+    Structured description of a SELECT query against one Athena table.
+
+    A plan keeps the select list, filters, grouping, ordering and limit as separate parts instead of a concatenated
+    string. Filters are rendered in a canonical order and IN lists are sorted and deduplicated, so plans built from
+    the same parameters always render the same SQL and share one cache key. IN filters are kept as values, which lets
+    the partition filters (year, varset, index) be inspected for cost estimation and lets plans that only differ in
+    one IN filter be merged into a single query or a large IN list be split into several.
+    """
+
+    def __init__(self, table: str, select: list[str] = None):
+        """
+        :param table: Athena table to query.
+        :type table: str
+        :param select: Select expressions, optionally with an alias ("expr AS alias").
+        :type select: list[str] or None
+        """
+        if not table:
+            raise ValueError("Parameter 'table' must be a non-empty string.")
+        self.table = table
+        self.select = list(select or [])
+        self.in_filters = {}
+        self.predicates = []
+        self.group_by = []
+        # Tuples of expressions grouped by GROUPING SETS, each combined with the expressions in group_by
+        self.grouping_sets = None
+        self.order_by = []
+        self.limit = None
+        self.aggregated = False
+        # (function, expression, alias) of every aggregate added with add_aggregate
+        self.aggregates = []
+
+    def copy(self) -> 'QueryPlan':
+        return copy.deepcopy(self)
+
+    def add_select(self, expression: str, alias: str = None) -> 'QueryPlan':
+        """Append a select expression, if it is not selected yet."""
+        item = f"{expression} AS {alias}" if alias else expression
+        if item not in self.select:
+            self.select.append(item)
+        return self
+
+    def add_aggregate(self, function: str, expression: str, alias: str = None) -> 'QueryPlan':
+        """Append an aggregate such as AVG(windspeed_100m) to the select list."""
+        self.aggregated = True
+        if (function.upper(), expression, alias) not in self.aggregates:
+            self.aggregates.append((function.upper(), expression, alias))
+        return self.add_select(f"{function}({expression})", alias)
+
+    def where(self, predicate: str) -> 'QueryPlan':
+        """Add a predicate combined with AND."""
+        if predicate not in self.predicates:
+            self.predicates.append(predicate)
+        return self
+
+    def where_in(self, column: str, values, quote: bool = True) -> 'QueryPlan':
+        """
+        Restrict `column` to the given values. Calling it again for the same column keeps the intersection.
+
+        :param column: Column or expression to filter.
+        :param values: Value or iterable of values.
+        :param quote: If True, values are rendered as string literals (partition columns are strings). Default is True.
+        """
+        if isinstance(values, (str, int, float)):
+            values = [values]
+        literals = {f"'{value}'" if quote else str(value) for value in values}
+        if column in self.in_filters:
+            literals &= set(self.in_filters[column])
+        self.in_filters[column] = tuple(sorted(literals))
+        return self
+
+    def group(self, expression: str, alias: str = None) -> 'QueryPlan':
+        """Group by an expression and select it (under `alias` if given)."""
+        self.add_select(expression, alias)
+        if expression not in self.group_by:
+            self.group_by.append(expression)
+        return self
+
+    def group_sets(self, sets: list) -> 'QueryPlan':
+        """
+        Group by GROUPING SETS, so one scan returns the aggregates of several groupings, e.g. [(), ('year',)] for the
+        overall and the yearly rows. The expressions must be selected; GROUPING() tells the rows of the sets apart.
+        Expressions grouped with :meth:`group` are added to every set.
+        """
+        self.aggregated = True
+        self.grouping_sets = [tuple(expressions) for expressions in sets]
+        return self
+
+    def order(self, expression: str, direction: str = 'ASC') -> 'QueryPlan':
+        """
+        Order the result by a selected column or alias.
+
+        :raises ValueError: If the direction is not ASC or DESC, or the column is not selected.
+        """
+        if direction.upper() not in ['ASC', 'DESC']:
+            raise ValueError("Invalid order_direction. Use 'ASC' or 'DESC'.")
+        if expression.lower() not in [item.split(" AS ")[-1].lower() for item in self.select]:
+            raise ValueError(f"The order_by column '{expression}' must be included in the SELECT statement. Here are the selected columns for this query: {', '.join(self.select)}")
+        self.order_by.append(f"{expression} {direction.upper()}")
+        return self
+
+    def limit_to(self, n: int) -> 'QueryPlan':
+        if not isinstance(n, int) or n < 1:
+            raise ValueError("Parameter 'n' must be a positive integer.")
+        self.limit = n
+        return self
+
+    def filter_values(self, column: str) -> list[str]:
+        """
+        Values an IN filter restricts `column` to (without quotes), or None if the column is not filtered.
+        Used to find the partitions (year, varset, index) a query can touch.
+        """
+        if column not in self.in_filters:
+            return None
+        return [literal.strip("'") for literal in self.in_filters[column]]
+
+    def referenced_columns(self, known_columns) -> set:
+        """Names in `known_columns` that the query reads in its select list, filters or grouping."""
+        text = ' '.join(self.select + self.predicates + self.group_by + list(self.in_filters)
+                        + [expression for expressions in self.grouping_sets or [] for expression in expressions])
+        return set(re.findall(r'\b\w+\b', text)) & set(known_columns)
+
+    def _where_terms(self) -> list[str]:
+        terms = []
+        for column in sorted(self.in_filters):
+            literals = self.in_filters[column]
+            if len(literals) == 0:
+                terms.append("1=0")
+            elif len(literals) == 1:
+                terms.append(f"{column} = {literals[0]}")
+            else:
+                terms.append(f"{column} IN ({', '.join(literals)})")
+        return terms + sorted(self.predicates)
+
+    def to_sql(self) -> str:
+        """Render the plan as SQL. Equal plans always render identical text."""
+        if not self.select:
+            raise ValueError("A query plan needs at least one select expression.")
+        query = f"SELECT {', '.join(self.select)} FROM {self.table}"
+        terms = self._where_terms()
+        if terms:
+            query += f" WHERE {' AND '.join(terms)}"
+        if self.grouping_sets is not None:
+            sets = [f"({', '.join(self.group_by + [e for e in expressions if e not in self.group_by])})" for expressions in self.grouping_sets]
+            query += f" GROUP BY GROUPING SETS ({', '.join(sets)})"
+        elif self.group_by:
+            query += f" GROUP BY {', '.join(self.group_by)}"
+        if self.order_by:
+            query += f" ORDER BY {', '.join(self.order_by)}"
+        if self.limit is not None:
+            query += f" LIMIT {self.limit}"
+        return query
+
+    def cache_key(self) -> str:
+        """Stable content hash of the rendered query and its table."""
+        return hashlib.sha256(f"{self.table}\x1f{self.to_sql()}".encode('utf-8')).hexdigest()
+
+    def __str__(self) -> str:
+        return self.to_sql()
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, QueryPlan) and self.to_sql() == other.to_sql()
+
+    def __hash__(self) -> int:
+        return hash(self.to_sql())
+
+    def split(self, column: str, max_values: int) -> list['QueryPlan']:
+        """
+        Split the IN filter on `column` into plans with at most `max_values` values each.
+
+        :raises ValueError: If `column` has no IN filter or max_values is not positive.
+        """
+        if column not in self.in_filters:
+            raise ValueError(f"The plan has no IN filter on '{column}'.")
+        if not isinstance(max_values, int) or max_values < 1:
+            raise ValueError("Parameter 'max_values' must be a positive integer.")
+        literals = self.in_filters[column]
+        plans = []
+        for start in range(0, max(len(literals), 1), max_values):
+            plan = self.copy()
+            plan.in_filters[column] = literals[start:start + max_values]
+            plans.append(plan)
+        return plans
+
+    def output_keys(self) -> list[str]:
+        """Output names of the select items that are not aggregates, i.e. the group keys of an aggregating plan."""
+        aggregates = {f"{function}({expression}) AS {alias}" for function, expression, alias in self.aggregates}
+        return [item.split(" AS ")[-1] for item in self.select if item not in aggregates]
+
+    def split_partial(self, column: str, max_values: int) -> list['QueryPlan']:
+        """
+        Split an aggregating plan like :meth:`split`, computing partial aggregates per part instead of final ones:
+        AVG(x) AS a becomes SUM(x) AS a__sum and COUNT(x) AS a__count, SUM, COUNT, MIN and MAX keep their function
+        under a suffixed alias. Ordering and limit are dropped; :meth:`combine_partials` applies them to the result.
+
+        :raises ValueError: If an aggregate has no alias or cannot be combined from partial results.
+        """
+        partial = self.copy()
+        partial.order_by, partial.limit = [], None
+        for function, expression, alias in self.aggregates:
+            if function not in PARTIAL_AGGREGATES:
+                raise ValueError(f"{function} cannot be combined across partial queries; use one of {list(PARTIAL_AGGREGATES)}.")
+            if not alias:
+                raise ValueError(f"Aggregate {function}({expression}) needs an alias to be combined across partial queries.")
+            partial.select.remove(f"{function}({expression}) AS {alias}")
+            for part in PARTIAL_AGGREGATES[function]:
+                partial.add_select(f"{part}({expression})", f"{alias}__{part.lower()}")
+        return partial.split(column, max_values)
+
+    def combine_partials(self, frames: list) -> pd.DataFrame:
+        """
+        Combine the results of the plans from :meth:`split_partial` into the result of this plan.
+
+        :param frames: One pandas DataFrame per partial plan.
+        :return: A pandas DataFrame with the columns, ordering and limit of this plan.
+        :rtype: pandas.DataFrame
+        """
+        df = pd.concat(frames, ignore_index=True)
+        aggregates = {f"{function}({expression}) AS {alias}": (function, alias) for function, expression, alias in self.aggregates}
+        keys = self.output_keys()
+        groups = df.groupby(keys, dropna=False, sort=False) if keys else df.groupby(lambda _: 0)
+        partials = {
+            'SUM': groups.sum(min_count=1, numeric_only=True),
+            'MIN': groups.min(numeric_only=True),
+            'MAX': groups.max(numeric_only=True)
+        }
+        partials['COUNT'] = partials['SUM']
+
+        result = pd.DataFrame(index=partials['SUM'].index)
+        for item in self.select:
+            name = item.split(" AS ")[-1]
+            if item not in aggregates:
+                result[name] = result.index.get_level_values(name)
+                continue
+            function, alias = aggregates[item]
+            if function == 'AVG':
+                total, count = partials['SUM'][f"{alias}__sum"], partials['SUM'][f"{alias}__count"]
+                result[name] = total / count.where(count > 0)
+            else:
+                result[name] = partials[function][f"{alias}__{function.lower()}"]
+        return self.finish_locally(result)
+
+    def finish_locally(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Apply the ordering and limit of this plan to a result assembled from several queries."""
+        if self.order_by:
+            columns = [term.rsplit(' ', 1)[0] for term in self.order_by]
+            names = {column.lower(): column for column in df.columns}
+            df = df.sort_values([names.get(column.lower(), column) for column in columns],
+                                ascending=[term.rsplit(' ', 1)[1] == 'ASC' for term in self.order_by], kind='stable')
+        if self.limit is not None:
+            df = df.head(self.limit)
+        return df.reset_index(drop=True)
+
+    def _signature_without(self, column: str) -> str:
+        plan = self.copy()
+        plan.in_filters.pop(column, None)
+        return plan.to_sql()
+
+    @staticmethod
+    def merge(plans: list['QueryPlan'], column: str = 'index') -> list[tuple]:
+        """
+        Merge plans that are identical except for their IN filter on `column` into one plan each.
+
+        The merged plan filters on the union of the values and selects `column` (and groups by it when the plans
+        aggregate), so each original plan's rows can be recovered with :meth:`select_rows`.
+        Plans without a filter on `column`, with a limit, or aggregating over several values of `column` are never merged.
+
+        :param plans: Plans to merge.
+        :param column: The filter column that may differ between merged plans. Default is 'index'.
+        :return: List of (merged_plan, [original plans]) tuples, in order of first appearance.
+        :rtype: list[tuple]
+        """
+        groups = {}
+        for plan in plans:
+            aggregated = plan.aggregated or plan.group_by
+            if column not in plan.in_filters or plan.limit is not None or (aggregated and len(plan.in_filters[column]) != 1):
+                key = ('single', id(plan))
+            else:
+                key = ('merge', plan._signature_without(column))
+            groups.setdefault(key, []).append(plan)
+
+        merged = []
+        for (kind, _), members in groups.items():
+            if kind == 'single' or len(members) == 1:
+                merged.extend((member, [member]) for member in members)
+                continue
+            plan = members[0].copy()
+            plan.in_filters[column] = tuple(sorted(set().union(*(member.in_filters[column] for member in members))))
+            if plan.aggregated or plan.group_by:
+                plan.group(column)
+            else:
+                plan.add_select(column)
+            merged.append((plan, members))
+        return merged
+
+    def select_rows(self, df, column: str = 'index'):
+        """Rows of a merged result that belong to this plan, based on its IN filter on `column`."""
+        values = self.filter_values(column)
+        if values is None:
+            return df
+        return df[df[column].astype(str).isin(values)]
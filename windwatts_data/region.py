@@ -0,0 +1,114 @@
+import numpy as np
+
+
+class Region:
+    """
+    A bounding box or polygon in longitude/latitude degrees, used to select the grid locations of a study area.
+
+    Polygons are tested with a vectorized even-odd ray casting rule, so holes and multi-polygons are supported
+    without geometry libraries. Any object with a `__geo_interface__` (e.g. a shapely Polygon) can be passed as well.
+    """
+
+    def __init__(self, polygons: list):
+        """
+        :param polygons: List of polygons, each a list of rings (exterior first, then holes), each ring an
+            (n, 2) array of (longitude, latitude) vertices.
+        :type polygons: list
+        """
+        if not polygons:
+            raise ValueError("A region needs at least one polygon.")
+        self.polygons = []
+        self.is_bbox = False
+        for rings in polygons:
+            rings = [np.asarray(ring, dtype=np.float64) for ring in rings]
+            for ring in rings:
+                if ring.ndim != 2 or ring.shape[1] != 2 or len(ring) < 3:
+                    raise ValueError("Polygon rings must have at least 3 (longitude, latitude) vertices.")
+                if not np.all(np.isfinite(ring)):
+                    raise ValueError("Polygon vertices must be finite numbers.")
+            self.polygons.append(rings)
+        vertices = np.concatenate([rings[0] for rings in self.polygons])
+        self.bounds = (vertices[:, 0].min(), vertices[:, 1].min(), vertices[:, 0].max(), vertices[:, 1].max())
+
+    @classmethod
+    def from_bbox(cls, min_long: float, min_lat: float, max_long: float, max_lat: float) -> 'Region':
+        """Region of a bounding box, in GeoJSON bbox order (west, south, east, north)."""
+        if not (min_long < max_long and min_lat < max_lat):
+            raise ValueError("Bounding box must be (min_long, min_lat, max_long, max_lat) with min < max.")
+        ring = [(min_long, min_lat), (max_long, min_lat), (max_long, max_lat), (min_long, max_lat)]
+        region = cls([[ring]])
+        region.is_bbox = True
+        return region
+
+    @classmethod
+    def from_geojson(cls, geometry: dict) -> 'Region':
+        """Region of a GeoJSON Polygon or MultiPolygon geometry (or a Feature holding one)."""
+        if geometry.get('type') == 'Feature':
+            geometry = geometry.get('geometry') or {}
+        if geometry.get('type') == 'Polygon':
+            return cls([geometry['coordinates']])
+        if geometry.get('type') == 'MultiPolygon':
+            return cls(geometry['coordinates'])
+        raise ValueError(f"Unsupported geometry type: {geometry.get('type')}. Use a Polygon or MultiPolygon.")
+
+    @classmethod
+    def parse(cls, region) -> 'Region':
+        """
+        Build a region from any of the supported forms.
+
+        :param region: A Region; a bounding box (min_long, min_lat, max_long, max_lat); a list of (long, lat) polygon
+            vertices; a GeoJSON Polygon/MultiPolygon dict; or an object with a `__geo_interface__` such as a shapely Polygon.
+        :raises TypeError: If the region has none of these forms.
+        :return: The region.
+        :rtype: Region
+        """
+        if isinstance(region, Region):
+            return region
+        if hasattr(region, '__geo_interface__'):
+            return cls.from_geojson(region.__geo_interface__)
+        if isinstance(region, dict):
+            return cls.from_geojson(region)
+        if isinstance(region, (list, tuple, np.ndarray)):
+            if len(region) == 4 and all(isinstance(value, (int, float, np.number)) for value in region):
+                return cls.from_bbox(*region)
+            return cls([[region]])
+        raise TypeError("Parameter 'region' must be a bounding box (min_long, min_lat, max_long, max_lat), "
+                        "a list of (long, lat) vertices, a GeoJSON polygon or a shapely geometry.")
+
+    @staticmethod
+    def _in_ring(ring: np.ndarray, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        inside = np.zeros(len(x), dtype=bool)
+        x1, y1 = ring[:, 0], ring[:, 1]
+        x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+        for xa, ya, xb, yb in zip(x1, y1, x2, y2):
+            crosses = (ya > y) != (yb > y)
+            if not np.any(crosses):
+                continue
+            x_cross = xa + (y[crosses] - ya) * (xb - xa) / (yb - ya)
+            inside[crosses] ^= x[crosses] < x_cross
+        return inside
+
+    def contains(self, lats, longs) -> np.ndarray:
+        """
+        Test which coordinates lie inside the region.
+
+        :param lats: Latitudes (array-like).
+        :param longs: Longitudes (array-like), aligned with `lats`.
+        :return: Boolean mask.
+        :rtype: numpy.ndarray
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        longs = np.asarray(longs, dtype=np.float64)
+        min_long, min_lat, max_long, max_lat = self.bounds
+        mask = (longs >= min_long) & (longs <= max_long) & (lats >= min_lat) & (lats <= max_lat)
+        if self.is_bbox:
+            return mask
+        candidates = np.flatnonzero(mask)
+        inside = np.zeros(len(candidates), dtype=bool)
+        for rings in self.polygons:
+            in_polygon = np.zeros(len(candidates), dtype=bool)
+            for ring in rings:
+                in_polygon ^= self._in_ring(ring, longs[candidates], lats[candidates])
+            inside |= in_polygon
+        mask[candidates] = inside
+        return mask
@@ -0,0 +1,249 @@
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+from scipy.spatial import cKDTree
+from .location_index import LocationIndex
+
+# Mean earth radius in km.
+EARTH_RADIUS_KM = 6371.0088
+
+# Horizontal spacing of the WTK-LED grid in km.
+GRID_SPACING_KM = 4.0
+
+# Largest distance in km from a point inside the grid domain to its nearest grid location: half the diagonal of a
+# grid cell, plus a margin of 0.1 km for the varying cell size of the projected grid.
+MAX_SNAP_DISTANCE_KM = GRID_SPACING_KM * np.sqrt(2) / 2 + 0.1
+
+# File suffixes of the arrays making up a spatial index.
+ARRAY_SUFFIXES = {
+    'grid': '_grid.npy',
+    'offsets': '_cell_offsets.npy',
+    'order': '_order.npy',
+    'latitudes': '_sorted_lat.npy',
+    'longitudes': '_sorted_lon.npy',
+}
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Great-circle distance in km between coordinates in degrees (broadcasting)."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(x, dtype=np.float64)) for x in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def unit_vectors(lats, lons) -> np.ndarray:
+    """(n, 3) unit-sphere coordinates of latitudes and longitudes in degrees."""
+    lat, lon = np.radians(np.asarray(lats, dtype=np.float64)), np.radians(np.asarray(lons, dtype=np.float64))
+    return np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+
+class SpatialIndex:
+    """
+    Great-circle nearest neighbour index over grid locations.
+
+    Locations are bucketed into cells of `cell_size` degrees and stored sorted by cell, with one offset per cell,
+    so all locations of a row of cells are one contiguous slice. A query reads the cells that can hold a location
+    within a search radius, ranks the candidates by haversine distance, and widens the radius until the k-th
+    neighbour is inside it, which makes the result exact. All arrays are .npy files loaded with memory mapping:
+    the index opens in milliseconds and its pages are shared between processes.
+
+    Batches of at least `tree_threshold` coordinates are instead answered with a KDTree over unit-sphere
+    coordinates, which is built on first use (about a second for the WTK-LED grid) and then reused.
+
+    A saved index is a directory of arrays per version and a manifest `{prefix}.json` naming the current version and
+    the checksum of the location index it was built from. Saving writes a new version and then replaces the manifest
+    atomically, so a reader never loads arrays of two different versions.
+    """
+
+    def __init__(self, grid: np.ndarray, offsets: np.ndarray, order: np.ndarray, latitudes: np.ndarray,
+                 longitudes: np.ndarray, tree_threshold: int = 1000, source: str = None):
+        """
+        :param grid: [lat0, lon0, cell_size, n_rows, n_cols, n_locations] of the cell grid.
+        :param offsets: Start of every cell in the sorted arrays, of length n_rows * n_cols + 1.
+        :param order: Position in the location index of every sorted location.
+        :param latitudes: Latitudes sorted by cell.
+        :param longitudes: Longitudes sorted by cell.
+        :param tree_threshold: Minimum number of coordinates in a query answered with the unit-sphere KDTree.
+        :param source: Checksum of the location index the index was built from, see `LocationIndex.checksum`.
+        """
+        self.grid = grid
+        self.lat0, self.lon0, self.cell_size = (float(x) for x in grid[:3])
+        self.n_rows, self.n_cols, self.n_locations = (int(x) for x in grid[3:6])
+        self.offsets = offsets
+        self.order = order
+        self.latitudes = latitudes
+        self.longitudes = longitudes
+        self.tree_threshold = tree_threshold
+        self.source = source
+        self._tree = None
+
+    def __len__(self) -> int:
+        return self.n_locations
+
+    @classmethod
+    def build(cls, location_index: LocationIndex, cell_size: float = 0.1) -> 'SpatialIndex':
+        """
+        Bucket the locations of a location index.
+
+        :param location_index: The grid locations.
+        :param cell_size: Cell size in degrees. Default is 0.1, about 40 WTK-LED locations per cell.
+        """
+        lats = np.asarray(location_index.latitudes, dtype=np.float64)
+        lons = np.asarray(location_index.longitudes, dtype=np.float64)
+        lat0, lon0 = np.floor(lats.min()), np.floor(lons.min())
+        n_rows = int((lats.max() - lat0) // cell_size) + 1
+        n_cols = int((lons.max() - lon0) // cell_size) + 1
+        cells = ((lats - lat0) // cell_size).astype(np.int64) * n_cols + ((lons - lon0) // cell_size).astype(np.int64)
+        order = np.argsort(cells, kind='stable').astype(np.int32)
+        offsets = np.searchsorted(cells[order], np.arange(n_rows * n_cols + 1)).astype(np.int64)
+        grid = np.array([lat0, lon0, cell_size, n_rows, n_cols, len(lats)], dtype=np.float64)
+        return cls(grid, offsets, order, lats[order].astype(np.float32), lons[order].astype(np.float32),
+                   source=location_index.checksum())
+
+    @staticmethod
+    def paths(prefix: str) -> dict:
+        """Paths of the array files of one version of the index, stored under `prefix`."""
+        return {name: f"{prefix}{suffix}" for name, suffix in ARRAY_SUFFIXES.items()}
+
+    @staticmethod
+    def _manifest(prefix: str) -> dict:
+        """The manifest of the index saved under `prefix`, or None if there is none."""
+        try:
+            with open(f"{prefix}.json", 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _version_prefix(prefix: str, version: str) -> str:
+        return os.path.join(f"{prefix}_versions", version, 'spatial')
+
+    @classmethod
+    def exists(cls, prefix: str) -> bool:
+        manifest = cls._manifest(prefix)
+        if manifest is None:
+            return False
+        return all(os.path.exists(path) for path in cls.paths(cls._version_prefix(prefix, manifest['version'])).values())
+
+    @classmethod
+    def load(cls, prefix: str, mmap: bool = True) -> 'SpatialIndex':
+        """Load the current version of an index written by :meth:`save`, memory-mapped unless `mmap` is False."""
+        mmap_mode = 'r' if mmap else None
+        for attempt in range(3):
+            manifest = cls._manifest(prefix)
+            if manifest is None:
+                raise FileNotFoundError(f"No spatial index saved under {prefix}.")
+            version_prefix = cls._version_prefix(prefix, manifest['version'])
+            try:
+                arrays = {name: np.load(path, mmap_mode=mmap_mode) for name, path in cls.paths(version_prefix).items()}
+                break
+            except FileNotFoundError:
+                # A concurrent save replaced and removed this version after the manifest was read
+                if attempt == 2:
+                    raise
+        arrays['grid'] = np.array(arrays['grid'])
+        return cls(**arrays, source=manifest.get('source'))
+
+    def save(self, prefix: str):
+        """
+        Write the arrays as .npy files to a new version directory `{prefix}_versions/<version>` and atomically
+        replace the manifest `{prefix}.json` to point to it. The version the manifest pointed to before is removed.
+        """
+        versions = f"{prefix}_versions"
+        os.makedirs(versions, exist_ok=True)
+        version = tempfile.mkdtemp(dir=versions)
+        previous = self._manifest(prefix)
+        arrays = {'grid': self.grid, 'offsets': self.offsets, 'order': self.order,
+                  'latitudes': self.latitudes, 'longitudes': self.longitudes}
+        tmp_path = None
+        try:
+            for name, path in self.paths(os.path.join(version, 'spatial')).items():
+                np.save(path, arrays[name])
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(prefix) or '.', prefix=f"{os.path.basename(prefix)}.", suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'version': os.path.basename(version), 'source': self.source}, f)
+            os.replace(tmp_path, f"{prefix}.json")
+        except BaseException:
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            shutil.rmtree(version, ignore_errors=True)
+            raise
+        if previous is not None and previous.get('version') != os.path.basename(version):
+            # Readers that already mapped the old arrays keep them; on systems that cannot remove open files
+            # the old version is left behind.
+            shutil.rmtree(os.path.join(versions, previous['version']), ignore_errors=True)
+
+    @property
+    def tree(self) -> cKDTree:
+        """KDTree over the unit-sphere coordinates of the sorted locations, built on first access."""
+        if self._tree is None:
+            self._tree = cKDTree(unit_vectors(self.latitudes, self.longitudes), balanced_tree=False, compact_nodes=False)
+        return self._tree
+
+    def _candidates(self, lat: float, lon: float, radius_km: float) -> np.ndarray:
+        """Sorted positions of all locations in the cells that can hold a location within radius_km of (lat, lon)."""
+        theta = radius_km / EARTH_RADIUS_KM
+        dlat = np.degrees(theta)
+        row0 = max(int((lat - dlat - self.lat0) // self.cell_size), 0)
+        row1 = min(int((lat + dlat - self.lat0) // self.cell_size), self.n_rows - 1)
+        if row0 > row1:
+            return np.empty(0, dtype=np.int64)
+        # Largest longitude difference of a point within theta of the query point.
+        cos_lat = np.cos(np.radians(lat))
+        if theta >= np.pi / 2 or np.sin(theta) >= cos_lat:
+            col0, col1 = 0, self.n_cols - 1
+        else:
+            dlon = np.degrees(np.arcsin(np.sin(theta) / cos_lat))
+            col0 = max(int((lon - dlon - self.lon0) // self.cell_size), 0)
+            col1 = min(int((lon + dlon - self.lon0) // self.cell_size), self.n_cols - 1)
+            if col0 > col1:
+                return np.empty(0, dtype=np.int64)
+        starts = self.offsets[np.arange(row0, row1 + 1) * self.n_cols + col0]
+        ends = self.offsets[np.arange(row0, row1 + 1) * self.n_cols + col1 + 1]
+        return np.concatenate([np.arange(start, end) for start, end in zip(starts, ends)])
+
+    def _query_point(self, lat: float, lon: float, k: int):
+        radius_km = self.cell_size * 111.0
+        while True:
+            candidates = self._candidates(lat, lon, radius_km)
+            if len(candidates) >= k:
+                distances = haversine_km(lat, lon, self.latitudes[candidates], self.longitudes[candidates])
+                nearest = np.argpartition(distances, k - 1)[:k] if k < len(distances) else np.arange(len(distances))
+                nearest = nearest[np.argsort(distances[nearest], kind='stable')]
+                if distances[nearest[-1]] <= radius_km or len(candidates) == self.n_locations:
+                    return distances[nearest], candidates[nearest]
+            radius_km *= 2
+
+    def query(self, lats, lons, k: int = 1):
+        """
+        Find the k nearest locations of every coordinate.
+
+        :param lats: Latitudes in degrees (array-like).
+        :param lons: Longitudes in degrees (array-like), aligned with `lats`.
+        :param k: Number of neighbours. Default is 1.
+        :return: Tuple (distances_km, positions), both of shape (n, k), sorted by distance. Positions refer to the
+            location index the spatial index was built from.
+        :rtype: tuple[numpy.ndarray, numpy.ndarray]
+        """
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+        if lats.shape != lons.shape:
+            raise ValueError("Latitudes and longitudes must have the same shape.")
+        if not 1 <= k <= self.n_locations:
+            raise ValueError(f"k must be between 1 and {self.n_locations}.")
+        if np.any(np.abs(lats) > 90) or not np.all(np.isfinite(lats)) or not np.all(np.isfinite(lons)):
+            raise ValueError("Latitudes must be finite and within [-90, 90], longitudes must be finite.")
+
+        if len(lats) >= self.tree_threshold or self._tree is not None:
+            chords, sorted_positions = self.tree.query(unit_vectors(lats, lons), k=k)
+            distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chords / 2, 0, 1))
+            sorted_positions = sorted_positions.reshape(len(lats), k)
+            distances = distances.reshape(len(lats), k)
+        else:
+            distances = np.empty((len(lats), k))
+            sorted_positions = np.empty((len(lats), k), dtype=np.int64)
+            for i, (lat, lon) in enumerate(zip(lats, lons)):
+                distances[i], sorted_positions[i] = self._query_point(lat, lon, k)
+        return distances, np.asarray(self.order[sorted_positions.ravel()], dtype=np.int64).reshape(len(lats), k)
@@ -0,0 +1,123 @@
+import numpy as np
+
+INTERPOLATION_METHODS = ('idw', 'bilinear')
+
+# Default number of nearest grid locations used per method: IDW blends the 4 nearest, bilinear
+# searches the 8 nearest for one location in each quadrant around the site.
+DEFAULT_NEIGHBOURS = {'idw': 4, 'bilinear': 8}
+
+KM_PER_DEGREE = 111.195
+
+
+def idw_weights(distances: np.ndarray, power: float = 2.0) -> np.ndarray:
+    """
+    Inverse distance weights.
+
+    :param distances: (n_sites, k) distances to the neighbours.
+    :param power: Power of the inverse distance. Default is 2.
+    :return: (n_sites, k) weights summing to 1 per site. A site on a grid location gets all weight on that location.
+    :rtype: numpy.ndarray
+    """
+    distances = np.asarray(distances, dtype=np.float64)
+    if power <= 0:
+        raise ValueError("Parameter 'power' must be positive.")
+    exact = distances < 1e-9
+    with np.errstate(divide='ignore'):
+        weights = 1.0 / distances ** power
+    on_grid = exact.any(axis=1)
+    weights[on_grid] = exact[on_grid]
+    return weights / weights.sum(axis=1, keepdims=True)
+
+
+def bilinear_weights(site_lats, site_longs, lats: np.ndarray, longs: np.ndarray, distances: np.ndarray) -> tuple:
+    """
+    Bilinear weights from the nearest neighbour in each quadrant around every site.
+
+    The four locations are fitted exactly with f = a + bx + cy + dxy in a local plane (km) centred on the site,
+    so the interpolated value is a and the weights are the first row of the inverse design matrix. On a rectangular
+    grid this is ordinary bilinear interpolation within the enclosing cell.
+
+    :param site_lats: (n_sites,) latitudes of the sites.
+    :param site_longs: (n_sites,) longitudes of the sites.
+    :param lats: (n_sites, k) latitudes of the neighbours.
+    :param longs: (n_sites, k) longitudes of the neighbours.
+    :param distances: (n_sites, k) distances to the neighbours.
+    :return: Tuple of (n_sites, k) weights and a (n_sites,) mask of the sites with valid weights. Sites without a
+        neighbour in every quadrant (e.g. at the domain edge) or with a degenerate quadrilateral are not valid.
+    :rtype: tuple
+    """
+    site_lats = np.asarray(site_lats, dtype=np.float64)[:, None]
+    site_longs = np.asarray(site_longs, dtype=np.float64)[:, None]
+    x = (np.asarray(longs, dtype=np.float64) - site_longs) * np.cos(np.radians(site_lats)) * KM_PER_DEGREE
+    y = (np.asarray(lats, dtype=np.float64) - site_lats) * KM_PER_DEGREE
+    quadrant = (x >= 0).astype(int) + 2 * (y >= 0).astype(int)
+
+    n_sites = len(x)
+    rows = np.arange(n_sites)
+    corners = np.empty((n_sites, 4), dtype=np.int64)
+    valid = np.ones(n_sites, dtype=bool)
+    for q in range(4):
+        masked = np.where(quadrant == q, distances, np.inf)
+        corners[:, q] = np.argmin(masked, axis=1)
+        valid &= np.isfinite(masked[rows, corners[:, q]])
+
+    cx, cy = x[rows[:, None], corners], y[rows[:, None], corners]
+    design = np.stack([np.ones_like(cx), cx, cy, cx * cy], axis=-1)
+    scale = np.maximum(np.abs(cx).max(axis=1), np.abs(cy).max(axis=1))
+    valid &= np.abs(np.linalg.det(design)) > 1e-6 * np.maximum(scale, 1e-9) ** 4
+
+    weights = np.zeros(x.shape)
+    if valid.any():
+        # Each neighbour lies in one quadrant, so the four corners are distinct columns
+        valid_weights = np.zeros((int(valid.sum()), x.shape[1]))
+        np.put_along_axis(valid_weights, corners[valid], np.linalg.inv(design[valid])[:, 0, :], axis=1)
+        weights[valid] = valid_weights
+    return weights, valid
+
+
+def interpolation_weights(method: str, site_lats, site_longs, lats, longs, distances, power: float = 2.0) -> np.ndarray:
+    """
+    Weights of the neighbours of every site for an interpolation method. Bilinear falls back to IDW for sites
+    without valid bilinear weights.
+
+    :param method: 'idw' or 'bilinear'.
+    :return: (n_sites, k) weights.
+    :rtype: numpy.ndarray
+    """
+    if method not in INTERPOLATION_METHODS:
+        raise ValueError(f"Interpolation method must be one of {list(INTERPOLATION_METHODS)}, got '{method}'.")
+    weights = idw_weights(distances, power)
+    if method == 'bilinear':
+        bilinear, valid = bilinear_weights(site_lats, site_longs, lats, longs, distances)
+        weights[valid] = bilinear[valid]
+    return weights
+
+
+def blend(values: np.ndarray, cells: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """
+    Weighted sum of neighbour series for every site, vectorized over sites and timestamps.
+    Missing values (NaN) are skipped and the weights of the remaining neighbours are renormalized.
+
+    :param values: (n_cells, n_times) series of the grid locations.
+    :param cells: (n_sites, k) rows of `values` holding the neighbours of every site.
+    :param weights: (n_sites, k) weights.
+    :return: (n_sites, n_times) blended series.
+    :rtype: numpy.ndarray
+    """
+    total = np.zeros((cells.shape[0], values.shape[1]))
+    weight_sum = np.zeros_like(total)
+    for j in range(cells.shape[1]):
+        neighbour = values[cells[:, j]]
+        present = ~np.isnan(neighbour)
+        total += np.where(present, neighbour, 0.0) * weights[:, j, None]
+        weight_sum += present * weights[:, j, None]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(weight_sum != 0, total / weight_sum, np.nan)
+
+
+def blend_directions(values: np.ndarray, cells: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Like :func:`blend` for directions in degrees, blending unit vectors so that e.g. 350 and 10 give 0, not 180."""
+    radians = np.radians(values)
+    sin = blend(np.sin(radians), cells, weights)
+    cos = blend(np.cos(radians), cells, weights)
+    return np.degrees(np.arctan2(sin, cos)) % 360
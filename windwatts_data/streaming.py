@@ -0,0 +1,161 @@
+import io
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+
+class S3RangeReader(io.RawIOBase):
+    """
+    Seekable, read-only file object over an S3 object that fetches data with ranged GETs.
+    Only the requested byte ranges are downloaded, so large result objects can be parsed with bounded memory.
+    """
+
+    def __init__(self, s3, bucket: str, key: str, block_size: int = 8 * 1024 ** 2):
+        """
+        :param s3: boto3 S3 client.
+        :param bucket: Bucket of the object.
+        :param key: Key of the object.
+        :param block_size: Minimum number of bytes requested per GET. Default is 8 MiB.
+        """
+        super().__init__()
+        self.s3 = s3
+        self.bucket = bucket
+        self.key = key
+        self.block_size = block_size
+        self.size = s3.head_object(Bucket=bucket, Key=key)['ContentLength']
+        self._pos = 0
+        self._buffer = b''
+        self._buffer_start = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        elif whence == io.SEEK_END:
+            self._pos = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        self._pos = max(0, self._pos)
+        return self._pos
+
+    def readinto(self, b) -> int:
+        if self._pos >= self.size:
+            return 0
+        buffer_offset = self._pos - self._buffer_start
+        if not 0 <= buffer_offset < len(self._buffer):
+            end = min(self._pos + max(len(b), self.block_size), self.size) - 1
+            response = self.s3.get_object(Bucket=self.bucket, Key=self.key, Range=f"bytes={self._pos}-{end}")
+            self._buffer = response['Body'].read()
+            self._buffer_start = self._pos
+            buffer_offset = 0
+        n = min(len(b), len(self._buffer) - buffer_offset)
+        b[:n] = self._buffer[buffer_offset:buffer_offset + n]
+        self._pos += n
+        return n
+
+
+def iter_csv_chunks(s3, bucket: str, key: str, chunksize: int = 100000, as_arrow: bool = False):
+    """
+    Stream an Athena CSV result object in chunks of at most `chunksize` rows.
+
+    :param s3: boto3 S3 client.
+    :param bucket: Bucket of the result object.
+    :param key: Key of the result object.
+    :param chunksize: Maximum number of rows per chunk.
+    :param as_arrow: If True, yields pyarrow RecordBatches instead of pandas DataFrames.
+    :return: Generator of pandas DataFrames or pyarrow RecordBatches.
+    """
+    reader = io.BufferedReader(S3RangeReader(s3, bucket, key))
+    with pd.read_csv(reader, dtype={'index': str}, chunksize=chunksize) as chunks:
+        for chunk in chunks:
+            if as_arrow:
+                yield from pa.Table.from_pandas(chunk, preserve_index=False).to_batches()
+            else:
+                yield chunk
+
+
+def iter_parquet_batches(s3, bucket: str, prefix: str, batch_size: int = 100000, as_arrow: bool = False):
+    """
+    Stream all Parquet files below an S3 prefix (e.g. the output of an UNLOAD query) record batch by record batch.
+
+    :param s3: boto3 S3 client.
+    :param bucket: Bucket of the Parquet files.
+    :param prefix: Key prefix of the Parquet files.
+    :param batch_size: Maximum number of rows per batch.
+    :param as_arrow: If True, yields pyarrow RecordBatches instead of pandas DataFrames.
+    :return: Generator of pandas DataFrames or pyarrow RecordBatches.
+    """
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            if obj['Size'] == 0:
+                continue
+            parquet_file = pq.ParquetFile(S3RangeReader(s3, bucket, obj['Key']))
+            for batch in parquet_file.iter_batches(batch_size=batch_size):
+                yield batch if as_arrow else batch.to_pandas()
+
+
+def _to_table(chunk) -> pa.Table:
+    if isinstance(chunk, pa.RecordBatch):
+        return pa.Table.from_batches([chunk])
+    return pa.Table.from_pandas(chunk, preserve_index=False)
+
+
+def write_parquet(chunks, path: str, compression: str = 'snappy') -> int:
+    """
+    Write a stream of DataFrames or RecordBatches to a single Parquet file without materializing it.
+
+    :param chunks: Iterable of pandas DataFrames or pyarrow RecordBatches with the same schema, e.g. from `query_athena_iter`.
+    :param path: Output file path.
+    :param compression: Parquet compression codec. Default is 'snappy'.
+    :return: Number of rows written.
+    """
+    writer = None
+    rows = 0
+    try:
+        for chunk in chunks:
+            table = _to_table(chunk)
+            if writer is None:
+                schema = table.schema
+                writer = pq.ParquetWriter(path, table.schema, compression=compression)
+            writer.write_table(table.cast(schema) if table.schema != schema else table)
+            rows += table.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def write_csv(chunks, path: str) -> int:
+    """
+    Write a stream of DataFrames or RecordBatches to a single CSV file without materializing it.
+
+    :param chunks: Iterable of pandas DataFrames or pyarrow RecordBatches with the same columns, e.g. from `query_athena_iter`.
+    :param path: Output file path.
+    :return: Number of rows written.
+    """
+    writer = None
+    rows = 0
+    try:
+        for chunk in chunks:
+            table = _to_table(chunk)
+            if writer is None:
+                schema = table.schema
+                writer = pacsv.CSVWriter(path, table.schema)
+            writer.write_table(table.cast(schema) if table.schema != schema else table)
+            rows += table.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
@@ -0,0 +1,187 @@
+import numpy as np
+from scipy.special import gammaln
+
+# Speed bins (m/s) of the wind rose; the last bin is open-ended.
+DEFAULT_ROSE_SPEED_BINS = (0.0, 3.0, 6.0, 9.0, 12.0, 15.0)
+
+# Search range of the Weibull shape parameter k.
+WEIBULL_K_RANGE = (0.1, 50.0)
+
+
+def _as_sites(values) -> np.ndarray:
+    """Values as a float (n_sites, n_samples) array; a 1-D input is a single site."""
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[np.newaxis, :]
+    if values.ndim != 2:
+        raise ValueError("Expected a 1-D array of samples or a 2-D (n_sites, n_samples) array.")
+    return values
+
+
+def weibull_from_moments(mean, std) -> tuple:
+    """
+    Weibull shape k and scale c with the given mean and standard deviation (method of moments).
+
+    Solves (std / mean)^2 = Gamma(1 + 2/k) / Gamma(1 + 1/k)^2 - 1 for k by bisection, vectorized over sites.
+    Used for aggregates computed in Athena, where only moments of the series are available.
+
+    :param mean: Mean windspeed(s).
+    :param std: Standard deviation(s) of the windspeed.
+    :return: Tuple of arrays (k, c); NaN where the moments are missing or not positive.
+    :rtype: tuple
+    """
+    mean = np.asarray(mean, dtype=np.float64)
+    std = np.asarray(std, dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        target = np.log1p((std / mean) ** 2)
+    valid = np.isfinite(target) & (mean > 0) & (std > 0)
+
+    def log_ratio(k):
+        # ln(Gamma(1 + 2/k) / Gamma(1 + 1/k)^2), decreasing in k
+        return gammaln(1 + 2 / k) - 2 * gammaln(1 + 1 / k)
+
+    low = np.full(mean.shape, np.log(WEIBULL_K_RANGE[0]))
+    high = np.full(mean.shape, np.log(WEIBULL_K_RANGE[1]))
+    target = np.where(valid, target, 0.0)
+    for _ in range(60):
+        middle = (low + high) / 2
+        above = log_ratio(np.exp(middle)) > target
+        low = np.where(above, middle, low)
+        high = np.where(above, high, middle)
+    k = np.exp((low + high) / 2)
+    c = mean / np.exp(gammaln(1 + 1 / k))
+    return np.where(valid, k, np.nan), np.where(valid, c, np.nan)
+
+
+def weibull_fit(speeds, max_iterations: int = 50, tolerance: float = 1e-8) -> tuple:
+    """
+    Maximum likelihood Weibull fit of windspeed samples, vectorized over sites.
+
+    The shape k solves sum(x^k ln x) / sum(x^k) - 1/k = mean(ln x) and is found with Newton iterations started
+    from the method of moments estimate; the scale is c = mean(x^k)^(1/k). Calm (zero) and missing samples are
+    excluded, as the Weibull likelihood is not defined at zero.
+
+    :param speeds: Windspeeds, 1-D for one site or (n_sites, n_samples).
+    :type speeds: numpy.ndarray
+    :param max_iterations: Maximum number of Newton iterations. Default is 50.
+    :type max_iterations: int
+    :param tolerance: Convergence tolerance on k. Default is 1e-8.
+    :type tolerance: float
+    :return: Tuple of (n_sites,) arrays (k, c); NaN for sites with fewer than 2 positive samples.
+    :rtype: tuple
+    """
+    speeds = _as_sites(speeds)
+    valid = np.isfinite(speeds) & (speeds > 0)
+    count = valid.sum(axis=1)
+    fitted = count >= 2
+    samples = np.where(valid, speeds, np.nan)
+
+    # Work with logs relative to the largest sample, so x^k stays within [0, 1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scale = np.nanmax(np.where(fitted[:, None], samples, np.nan), axis=1, initial=-np.inf)
+        logs = np.where(valid, np.log(samples / scale[:, None]), 0.0)
+        mean_log = logs.sum(axis=1) / count
+        mean = np.where(valid, speeds, 0.0).sum(axis=1) / count
+        std = np.sqrt(np.where(valid, (speeds - mean[:, None]) ** 2, 0.0).sum(axis=1) / count)
+        k, _ = weibull_from_moments(mean, std)
+    k = np.where(np.isfinite(k), k, 2.0)
+
+    for _ in range(max_iterations):
+        powers = np.where(valid, np.exp(k[:, None] * logs), 0.0)
+        s0 = powers.sum(axis=1)
+        s1 = (powers * logs).sum(axis=1)
+        s2 = (powers * logs ** 2).sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            f = s1 / s0 - 1 / k - mean_log
+            derivative = s2 / s0 - (s1 / s0) ** 2 + 1 / k ** 2
+            step = np.where(fitted, f / derivative, 0.0)
+        k = np.clip(k - step, *WEIBULL_K_RANGE)
+        if np.all(~np.isfinite(step) | (np.abs(step) < tolerance * k)):
+            break
+
+    powers = np.where(valid, np.exp(k[:, None] * logs), 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        c = scale * (powers.sum(axis=1) / count) ** (1 / k)
+    return np.where(fitted, k, np.nan), np.where(fitted, c, np.nan)
+
+
+def exceedance_speeds(speeds, levels=(50, 90)) -> np.ndarray:
+    """
+    Windspeeds exceeded the given percentage of the time, e.g. P90 is the speed exceeded 90% of the time
+    (the 10th percentile). Missing samples are ignored.
+
+    :param speeds: Windspeeds, 1-D for one site or (n_sites, n_samples).
+    :param levels: Exceedance levels in percent. Default is (50, 90).
+    :return: (n_sites, n_levels) array.
+    :rtype: numpy.ndarray
+    """
+    levels = np.asarray(levels, dtype=np.float64)
+    if np.any((levels < 0) | (levels > 100)):
+        raise ValueError("Exceedance levels must be percentages between 0 and 100.")
+    # One sort with missing samples last and linear interpolation between order statistics, like numpy.percentile
+    ordered = np.sort(_as_sites(speeds), axis=1)
+    count = np.isfinite(ordered).sum(axis=1, keepdims=True)
+    position = (1 - levels / 100) * np.maximum(count - 1, 0)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, np.maximum(count - 1, 0))
+    fraction = position - lower
+    low_values = np.take_along_axis(ordered, lower, axis=1)
+    high_values = np.take_along_axis(ordered, upper, axis=1)
+    return np.where(count > 0, low_values + fraction * (high_values - low_values), np.nan)
+
+
+def _binned_frequencies(bins: np.ndarray, valid: np.ndarray, n_bins: int) -> np.ndarray:
+    """Relative frequency of every bin per site, from (n_sites, n_samples) integer bins, with one bincount."""
+    n_sites = bins.shape[0]
+    flat = (np.arange(n_sites)[:, None] * n_bins + bins)[valid]
+    counts = np.bincount(flat, minlength=n_sites * n_bins).reshape(n_sites, n_bins)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return counts / valid.sum(axis=1, keepdims=True)
+
+
+def speed_histogram(speeds, bin_width: float = 1.0, max_speed: float = None) -> tuple:
+    """
+    Relative frequency of windspeeds in bins of `bin_width`, vectorized over sites.
+
+    :param speeds: Windspeeds, 1-D for one site or (n_sites, n_samples).
+    :param bin_width: Width of the bins in m/s. Default is 1.
+    :param max_speed: Upper edge of the last bin; faster samples are counted in it. Defaults to the largest sample.
+    :return: Tuple of bin edges (n_bins + 1,) and frequencies (n_sites, n_bins) summing to 1 per site.
+    :rtype: tuple
+    """
+    if bin_width <= 0:
+        raise ValueError("Parameter 'bin_width' must be positive.")
+    speeds = _as_sites(speeds)
+    valid = np.isfinite(speeds) & (speeds >= 0)
+    if max_speed is None:
+        max_speed = speeds[valid].max() if valid.any() else bin_width
+    n_bins = max(int(np.ceil(max_speed / bin_width)), 1)
+    bins = np.clip(np.floor(np.where(valid, speeds, 0.0) / bin_width), 0, n_bins - 1).astype(np.int64)
+    return np.arange(n_bins + 1) * bin_width, _binned_frequencies(bins, valid, n_bins)
+
+
+def wind_rose(speeds, directions, sectors: int = 16, speed_bins=DEFAULT_ROSE_SPEED_BINS) -> np.ndarray:
+    """
+    Joint relative frequency of direction sectors and speed bins, vectorized over sites.
+    Sector 0 is centred on north (0 degrees) and sectors run clockwise.
+
+    :param speeds: Windspeeds, 1-D for one site or (n_sites, n_samples).
+    :param directions: Wind directions in degrees, aligned with `speeds`.
+    :param sectors: Number of direction sectors. Default is 16.
+    :param speed_bins: Lower edges of the speed bins in m/s; the last bin is open-ended.
+    :return: (n_sites, sectors, n_speed_bins) array summing to 1 per site.
+    :rtype: numpy.ndarray
+    """
+    if not isinstance(sectors, int) or sectors < 1:
+        raise ValueError("Parameter 'sectors' must be a positive integer.")
+    speeds, directions = _as_sites(speeds), _as_sites(directions)
+    if speeds.shape != directions.shape:
+        raise ValueError("Parameters 'speeds' and 'directions' must have the same shape.")
+    speed_bins = np.asarray(speed_bins, dtype=np.float64)
+
+    valid = np.isfinite(speeds) & np.isfinite(directions) & (speeds >= speed_bins[0])
+    width = 360.0 / sectors
+    sector = (np.floor(np.mod(np.where(valid, directions, 0.0) + width / 2, 360.0) / width).astype(np.int64)) % sectors
+    speed_bin = np.clip(np.searchsorted(speed_bins, np.where(valid, speeds, speed_bins[0]), side='right') - 1, 0, len(speed_bins) - 1)
+    frequencies = _binned_frequencies(sector * len(speed_bins) + speed_bin, valid, sectors * len(speed_bins))
+    return frequencies.reshape(len(speeds), sectors, len(speed_bins))
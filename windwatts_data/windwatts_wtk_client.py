@@ -1,6 +1,62 @@
+from collections import OrderedDict
+from typing import NamedTuple
+import numpy as np
 import pandas as pd
+from .air_density import density_adjusted_windspeed, power_density
 from .client_base import client_base
-from scipy.interpolate import BarycentricInterpolator
+from .energy import PowerCurve, energy_summary, energy_yield, hours_per_row
+from .interpolation import interpolate_profile, profile_sql_expression, round_half_away
+from .query_builder import MOHR_HOUR, MOHR_MONTH, QueryPlan
+from .wind_statistics import DEFAULT_ROSE_SPEED_BINS, exceedance_speeds, speed_histogram, weibull_fit, weibull_from_moments, wind_rose
+
+# Where fetch_*_avg_at_height computes the averages: 'local' over the fetched timeseries, 'pushdown' as one
+# aggregate query in Athena, or 'auto' (local if the timeseries of the location is already cached, else pushdown).
+# Both read the same rows and round half away from zero like Athena, so the mode does not change the result.
+AGGREGATION_MODES = ('auto', 'local', 'pushdown')
+
+
+class WindspeedAverages(NamedTuple):
+    """
+    Global, yearly, monthly and hourly windspeed averages of one grid index at one height, rounded to 2 decimals.
+    Periods are stored as tuples of (period, average) pairs so cached instances cannot be modified.
+    """
+    index: str
+    height: int
+    global_avg: float
+    yearly_avg: tuple
+    monthly_avg: tuple
+    hourly_avg: tuple
+
+    def to_dict(self) -> dict:
+        """
+        Averages in the format of the fetch_*_avg_at_height methods, as new lists and dicts.
+        """
+        column = f"windspeed_{self.height}m"
+        return {
+            "global_avg": self.global_avg,
+            "yearly_avg": [{"year": year, column: value} for year, value in self.yearly_avg],
+            "monthly_avg": [{"month": month, column: value} for month, value in self.monthly_avg],
+            "hourly_avg": [{"hour": hour, column: value} for hour, value in self.hourly_avg]
+        }
+
+
+def _grouped_means(codes: np.ndarray, values: np.ndarray, valid: np.ndarray, offset: int) -> tuple:
+    """
+    Means of `values` per non-negative integer code with bincount, skipping missing values like pandas.
+    Returns (code + offset, mean rounded half away from zero to 2 decimals) pairs for every code that occurs.
+    """
+    rows = np.bincount(codes)
+    counts = np.bincount(codes, weights=valid)
+    sums = np.bincount(codes, weights=np.where(valid, values, 0.0))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = round_half_away(sums / counts, 2)
+    return tuple((int(code) + offset, float(means[code])) for code in np.flatnonzero(rows))
+
+
+def _level_name(level: float) -> str:
+    """Name of an exceedance level, e.g. 'p90' or 'p99_5'."""
+    return f"p{level:g}".replace('.', '_')
+
 
 class WindwattsWTKClient(client_base):
     """
@@ -8,19 +64,27 @@ class WindwattsWTKClient(client_base):
     and perform analysis like global, yearly, monthly, and hourly averages at a given height.
     It can also interpolate wind speeds at heights not explicitly present in the dataset.
     """
-    def __init__(self, config_path: str = None):
+    def __init__(self, config_path: str = None, lazy: bool = False):
         """
         Initialize the WindwattsWTKClient.
 
         :param config_path: Optional path to the config file.
         :type config_path: str or None
+        :param lazy: If True, the table schema, location index and KDTree are loaded on first use instead of during initialization.
+        :type lazy: bool
         """
-        super().__init__(config_path, data='wtk')
+        super().__init__(config_path, data='wtk', lazy=lazy)
         self.global_avg : float = None
         self.yearly_avg  : float= None
         self.monthly_avg : float = None
         self.hourly_avg : float = None
         self.valid_avg_types = ['global', 'yearly', 'monthly', 'hourly']
+        self.interpolation_method : str = 'linear'
+        # Immutable WindspeedAverages per (index, height, interpolation method), least recently used first
+        self.avgs_cache = OrderedDict()
+        self.avgs_cache_max_entries = self.config.get('avgs_cache_max_entries', 1024)
+        # Pushing the averages down to Athena is opt-in, see AGGREGATION_MODES
+        self.aggregation_mode : str = self.config.get('aggregation_mode', 'local')
 
     def windspeed_interpolated_d1(self, windspeeds, heights, target_height):
         """
@@ -32,28 +96,35 @@ class WindwattsWTKClient(client_base):
         :type heights: list[int]
         :param target_height: Height at which to estimate the windspeed.
         :type target_height: int
-        :return: Interpolated wind speed at the target height, rounded to 2 decimal places.
+        :return: Interpolated wind speed at the target height, rounded half away from zero to 2 decimal places.
         :rtype: float
         """
         # Extract the two known heights
         h1, h2 = heights[0], heights[1]
         # Extract windspeeds at two known heights
         w1, w2 = windspeeds.iloc[0], windspeeds.iloc[1]
-        # Apply linear interpolation formula and round the result
-        return round(w1 + (target_height - h1) * (w2 - w1) / (h2 - h1),2)
+        # Apply linear interpolation formula and round the result like every other windspeed path
+        return float(round_half_away(w1 + (target_height - h1) * (w2 - w1) / (h2 - h1), 2))
     
-    def interpolate_windspeed(self, height) -> pd.DataFrame:
+    def interpolate_windspeed(self, height, method: str = None) -> pd.DataFrame:
         """
-        Interpolates windspeed for a height not explicitly present in the dataset.
+        Interpolates windspeed for height(s) not explicitly present in the dataset.
+
+        All requested heights are computed for the whole dataframe in a single vectorized pass.
 
-        :param height: Desired height at which to interpolate windspeed.
-        :type height: float
+        :param height: Desired height or list of heights at which to interpolate windspeed.
+        :type height: float or list[float]
+        :param method: Vertical profile used for interpolation, one of 'linear', 'log' or 'power'. Defaults to `interpolation_method` of the client.
+        :type method: str or None
         :raises ValueError: If suitable model heights are not found for interpolation.
-        :return: Updated dataframe containing a new interpolated windspeed column.
+        :return: Updated dataframe containing new interpolated windspeed column(s).
         :rtype: pandas.DataFrame
         """
-        # Identify columns relevant to the specified height for interpolation
-        model_heights = self.find_relevant_columns([height], windspeed_interpolation=True)
+        heights = height if isinstance(height, list) else [height]
+        method = method or self.interpolation_method
+
+        # Identify columns relevant to the specified heights for interpolation
+        model_heights = self.find_relevant_columns(heights, windspeed_interpolation=True)
 
         # Map available windspeed columns to their respective heights
         windspeed_model_heights_dict = {}
@@ -63,18 +134,24 @@ class WindwattsWTKClient(client_base):
                 height_int = int(height_str)
                 windspeed_model_heights_dict[height_int] = col
 
-        if len(windspeed_model_heights_dict) != 2:
+        if len(windspeed_model_heights_dict) < 2 and any(h not in windspeed_model_heights_dict for h in heights):
             raise ValueError(f"Expected 2 model heights for interpolation, got {len(windspeed_model_heights_dict)}")
         
-        print(f"Interpolating windspeed at height: {height} using model heights: {list(windspeed_model_heights_dict.keys())}")
+        print(f"Interpolating windspeed at height(s): {heights} using model heights: {sorted(windspeed_model_heights_dict.keys())}")
 
-        # Extract the DataFrame with only relevant windspeed columns adjacent to height to be interpolated
-        model_heights_df = self.df[windspeed_model_heights_dict.values()].copy()
+        # Interpolate every requested height for all rows at once and round half away from zero like
+        # _windspeed_at_height and ROUND in Athena, so the column holds the values the averages are computed from
+        interpolated = round_half_away(interpolate_profile(
+            self.df[list(windspeed_model_heights_dict.values())].to_numpy(),
+            list(windspeed_model_heights_dict.keys()),
+            heights,
+            method=method
+        ), 2)
 
-        # Apply interpolation row-wise:
-        # For each row, collect windspeed values from available heights (as a Series)
-        # Pass these values, the list of heights, and the target height to the interpolation function and store the result as new windspeed column in dataframe
-        self.df[f"windspeed_{height}m"] = model_heights_df.apply(lambda windspeeds: self.windspeed_interpolated_d1(windspeeds, list(windspeed_model_heights_dict.keys()), height), axis=1)
+        for i, target_height in enumerate(heights):
+            self.df[f"windspeed_{target_height}m"] = interpolated[:, i]
+
+        return self.df
 
     def fetch_global_avg_at_height(self,
         lat: float = None,
@@ -97,18 +174,7 @@ class WindwattsWTKClient(client_base):
             }
         :rtype: dict
         """
-        
-        if not self._prepare_df_for_aggregation(lat, long, height, 'global'):
-            return {"global_avg": self.global_avg}
-        
-        try:
-            self.global_avg = float(round(self.df[f'windspeed_{height}m'].mean(),2))
-        except Exception as e:
-            raise RuntimeError(f"Failed to calculate global average for windspeed_{height}m.") from e
-        
-        return {
-            "global_avg": self.global_avg
-        }
+        return {"global_avg": self._fetch_avgs(lat, long, height).global_avg}
     
     def fetch_yearly_avg_at_height(self,
         lat: float = None,
@@ -134,19 +200,7 @@ class WindwattsWTKClient(client_base):
             }
         :rtype: dict
         """
-        
-        if not self._prepare_df_for_aggregation(lat, long, height, 'yearly'):
-            return {"yearly_avg": self.yearly_avg}
-        
-        try:
-            yearly_avg_df = self.df.groupby('year')[f'windspeed_{height}m'].mean().reset_index().round(2).sort_values(by='year', ascending=True)
-            self.yearly_avg = yearly_avg_df.to_dict(orient='records')
-        except Exception as e:
-            raise RuntimeError(f"Failed to calculate yearly average for windspeed_{height}m.") from e
-        
-        return {
-                "yearly_avg": self.yearly_avg      
-        }
+        return {"yearly_avg": self._fetch_avgs(lat, long, height).to_dict()["yearly_avg"]}
     
     def fetch_monthly_avg_at_height(self,
         lat: float = None,
@@ -173,21 +227,7 @@ class WindwattsWTKClient(client_base):
             }
         :rtype: dict
         """
-        
-        if not self._prepare_df_for_aggregation(lat, long, height, 'monthly'):
-            return {"monthly_avg": self.monthly_avg}
-    
-        self.df['month']=self.df['mohr']//100
-
-        try:
-            monthly_avg_df = self.df.groupby('month')[f'windspeed_{height}m'].mean().reset_index().round(2).sort_values(by='month', ascending=True)
-            self.monthly_avg = monthly_avg_df.to_dict(orient='records')
-        except Exception as e:
-            raise RuntimeError(f"Failed to calculate monthly average for windspeed_{height}m.") from e
-        
-        return {
-                "monthly_avg": self.monthly_avg        
-        }
+        return {"monthly_avg": self._fetch_avgs(lat, long, height).to_dict()["monthly_avg"]}
     
     def fetch_hourly_avg_at_height(self,
         lat: float = None,
@@ -214,18 +254,647 @@ class WindwattsWTKClient(client_base):
             }
         :rtype: dict
         """
-        
-        if not self._prepare_df_for_aggregation(lat, long, height, 'hourly'):
-            return {"hourly_avg": self.hourly_avg}
-        
-        self.df['hour'] = self.df['mohr']%100
+        return {"hourly_avg": self._fetch_avgs(lat, long, height).to_dict()["hourly_avg"]}
+
+    def fetch_all_avgs_at_height(self,
+        lat: float = None,
+        long: float = None,
+        height: int = None,
+        mode: str = None) -> dict:
+        """
+        Calculate the global, yearly, monthly and hourly windspeed averages at a specified location and height in a single pass.
+
+        Locally, the windspeed at `height` is read (or interpolated) once and all aggregates are reduced with `numpy.bincount`
+        over integer codes derived from `year` and `mohr`, without adding columns to the fetched data.
+        Pushed down, Athena computes all of them in one `GROUPING SETS` query, with interpolated heights expressed as SQL
+        arithmetic over the two bracketing columns, so only the aggregate rows are transferred instead of the timeseries.
+        The result is cached per (grid index, height, interpolation method), so coordinates snapping to the same grid cell reuse it.
 
+        :param lat: Latitude of the location.
+        :type lat: float
+        :param long: Longitude of the location.
+        :type long: float
+        :param height: Hub height in meters.
+        :type height: int
+        :param mode: 'local', 'pushdown' or 'auto' (local if the timeseries of the location is already cached). Defaults to `aggregation_mode` of the client, 'local' unless set in the config.
+        :type mode: str or None
+        :raises ValueError: If the mode is unknown.
+        :raises RuntimeError: If fetching or aggregating the data fails.
+        :return: Dictionary with all averages, each rounded to 2 decimals.
+            Example:
+            {
+                "global_avg": 5.32,
+                "yearly_avg": [{"year": 2020, "windspeed_100m": 5.23}, ...],
+                "monthly_avg": [{"month": 1, "windspeed_100m": 5.12}, ...],
+                "hourly_avg": [{"hour": 1, "windspeed_100m": 5.05}, ...]
+            }
+        :rtype: dict
+        """
+        return self._fetch_avgs(lat, long, height, mode).to_dict()
+
+    def _fetch_avgs(self, lat: float, long: float, height: int, mode: str = None) -> WindspeedAverages:
+        """
+        Cached WindspeedAverages of the grid index nearest to a location, computed on a cache miss.
+        """
+        self.pre_check(lat, long, height)
+        mode = mode or self.aggregation_mode
+        if mode not in AGGREGATION_MODES:
+            raise ValueError(f"Aggregation mode must be one of {list(AGGREGATION_MODES)}, got '{mode}'.")
+        # Interpolated heights depend on the vertical profile, so it is part of the key
+        key = (self.find_nearest_location(lat, long), height, self.interpolation_method)
+        avgs = self.avgs_cache.get(key)
+        if avgs is not None:
+            self.avgs_cache.move_to_end(key)
+        elif mode == 'pushdown' or (mode == 'auto' and not self._is_cached(key[0], height)):
+            self._reset_index_(lat, long)
+            try:
+                avgs = self._pushdown_avgs(key[0], height)
+            except Exception as e:
+                raise RuntimeError(f"Failed to calculate averages for windspeed_{height}m in Athena.") from e
+        else:
+            try:
+                self.fetch_data(lat, long, columns=self._columns_for_heights([height]))
+            except Exception as e:
+                raise RuntimeError("Failed to fetch timeseries data.") from e
+            if self.df is None or self.df.empty:
+                raise RuntimeError("No data available after fetching.")
+            try:
+                avgs = self._compute_avgs(self.df, key[0], height)
+            except Exception as e:
+                raise RuntimeError(f"Failed to calculate averages for windspeed_{height}m.") from e
+
+        if key not in self.avgs_cache:
+            self.avgs_cache[key] = avgs
+            while len(self.avgs_cache) > self.avgs_cache_max_entries:
+                self.avgs_cache.popitem(last=False)
+
+        # Keep the attributes of the last computed averages in sync for existing callers
+        averages = avgs.to_dict()
+        self.current_height = height
+        self.global_avg = averages["global_avg"]
+        self.yearly_avg = averages["yearly_avg"]
+        self.monthly_avg = averages["monthly_avg"]
+        self.hourly_avg = averages["hourly_avg"]
+        return avgs
+
+    def _is_cached(self, index: str, height: int) -> bool:
+        """Whether the timeseries of a grid index is in the location cache with the columns needed for `height`."""
+        df = self.location_cache.peek(index)
+        return df is not None and set(self._columns_for_heights([height])) <= set(df.columns)
+
+    def _model_windspeed_columns(self, height: int) -> tuple:
+        """Bracketing windspeed columns and their heights to interpolate `height` from."""
+        model_columns = [col for col in self.find_relevant_columns([height], windspeed_interpolation=True) if col.startswith('windspeed')]
+        if len(model_columns) < 2:
+            raise ValueError(f"Expected 2 model heights for interpolation, got {len(model_columns)}")
+        return model_columns, [int(col.split('_')[1][:-1]) for col in model_columns]
+
+    def _pushdown_avgs(self, index: str, height: int) -> WindspeedAverages:
+        """
+        All averages of one grid index from a single GROUPING SETS aggregate query in Athena (1 + years + 12 + 24 rows).
+        """
+        expression = self._windspeed_sql_expression(height)
+
+        plan = QueryPlan(self.athena_table_name)
+        plan.add_aggregate("AVG", expression, "windspeed")
+        plan.add_select("year")
+        plan.add_select(MOHR_MONTH, "month")
+        plan.add_select(MOHR_HOUR, "hour")
+        # Bit set for every key a row is not grouped by: 7 overall, 3 per year, 5 per month, 6 per hour
+        plan.add_select(f"GROUPING(year, {MOHR_MONTH}, {MOHR_HOUR})", "grouping_id")
+        plan.group_sets([(), ("year",), (MOHR_MONTH,), (MOHR_HOUR,)])
+        # Same rows as fetch_data, which reads every varset of the index
+        plan.where_in("index", index)
+
+        print(f"Computing windspeed averages for index {index} at {height}m in Athena")
+        df = self.query_athena(plan, reduce_poll=True)
+        grouping = df['grouping_id'].astype(int).to_numpy()
+        windspeed = round_half_away(pd.to_numeric(df['windspeed'], errors='coerce').to_numpy(dtype=np.float64), 2)
+
+        def periods(grouping_id: int, key: str) -> tuple:
+            rows = np.flatnonzero(grouping == grouping_id)
+            keys = df[key].to_numpy()[rows].astype(np.int64)
+            order = np.argsort(keys)
+            return tuple((int(keys[i]), float(windspeed[rows[i]])) for i in order)
+
+        overall = windspeed[grouping == 7]
+        return WindspeedAverages(
+            index=index,
+            height=height,
+            global_avg=float(overall[0]) if len(overall) else float('nan'),
+            yearly_avg=periods(3, 'year'),
+            monthly_avg=periods(5, 'month'),
+            hourly_avg=periods(6, 'hour')
+        )
+
+    def _windspeed_sql_expression(self, height: int) -> str:
+        """SQL expression of the windspeed at `height`: the column itself or the interpolation between the bracketing columns."""
+        column = f"windspeed_{height}m"
+        if column in self.column_names:
+            return column
+        # Rounded per row, like _windspeed_at_height, so local and Athena aggregates use the same values
+        model_columns, model_heights = self._model_windspeed_columns(height)
+        return f"ROUND({profile_sql_expression(model_columns, model_heights, height, self.interpolation_method)}, 2)"
+
+    def _windspeed_at_height(self, df: pd.DataFrame, height: int) -> np.ndarray:
+        """Windspeed at `height` as an array, interpolated if needed without adding a column to `df`."""
+        column = f"windspeed_{height}m"
+        if column in df.columns:
+            return df[column].to_numpy(dtype=np.float64)
+        # Rounded per row like ROUND in _windspeed_sql_expression
+        model_columns, model_heights = self._model_windspeed_columns(height)
+        windspeed = interpolate_profile(df[model_columns].to_numpy(), model_heights, [height], method=self.interpolation_method)
+        return round_half_away(windspeed[:, 0], 2)
+
+    def _compute_avgs(self, df: pd.DataFrame, index: str, height: int) -> WindspeedAverages:
+        """
+        All averages of one location frame, in one pass over NumPy arrays. `df` is not modified.
+        """
+        windspeed = self._windspeed_at_height(df, height)
+        valid = ~np.isnan(windspeed)
+        years = df['year'].to_numpy(dtype=np.int64)
+        mohr = df['mohr'].to_numpy(dtype=np.int64)
+        first_year = int(years.min())
+        return WindspeedAverages(
+            index=index,
+            height=height,
+            global_avg=float(round_half_away(windspeed[valid].mean(), 2)) if valid.any() else float('nan'),
+            yearly_avg=_grouped_means(years - first_year, windspeed, valid, first_year),
+            monthly_avg=_grouped_means(mohr // 100, windspeed, valid, 0),
+            hourly_avg=_grouped_means(mohr % 100, windspeed, valid, 0)
+        )
+
+    def _winddirection_column(self, height: int) -> str:
+        """Wind direction column at the model height closest to `height`; directions are not interpolated."""
+        heights = [h for h, columns in self.column_mapping.items() if f"winddirection_{h}m" in columns]
+        if not heights:
+            raise ValueError("The table has no winddirection columns.")
+        return f"winddirection_{min(heights, key=lambda h: (abs(h - height), h))}m"
+
+    def fetch_wind_statistics_at_height(self,
+        lat: float = None,
+        long: float = None,
+        height: int = None,
+        levels: list[float] = (50, 90),
+        bin_width: float = 1.0,
+        sectors: int = 16,
+        speed_bins: list[float] = DEFAULT_ROSE_SPEED_BINS) -> dict:
+        """
+        Calculate wind resource statistics at a specified location and height: a maximum likelihood Weibull fit,
+        exceedance windspeeds (e.g. P50, P90), a windspeed histogram and a wind rose.
+
+        Computed with vectorized NumPy over the location timeseries from the location cache (fetched if needed);
+        the fetched frame is not modified. Wind directions are taken from the model height closest to `height`.
+        For the 12x24 data every sample is a month-hour average of one year, so spreads are smaller than those of hourly data.
+
+        :param lat: Latitude of the location.
+        :type lat: float
+        :param long: Longitude of the location.
+        :type long: float
+        :param height: Hub height in meters.
+        :type height: int
+        :param levels: Exceedance levels in percent; P90 is the windspeed exceeded 90% of the time. Default is (50, 90).
+        :type levels: list[float]
+        :param bin_width: Width of the histogram bins in m/s. Default is 1.
+        :type bin_width: float
+        :param sectors: Number of wind rose direction sectors, the first centred on north. Default is 16.
+        :type sectors: int
+        :param speed_bins: Lower edges of the wind rose speed bins in m/s; the last bin is open-ended. Default is (0, 3, 6, 9, 12, 15).
+        :type speed_bins: list[float]
+        :raises RuntimeError: If fetching the data or computing the statistics fails.
+        :return: Dictionary with the statistics; windspeeds rounded to 2 decimals, frequencies to 4.
+            Example:
+            {
+                "weibull": {"k": 2.08, "c": 7.91},
+                "exceedance": {"p50": 6.85, "p90": 3.12},
+                "histogram": [{"speed_bin_start": 0.0, "speed_bin_end": 1.0, "frequency": 0.0213}, ...],
+                "wind_rose": [{"sector": 0, "direction": 0.0, "speed_bin_start": 0.0, "speed_bin_end": 3.0, "frequency": 0.0112}, ...]
+            }
+        :rtype: dict
+        """
+        self.pre_check(lat, long, height)
+        self._reset_index_(lat, long)
+        direction_column = self._winddirection_column(height)
         try:
-            hourly_avg_df = self.df.groupby('hour')[f'windspeed_{height}m'].mean().reset_index().round(2).sort_values(by='hour', ascending=True)
-            self.hourly_avg = hourly_avg_df.to_dict(orient='records')  
+            self.fetch_data(lat, long, columns=self._columns_for_heights([height]) + [direction_column])
         except Exception as e:
-            raise RuntimeError(f"Failed to calculate hourly average for windspeed_{height}m.") from e
-        
+            raise RuntimeError("Failed to fetch timeseries data.") from e
+        if self.df is None or self.df.empty:
+            raise RuntimeError("No data available after fetching.")
+
+        try:
+            windspeed = self._windspeed_at_height(self.df, height)
+            directions = self.df[direction_column].to_numpy(dtype=np.float64)
+            k, c = weibull_fit(windspeed)
+            exceedance = exceedance_speeds(windspeed, levels)[0]
+            edges, frequencies = speed_histogram(windspeed, bin_width)
+            rose = wind_rose(windspeed, directions, sectors, speed_bins)[0]
+        except Exception as e:
+            raise RuntimeError(f"Failed to calculate wind statistics for windspeed_{height}m.") from e
+
+        speed_edges = list(speed_bins[1:]) + [None]
+        return {
+            "weibull": {"k": round(float(k[0]), 3), "c": round(float(c[0]), 2)},
+            "exceedance": {_level_name(level): round(float(value), 2) for level, value in zip(levels, exceedance)},
+            "histogram": [
+                {"speed_bin_start": float(edges[i]), "speed_bin_end": float(edges[i + 1]), "frequency": round(float(frequency), 4)}
+                for i, frequency in enumerate(frequencies[0])
+            ],
+            "wind_rose": [
+                {"sector": sector, "direction": sector * 360.0 / sectors, "speed_bin_start": float(speed_bins[b]),
+                 "speed_bin_end": None if speed_edges[b] is None else float(speed_edges[b]), "frequency": round(float(rose[sector, b]), 4)}
+                for sector in range(sectors) for b in range(len(speed_bins))
+            ]
+        }
+
+    def fetch_wind_statistics_batch(self,
+        lats: list[float] = None,
+        longs: list[float] = None,
+        height: int = None,
+        levels: list[float] = (50, 90),
+        bin_width: float = 1.0,
+        max_indexes_per_query: int = None) -> pd.DataFrame:
+        """
+        Calculate Weibull parameters, exceedance windspeeds and windspeed histograms for many sites in Athena.
+
+        Two aggregate queries grouped by index (chunked into `index IN (...)` lists) return the mean, standard deviation
+        and `approx_percentile` exceedance speeds, and the histogram counts, so no timeseries is transferred.
+        The Weibull parameters are fitted from the mean and standard deviation (method of moments), and the
+        percentiles are approximate, so values can differ slightly from :meth:`fetch_wind_statistics_at_height`.
+
+        :param lats: Latitudes of the sites.
+        :type lats: list[float] or numpy.ndarray
+        :param longs: Longitudes of the sites, aligned with `lats`.
+        :type longs: list[float] or numpy.ndarray
+        :param height: Hub height in meters for all sites.
+        :type height: int
+        :param levels: Exceedance levels in percent. Default is (50, 90).
+        :type levels: list[float]
+        :param bin_width: Width of the histogram bins in m/s. Default is 1.
+        :type bin_width: float
+        :param max_indexes_per_query: Maximum number of grid indexes per Athena query. Defaults to the `max_indexes_per_query` config key or 5000.
+        :type max_indexes_per_query: int or None
+        :raises ValueError: If the inputs are missing or their lengths do not match.
+        :raises RuntimeError: If the queries fail.
+        :return: Tidy DataFrame with one row per site and statistic.
+            Columns: site, latitude, longitude, height, index, statistic ('weibull_k', 'weibull_c', 'p50', ..., 'histogram'),
+            speed_bin (lower edge of the histogram bin; missing for the other statistics) and value (frequency for 'histogram').
+        :rtype: pandas.DataFrame
+        """
+        if lats is None or longs is None or height is None:
+            raise ValueError("Parameters 'lats', 'longs' and 'height' are required.")
+        if not isinstance(height, int):
+            raise TypeError("Parameter height of int type is required.")
+        if bin_width <= 0:
+            raise ValueError("Parameter 'bin_width' must be positive.")
+
+        lats = np.asarray(lats, dtype=np.float64).ravel()
+        longs = np.asarray(longs, dtype=np.float64).ravel()
+        if lats.shape != longs.shape or lats.size == 0:
+            raise ValueError("Parameters 'lats' and 'longs' must be non-empty and of equal length.")
+
+        self._reset_index_(lats, longs)
+        sites = pd.DataFrame({
+            'site': np.arange(lats.size),
+            'latitude': lats,
+            'longitude': longs,
+            'height': height,
+            'index': self._find_nearest_indexes(lats, longs)
+        })
+        indexes = sites['index'].unique()
+        expression = self._windspeed_sql_expression(height)
+
+        summary = QueryPlan(self.default_athena_table_name).group("index")
+        summary.add_aggregate("AVG", expression, "mean")
+        summary.add_aggregate("STDDEV_POP", expression, "std")
+        for level in levels:
+            summary.add_aggregate("APPROX_PERCENTILE", f"{expression}, {round(1 - level / 100, 6)!r}", _level_name(level))
+        histogram = QueryPlan(self.default_athena_table_name).group("index")
+        histogram.group(f"CAST(FLOOR({expression} / {float(bin_width)!r}) AS INTEGER)", "speed_bin")
+        histogram.add_aggregate("COUNT", expression, "samples")
+        for plan in (summary, histogram):
+            # Same rows as fetch_data, which fetch_wind_statistics_at_height reads
+            plan.where_in("index", indexes)
+
+        try:
+            # Every index lies in one chunk, so the approximate percentiles are final per chunk
+            summary_df = self.query_athena_split(summary, max_values=max_indexes_per_query)
+            histogram_df = self.query_athena_split(histogram, max_values=max_indexes_per_query)
+        except Exception as e:
+            raise RuntimeError("Failed to compute wind statistics for the given sites in Athena.") from e
+
+        summary_df['index'] = summary_df['index'].astype(str)
+        k, c = weibull_from_moments(pd.to_numeric(summary_df['mean']).to_numpy(), pd.to_numeric(summary_df['std']).to_numpy())
+        statistics = [
+            pd.DataFrame({'index': summary_df['index'], 'statistic': 'weibull_k', 'speed_bin': np.nan, 'value': np.round(k, 3)}),
+            pd.DataFrame({'index': summary_df['index'], 'statistic': 'weibull_c', 'speed_bin': np.nan, 'value': np.round(c, 2)})
+        ]
+        for level in levels:
+            values = pd.to_numeric(summary_df[_level_name(level)]).round(2)
+            statistics.append(pd.DataFrame({'index': summary_df['index'], 'statistic': _level_name(level), 'speed_bin': np.nan, 'value': values}))
+
+        histogram_df = histogram_df.dropna(subset=['speed_bin'])
+        samples = pd.to_numeric(histogram_df['samples'])
+        statistics.append(pd.DataFrame({
+            'index': histogram_df['index'].astype(str),
+            'statistic': 'histogram',
+            'speed_bin': pd.to_numeric(histogram_df['speed_bin']).to_numpy() * bin_width,
+            'value': (samples / samples.groupby(histogram_df['index']).transform('sum')).round(4)
+        }))
+
+        result = sites.merge(pd.concat(statistics, ignore_index=True), on='index', how='left')
+        return result[['site', 'latitude', 'longitude', 'height', 'index', 'statistic', 'speed_bin', 'value']].sort_values(
+            ['site', 'statistic', 'speed_bin'], ignore_index=True)
+
+    def fetch_avgs_at_height_batch(self,
+        lats: list[float] = None,
+        longs: list[float] = None,
+        heights = None,
+        max_indexes_per_query: int = 500) -> pd.DataFrame:
+        """
+        Calculate global, yearly, monthly and hourly windspeed averages for many sites at once.
+
+        All coordinates are snapped to grid indexes with one vectorized KDTree query and the unique indexes
+        are fetched with a few `index IN (...)` Athena queries instead of one query per site.
+
+        :param lats: Latitudes of the sites.
+        :type lats: list[float] or numpy.ndarray
+        :param longs: Longitudes of the sites, aligned with `lats`.
+        :type longs: list[float] or numpy.ndarray
+        :param heights: Hub height for all sites, or one hub height per site.
+        :type heights: int or list[int] or numpy.ndarray
+        :param max_indexes_per_query: Maximum number of grid indexes per Athena query. Default is 500.
+        :type max_indexes_per_query: int
+        :raises ValueError: If the inputs are missing or their lengths do not match.
+        :raises RuntimeError: If fetching or aggregating the data fails.
+        :return: Tidy DataFrame with one row per site and aggregate, rounded to 2 decimals.
+            Columns: site, latitude, longitude, height, index, avg_type ('global', 'yearly', 'monthly' or 'hourly'),
+            period (year, month or hour; missing for 'global') and windspeed.
+        :rtype: pandas.DataFrame
+        """
+        if lats is None or longs is None or heights is None:
+            raise ValueError("Parameters 'lats', 'longs' and 'heights' are required.")
+
+        lats = np.asarray(lats, dtype=np.float64).ravel()
+        longs = np.asarray(longs, dtype=np.float64).ravel()
+        if lats.shape != longs.shape or lats.size == 0:
+            raise ValueError("Parameters 'lats' and 'longs' must be non-empty and of equal length.")
+
+        heights = np.broadcast_to(np.asarray(heights), lats.shape)
+        if not np.issubdtype(heights.dtype, np.integer):
+            raise TypeError("Parameter 'heights' must contain integers.")
+
+        sites = pd.DataFrame({
+            'site': np.arange(lats.size),
+            'latitude': lats,
+            'longitude': longs,
+            'height': heights.astype(int),
+            'index': self._find_nearest_indexes(lats, longs)
+        })
+
+        unique_heights = sorted(sites['height'].unique().tolist())
+        model_columns = [col for col in self.find_relevant_columns(unique_heights, windspeed_interpolation=True) if col.startswith('windspeed')]
+        model_heights = [int(col.split('_')[1][:-1]) for col in model_columns]
+
+        aggregates = []
+        try:
+            for chunk in self.fetch_data_for_indexes(sites['index'].tolist(), model_columns + ['year', 'mohr'], max_indexes_per_query):
+                # Interpolate every requested height for the whole chunk at once
+                windspeeds = interpolate_profile(chunk[model_columns].to_numpy(), model_heights, unique_heights, method=self.interpolation_method)
+                windspeeds = round_half_away(windspeeds, 2)
+                for i, height in enumerate(unique_heights):
+                    frame = pd.DataFrame({
+                        'index': chunk['index'].to_numpy(),
+                        'year': chunk['year'].to_numpy(),
+                        'month': chunk['mohr'].to_numpy() // 100,
+                        'hour': chunk['mohr'].to_numpy() % 100,
+                        'windspeed': windspeeds[:, i]
+                    })
+                    for avg_type, period in [('global', None), ('yearly', 'year'), ('monthly', 'month'), ('hourly', 'hour')]:
+                        keys = ['index'] if period is None else ['index', period]
+                        avg_df = frame.groupby(keys)['windspeed'].mean().reset_index()
+                        avg_df['period'] = None if period is None else avg_df.pop(period)
+                        avg_df['avg_type'] = avg_type
+                        avg_df['height'] = height
+                        aggregates.append(avg_df)
+        except Exception as e:
+            raise RuntimeError("Failed to fetch and aggregate windspeed data for the given sites.") from e
+
+        result = sites.merge(pd.concat(aggregates, ignore_index=True), on=['index', 'height'], how='left')
+        result['period'] = result['period'].astype('Int64')
+        result['windspeed'] = round_half_away(result['windspeed'].to_numpy(dtype=np.float64), 2)
+        return result[['site', 'latitude', 'longitude', 'height', 'index', 'avg_type', 'period', 'windspeed']].sort_values(
+            ['site', 'avg_type', 'period'], ignore_index=True)
+
+    def fetch_aep_at_height(self,
+        lat: float = None,
+        long: float = None,
+        height: int = None,
+        turbines = 'NREL 5MW',
+        air_density_correction: bool = False) -> dict:
+        """
+        Estimate the gross annual energy production (AEP), capacity factor and monthly and hourly energy of turbines at a specified location and hub height.
+
+        The power curves are evaluated over the 12x24 windspeed at `height` (interpolated like `interpolate_windspeed` if needed)
+        with every row weighted by the days of its month. Using the power of month-hour mean windspeeds underestimates
+        the energy of a variable wind, so these are screening values. With `air_density_correction` the windspeed is
+        normalized to the standard air density the power curves refer to, using the air density at hub height.
+
+        :param lat: Latitude of the location.
+        :type lat: float
+        :param long: Longitude of the location.
+        :type long: float
+        :param height: Hub height in meters.
+        :type height: int
+        :param turbines: Reference turbine name ('NREL 5MW', 'IEA 3.4MW', 'IEA 15MW'), a PowerCurve, or a list of them. Default is 'NREL 5MW'.
+        :type turbines: str, PowerCurve or list
+        :param air_density_correction: Correct the windspeed for the air density at hub height. Default is False.
+        :type air_density_correction: bool
+        :raises RuntimeError: If fetching the data or computing the energy fails.
+        :return: Dictionary with the energy per turbine; energies in MWh rounded to 2 decimals, capacity factors to 4.
+            Example:
+            {
+                "aep": [{"turbine": "NREL 5MW", "aep_mwh": 15321.5, "capacity_factor": 0.3498}],
+                "monthly_energy": [{"turbine": "NREL 5MW", "month": 1, "energy_mwh": 1520.4, "capacity_factor": 0.4087}, ...],
+                "hourly_energy": [{"turbine": "NREL 5MW", "hour": 1, "energy_mwh": 640.2, "capacity_factor": 0.3508}, ...]
+            }
+        :rtype: dict
+        """
+        self.pre_check(lat, long, height)
+        curves = [PowerCurve.parse(turbine) for turbine in (turbines if isinstance(turbines, list) else [turbines])]
+        try:
+            columns = self._columns_for_heights([height]) + (self._air_density_columns([height]) if air_density_correction else [])
+            self.fetch_data(lat, long, columns=columns)
+        except Exception as e:
+            raise RuntimeError("Failed to fetch timeseries data.") from e
+        if self.df is None or self.df.empty:
+            raise RuntimeError("No data available after fetching.")
+
+        try:
+            windspeeds, densities = self._hub_height_conditions(self.df, [height], self.interpolation_method, air_density_correction)
+            windspeed = round_half_away(windspeeds[:, 0], 2)
+            if air_density_correction:
+                windspeed = density_adjusted_windspeed(windspeed, densities[:, 0])
+            years = self.df['year'].astype(np.int64).to_numpy()
+            mohr = self.df['mohr'].astype(np.int64).to_numpy()
+            result = energy_yield(windspeed, years, mohr // 100, mohr % 100, hours_per_row(years, mohr // 100), curves)
+        except Exception as e:
+            raise RuntimeError(f"Failed to calculate energy production for windspeed_{height}m.") from e
+        return energy_summary(result, curves)
+
+    def fetch_aep_batch(self,
+        lats: list[float] = None,
+        longs: list[float] = None,
+        heights = None,
+        turbines = 'NREL 5MW',
+        max_indexes_per_query: int = 500,
+        air_density_correction: bool = False) -> pd.DataFrame:
+        """
+        Estimate the gross annual energy production of turbines for many sites at once.
+
+        Sites are snapped to grid indexes and the unique indexes are fetched with a few `index IN (...)` queries, like
+        :meth:`fetch_avgs_at_height_batch`. Per chunk, every hub height is interpolated once and every power curve is
+        evaluated once over all rows; sums per index, month and hour are reduced with `numpy.bincount`.
+
+        :param lats: Latitudes of the sites.
+        :type lats: list[float] or numpy.ndarray
+        :param longs: Longitudes of the sites, aligned with `lats`.
+        :type longs: list[float] or numpy.ndarray
+        :param heights: Hub height for all sites, or one hub height per site.
+        :type heights: int or list[int] or numpy.ndarray
+        :param turbines: Reference turbine name, a PowerCurve, or a list of them. Default is 'NREL 5MW'.
+        :type turbines: str, PowerCurve or list
+        :param max_indexes_per_query: Maximum number of grid indexes per Athena query. Default is 500.
+        :type max_indexes_per_query: int
+        :param air_density_correction: Correct the windspeed for the air density at hub height, see :meth:`fetch_aep_at_height`. Default is False.
+        :type air_density_correction: bool
+        :raises ValueError: If the inputs are missing or their lengths do not match.
+        :raises RuntimeError: If fetching the data or computing the energy fails.
+        :return: Tidy DataFrame with one row per site, turbine and period.
+            Columns: site, latitude, longitude, height, index, turbine, period_type ('annual', 'monthly' or 'hourly'),
+            period (month or hour; missing for 'annual'), energy_mwh (mean annual energy of the period) and capacity_factor.
+        :rtype: pandas.DataFrame
+        """
+        if lats is None or longs is None or heights is None:
+            raise ValueError("Parameters 'lats', 'longs' and 'heights' are required.")
+
+        lats = np.asarray(lats, dtype=np.float64).ravel()
+        longs = np.asarray(longs, dtype=np.float64).ravel()
+        if lats.shape != longs.shape or lats.size == 0:
+            raise ValueError("Parameters 'lats' and 'longs' must be non-empty and of equal length.")
+
+        heights = np.broadcast_to(np.asarray(heights), lats.shape)
+        if not np.issubdtype(heights.dtype, np.integer):
+            raise TypeError("Parameter 'heights' must contain integers.")
+        curves = [PowerCurve.parse(turbine) for turbine in (turbines if isinstance(turbines, list) else [turbines])]
+
+        sites = pd.DataFrame({
+            'site': np.arange(lats.size),
+            'latitude': lats,
+            'longitude': longs,
+            'height': heights.astype(int),
+            'index': self._find_nearest_indexes(lats, longs)
+        })
+
+        unique_heights = sorted(sites['height'].unique().tolist())
+        columns = [col for col in self.find_relevant_columns(unique_heights, windspeed_interpolation=True) if col.startswith('windspeed')]
+        if air_density_correction:
+            columns += self._air_density_columns(unique_heights)
+        turbine_names = np.array([curve.name for curve in curves])
+
+        energies = []
+        try:
+            for chunk in self.fetch_data_for_indexes(sites['index'].tolist(), columns + ['year', 'mohr'], max_indexes_per_query):
+                groups, indexes = pd.factorize(chunk['index'].astype(str))
+                years = chunk['year'].astype(np.int64).to_numpy()
+                mohr = chunk['mohr'].astype(np.int64).to_numpy()
+                hours = hours_per_row(years, mohr // 100)
+                # Windspeed and air density of every hub height from one pass over the chunk
+                windspeeds, densities = self._hub_height_conditions(chunk, unique_heights, self.interpolation_method, air_density_correction)
+                windspeeds = round_half_away(windspeeds, 2)
+                if air_density_correction:
+                    windspeeds = density_adjusted_windspeed(windspeeds, densities)
+                for i, height in enumerate(unique_heights):
+                    result = energy_yield(windspeeds[:, i], years, mohr // 100, mohr % 100, hours, curves, groups=groups)
+                    for period_type, energy_key, periods in [('annual', 'aep', None), ('monthly', 'monthly', result['months']), ('hourly', 'hourly', result['hours'])]:
+                        energy = result[f"{energy_key}_kwh"] if periods is not None else result['aep_kwh'][:, :, None]
+                        capacity_factor = result[f"{energy_key}_capacity_factor"] if periods is not None else result['capacity_factor'][:, :, None]
+                        n_groups, n_curves, n_periods = energy.shape
+                        energies.append(pd.DataFrame({
+                            'index': np.repeat(indexes.to_numpy(), n_curves * n_periods),
+                            'height': height,
+                            'turbine': np.tile(np.repeat(turbine_names, n_periods), n_groups),
+                            'period_type': period_type,
+                            'period': np.tile(periods, n_groups * n_curves) if periods is not None else None,
+                            'energy_mwh': energy.ravel() / 1000,
+                            'capacity_factor': capacity_factor.ravel()
+                        }))
+        except Exception as e:
+            raise RuntimeError("Failed to fetch windspeed data and calculate energy production for the given sites.") from e
+
+        result = sites.merge(pd.concat(energies, ignore_index=True), on=['index', 'height'], how='left')
+        result['period'] = result['period'].astype('Int64')
+        result['energy_mwh'] = result['energy_mwh'].round(2)
+        result['capacity_factor'] = result['capacity_factor'].round(4)
+        return result[['site', 'latitude', 'longitude', 'height', 'index', 'turbine', 'period_type', 'period', 'energy_mwh', 'capacity_factor']].sort_values(
+            ['site', 'turbine', 'period_type', 'period'], ignore_index=True)
+
+    def fetch_air_density_at_height(self,
+        lat: float = None,
+        long: float = None,
+        height: int = None) -> dict:
+        """
+        Retrieve the air density, density-adjusted windspeed and wind power density at a specified location and height, overall and per month.
+
+        The air density follows from the ideal gas law with the temperature interpolated linearly and the pressure
+        log-linearly in height; only the temperature and pressure columns around `height` are fetched, and they are
+        interpolated in the same pass as the windspeed. The density-adjusted windspeed is v * (rho / 1.225)^(1/3)
+        and the power density 0.5 * rho * v^3 of every 12x24 row. As the rows are month-hour means, the power
+        density underestimates that of the hourly wind.
+
+        :param lat: Latitude of the location.
+        :type lat: float
+        :param long: Longitude of the location.
+        :type long: float
+        :param height: Height in meters.
+        :type height: int
+        :raises RuntimeError: If fetching the data or computing the air density fails.
+        :return: Dictionary with the means over all rows and per month; air density in kg/m^3 rounded to 4 decimals,
+            windspeeds in m/s and power density in W/m^2 rounded to 2.
+            Example:
+            {
+                "air_density": 1.0342, "windspeed": 7.85, "density_adjusted_windspeed": 7.43, "power_density": 412.6,
+                "monthly": [{"month": 1, "air_density": 1.0687, "windspeed": 8.4, "density_adjusted_windspeed": 8.03, "power_density": 520.11}, ...]
+            }
+        :rtype: dict
+        """
+        self.pre_check(lat, long, height)
+        try:
+            self.fetch_data(lat, long, columns=self._columns_for_heights([height]) + self._air_density_columns([height]))
+        except Exception as e:
+            raise RuntimeError("Failed to fetch timeseries data.") from e
+        if self.df is None or self.df.empty:
+            raise RuntimeError("No data available after fetching.")
+
+        try:
+            windspeeds, densities = self._hub_height_conditions(self.df, [height], self.interpolation_method, with_air_density=True)
+            windspeed, density = round_half_away(windspeeds[:, 0], 2), densities[:, 0]
+            # (4, n_rows) variables averaged together, one bincount per variable
+            variables = np.stack([density, windspeed, density_adjusted_windspeed(windspeed, density), power_density(windspeed, density)])
+            valid = np.isfinite(variables).all(axis=0)
+            months = self.df['mohr'].astype(np.int64).to_numpy() // 100
+            counts = np.bincount(months, weights=valid)
+            sums = np.stack([np.bincount(months, weights=np.where(valid, row, 0.0)) for row in variables])
+        except Exception as e:
+            raise RuntimeError(f"Failed to calculate the air density at {height}m.") from e
+
+        names = ['air_density', 'windspeed', 'density_adjusted_windspeed', 'power_density']
+        decimals = [4, 2, 2, 2]
+
+        def means(totals: np.ndarray, count: float) -> dict:
+            return {name: round(float(total / count), digits) if count else float('nan') for name, total, digits in zip(names, totals, decimals)}
+
         return {
-                "hourly_avg": self.hourly_avg   
-        }
\ No newline at end of file
+            **means(sums.sum(axis=1), counts.sum()),
+            "monthly": [{"month": int(month), **means(sums[:, month], counts[month])} for month in np.flatnonzero(counts)]
+        }
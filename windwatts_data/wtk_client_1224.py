@@ -1,15 +1,17 @@
 import os
 import pandas as pd
 from .client_base import client_base
+from .downloader import download_objects
+from .query_builder import INDEX_FROM_PATH, MOHR_HOUR, MOHR_MONTH, QueryPlan
 
 class WTKLedClient1224(client_base):
     """
     This class is called WTKLedClient1224 because the source data is called "Wind ToolKit" 
     and this data is hourly averages of windspeed, winddirection etc at different heights across each month.
     """
-    def __init__(self, config_path: str = None):
+    def __init__(self, config_path: str = None, lazy: bool = False):
         # Load configuration
-        super().__init__(config_path, data='wtk')
+        super().__init__(config_path, data='wtk', lazy=lazy)
     
     def download_1224_data(self,
         years: list[int]= None,
@@ -17,10 +19,13 @@ class WTKLedClient1224(client_base):
         long: float= None,
         n_nearest: int = 1,
         varset: str = 'all',
-        local_dir: str = 'downloads'
+        local_dir: str = 'downloads',
+        max_workers: int = 8,
+        max_retries: int = 3
         ) -> list[str]:
         """
         Download CSV.GZ files containing timeseries data at specific location(s) for specific year(s).
+        Files are downloaded concurrently; files already present in `local_dir` are skipped and a manifest.json is kept there so an interrupted download can be resumed by calling this function again.
 
         :param years: List of years (e.g., [2001, 2002]) for which data should be downloaded.(Required)
         :type years: list[int] or None
@@ -34,6 +39,10 @@ class WTKLedClient1224(client_base):
         :type varset: str
         :param local_dir: Local directory to save the downloaded files. Default is 'downloads'.(Optional)
         :type local_dir: str
+        :param max_workers: Maximum number of concurrent downloads. Default is 8.(Optional)
+        :type max_workers: int
+        :param max_retries: Number of retries per file with exponential backoff. Default is 3.(Optional)
+        :type max_retries: int
         :raises TypeError: If `lat` or `long` or `years` is None.
         :raises ValueError: If `years` is not a list of integers, if `lat` or `long` are not valid numbers, 
                             or if `n_nearest` is not between 1 and 16.
@@ -75,18 +84,17 @@ class WTKLedClient1224(client_base):
             raise RuntimeError(f"Failed to determine nearest locations: {e}")
 
         # Step 2: Construct and download files
-        downloaded_files = []
-        for index in indexes:
-            for year in years:
-                s3_key = f"1224/year={year}/varset={varset}/index={index}/{index}_{year}_{varset}.csv.gz"
-                local_file_path = os.path.join(local_dir, f"{index}_{year}_{varset}.csv.gz")
-                try:
-                    print(f"Downloading {s3_key} from S3...")
-                    self.s3.download_file(self.bucket_name, s3_key, local_file_path, ExtraArgs={'RequestPayer': 'requester'})
-                    downloaded_files.append(local_file_path)
-                    print(f"Downloaded: {local_file_path}")
-                except Exception as e:
-                    print(f"Failed to download {s3_key}: {str(e)}")
+        tasks = [
+            (f"1224/year={year}/varset={varset}/index={index}/{index}_{year}_{varset}.csv.gz", f"{index}_{year}_{varset}.csv.gz")
+            for index in indexes
+            for year in years
+        ]
+        downloaded_files = download_objects(
+            self.s3, self.bucket_name, tasks, local_dir,
+            max_workers=max_workers,
+            max_retries=max_retries,
+            extra_args={'RequestPayer': 'requester'}
+        )
 
         return downloaded_files
     
@@ -99,7 +107,10 @@ class WTKLedClient1224(client_base):
         long: float = None,
         heights: list[float] = None,
         n_nearest: int = 1,
-        varset: str = "all"
+        varset: str = "all",
+        unload: bool = False,
+        chunksize: int = None,
+        region=None
         ) -> pd.DataFrame:
         """
         Generalized function to fetch filtered data (timeseries and map), given filters based on location(s), time and height(s).
@@ -122,6 +133,12 @@ class WTKLedClient1224(client_base):
         :type n_nearest: int
         :param varset: Variable set to filter data. Default is "all".
         :type varset: str
+        :param unload: If True, results are retrieved through an UNLOAD to Parquet instead of parsing the CSV result. Faster and lighter on memory for large results. Default is False.
+        :type unload: bool
+        :param chunksize: If given, the result is streamed and a generator of DataFrames with at most `chunksize` rows is returned instead of one DataFrame. Default is None.
+        :type chunksize: int or None
+        :param region: Bounding box (min_long, min_lat, max_long, max_lat), list of (long, lat) polygon vertices, GeoJSON polygon or shapely geometry. Only the grid locations inside it are queried, in chunked `index IN (...)` queries. Cannot be combined with `lat` and `long`. Default is None.
+        :type region: tuple, list, dict or None
         :return: A pandas DataFrame containing the filtered data(map or timeseries) based on the specified parameters.
         :rtype: pandas.DataFrame
         """
@@ -166,7 +183,9 @@ class WTKLedClient1224(client_base):
                 raise ValueError("Please specify either 'columns' or 'heights', not both.")
 
         
-        self._reset_index_(lat,long)
+        self._validate_region(region, lat, long)
+
+        self._reset_index_(lat,long,region)
         
         # Ensure all requested columns exist
         if columns is not None:
@@ -188,52 +207,43 @@ class WTKLedClient1224(client_base):
                 raise RuntimeError("Failed to find relevant columns for specified heights.") from e
 
         # Construct the SELECT clause
-        columns_str = ', '.join(columns)
+        plan = QueryPlan(self.athena_table_name, columns)
         
-        query = f"SELECT {columns_str}"
-        
-        if lat is None and long is None:
-            query += f", regexp_extract(\"$path\", '.*/index=([^/]+)/.*', 1) AS index"
+        if lat is None and long is None and region is None:
+            plan.add_select(INDEX_FROM_PATH, "index")
         else:
-            query += f", index"
-        
-        query += f" FROM {self.athena_table_name} WHERE 1=1"
+            plan.add_select("index")
 
         # Add filters dynamically
         if years:
-            year_list = ', '.join([f"'{year}'" for year in years])
-            query += f" AND year IN ({year_list})"
+            plan.where_in("year", years)
             
         if months:
-            month_list = ', '.join([str(month) for month in months])
-            query += f" AND CAST(mohr AS INT) / 100 IN ({month_list})"
+            plan.where_in(MOHR_MONTH, months, quote=False)
         
         if hours:
-            hour_list = ', '.join([str(hour) for hour in hours])
-            query += f" AND CAST(mohr AS INT) % 100 IN ({hour_list})"
+            plan.where_in(MOHR_HOUR, hours, quote=False)
             
         if varset:
-            query += f" AND varset = '{varset}'"
+            plan.where_in("varset", varset)
+
+        if region is not None:
+            self._apply_region_filter(plan, region)
+            return self.query_athena_split(plan, unload=unload, chunksize=chunksize)
 
         if lat is not None and long is not None:
             try:
-                if n_nearest == 1:
-                    index = self.find_nearest_location(lat, long)
-                    if not index:
-                        raise ValueError("No valid nearest location found.")
-                    query += f" AND index = '{index}'"
-                else:
-                    indexes = self.find_n_nearest_locations(lat, long, n_nearest)
-                    if not indexes:
-                        raise ValueError("No valid nearest locations found.")
-                    index_list = ', '.join([f"'{idx}'" for idx in indexes])
-                    query += f" AND index IN ({index_list})"
+                self._apply_location_filter(plan, lat, long, n_nearest)
             except Exception as e:
                 raise RuntimeError("Failed to process location-based filtering.") from e
                 
-            result_df = self.query_athena(query)
+            if chunksize:
+                return self.query_athena_iter(plan, chunksize=chunksize, unload=unload)
+            result_df = self.query_athena(plan, unload=unload)
         else:
-            result_df = self.query_athena(query,return_result_location=True)
+            if chunksize:
+                return self.query_athena_iter(plan, chunksize=chunksize, unload=unload)
+            result_df = self.query_athena(plan, return_result_location=True, unload=unload)
         
         return result_df
     
@@ -254,7 +264,11 @@ class WTKLedClient1224(client_base):
         group_by_hour: bool = False,
         order_by: str = None,
         order_direction: str = 'ASC',
-        varset: str = "all"
+        varset: str = "all",
+        chunksize: int = None,
+        region=None,
+        interpolation: str = None,
+        idw_power: float = 2.0
         ) -> pd.DataFrame:
         """
         Calculate a specified statistic (e.g., AVG, SUM) for selected columns or columns with specific height.
@@ -292,6 +306,14 @@ class WTKLedClient1224(client_base):
         :type order_direction: str, optional
         :param varset: Variable set to filter data. Default is "all".
         :type varset: str
+        :param chunksize: If given, the result is streamed and a generator of DataFrames with at most `chunksize` rows is returned instead of one DataFrame. Default is None.
+        :type chunksize: int or None
+        :param region: Bounding box (min_long, min_lat, max_long, max_lat), list of (long, lat) polygon vertices, GeoJSON polygon or shapely geometry. Only the grid locations inside it are queried, in chunked `index IN (...)` queries. Cannot be combined with `lat` and `long`. Default is None.
+        :type region: tuple, list, dict or None
+        :param interpolation: 'idw' or 'bilinear' to interpolate the statistic at (`lat`, `long`) from the surrounding grid locations instead of using the nearest one. `n_nearest` then sets the number of neighbours (default 4 for IDW, 8 for bilinear). Only AVG and SUM can be interpolated. Default is None.
+        :type interpolation: str or None
+        :param idw_power: Power of the inverse distance weights. Default is 2.
+        :type idw_power: float
         :return: A pandas DataFrame containing the statistical results based on the specified filters and groupings.
         :rtype: pandas.DataFrame
         """
@@ -335,7 +357,15 @@ class WTKLedClient1224(client_base):
                 raise ValueError("Specify either 'columns' or 'heights', not both.")
 
 
-        self._reset_index_(lat,long)
+        self._validate_region(region, lat, long)
+
+        if interpolation is not None:
+            if lat is None or long is None:
+                raise ValueError("Parameters 'lat' and 'long' must be provided for interpolation.")
+            if statistic.upper() not in ('AVG', 'SUM'):
+                raise ValueError("Only the 'AVG' and 'SUM' statistics can be interpolated.")
+
+        self._reset_index_(lat,long,region)
         
         # Ensure all requested columns exist
         if columns is not None:
@@ -356,75 +386,65 @@ class WTKLedClient1224(client_base):
             columns = self.find_relevant_columns(heights)
 
         # Construct the SELECT clause for statistical computation
-        select_clause = [f"{statistic}({col}) AS {col}_{statistic.lower()}" for col in columns]
+        plan = QueryPlan(self.athena_table_name)
+        for col in columns:
+            plan.add_aggregate(statistic, col, f"{col}_{statistic.lower()}")
         
         # Add grouping columns conditionally
-        group_by_columns = []
-        
-        if n_nearest > 1 and group_by_index:
-            select_clause.append("index")
-            group_by_columns.append("index")
+        if ((n_nearest > 1 or region is not None) and group_by_index) or interpolation is not None:
+            plan.group("index")
         
         if group_by_year:
-            select_clause.append("year")
-            group_by_columns.append("year")
+            plan.group("year")
         
         if group_by_month:
-            select_clause.append("CAST(mohr AS INT) / 100 AS month")
-            group_by_columns.append("CAST(mohr AS INT) / 100")
+            plan.group(MOHR_MONTH, "month")
         
         if group_by_hour:
-            select_clause.append("CAST(mohr AS INT) % 100 AS hour")
-            group_by_columns.append("CAST(mohr AS INT) % 100")
+            plan.group(MOHR_HOUR, "hour")
         
         # Ensure the order_by column is in the SELECT clause
-        if order_by and order_by.lower() not in [col.split(" AS ")[-1] for col in select_clause]:
-            raise ValueError(f"The order_by column '{order_by}' must be included in the SELECT statement. Here are the selected columns for this query: {', '.join(select_clause)}")
-        
-        query = f"SELECT {', '.join(select_clause)} FROM {self.athena_table_name} WHERE 1=1"
+        if order_by:
+            plan.order(order_by, order_direction)
         
         # Add filters for location
-        if lat is not None and long is not None:
+        if interpolation is not None:
+            codes, weights = self._interpolation_neighbours(
+                [lat], [long], interpolation, n_nearest if n_nearest > 1 else None, idw_power
+            )
+            plan.where_in("index", codes[0])
+        elif lat is not None and long is not None:
             try:
-                if n_nearest == 1:
-                    index = self.find_nearest_location(lat, long)
-                    query += f" AND index IN ('{index}')"
-                else:
-                    indexes = self.find_n_nearest_locations(lat, long, n_nearest)
-                    if indexes:
-                        index_list = ', '.join([f"'{idx}'" for idx in indexes])
-                        query += f" AND index IN ({index_list})"
+                self._apply_location_filter(plan, lat, long, n_nearest)
             except Exception as e:
                 raise RuntimeError("Failed to process location-based filtering for given lat and long.") from e
 
         # Add filters for years
         if years:
-            years_list = ', '.join([f"'{year}'" for year in years])
-            query += f" AND year IN ({years_list})"
+            plan.where_in("year", years)
 
         # Add filters for months
         if months:
-            month_list = ', '.join([str(month) for month in months])
-            query += f" AND CAST(mohr AS INT) / 100 IN ({month_list})"
+            plan.where_in(MOHR_MONTH, months, quote=False)
         
         # Add filters for hours
         if hours:
-            hour_list = ', '.join([str(hour) for hour in hours])
-            query += f" AND CAST(mohr AS INT) % 100 IN ({hour_list})"
+            plan.where_in(MOHR_HOUR, hours, quote=False)
 
         if varset:
-            query += f" AND varset = '{varset}'"   
-        
-        if group_by_columns:
-            query += f" GROUP BY {', '.join(group_by_columns)}"
-        
-        # Add ORDER BY clause if specified
-        if order_by:
-            if order_direction.upper() not in ['ASC', 'DESC']:
-                raise ValueError("Invalid order_direction. Use 'ASC' or 'DESC'.")
-            query += f" ORDER BY {order_by} {order_direction.upper()}"
+            plan.where_in("varset", varset)
         
-        result_df = self.query_athena(query, reduce_poll=True)
+        if region is not None:
+            self._apply_region_filter(plan, region)
+            return self.query_athena_split(plan, chunksize=chunksize, reduce_poll=True)
+
+        if interpolation is not None:
+            result_df = self._blend_statistic(plan, self.query_athena(plan, reduce_poll=True), codes, weights)
+            return self._frame_chunks(result_df, chunksize) if chunksize else result_df
+
+        if chunksize:
+            return self.query_athena_iter(plan, chunksize=chunksize, reduce_poll=True)
+        result_df = self.query_athena(plan, reduce_poll=True)
         
         return result_df
     
@@ -489,48 +509,31 @@ class WTKLedClient1224(client_base):
         
         # Construct the SELECT clause
         avg_column_name = f"{windspeed_column}_avg"  # Reflect height in the column name
-        select_clause = [f"AVG({windspeed_column}) AS {avg_column_name}"]
+        plan = QueryPlan(self.athena_table_name).add_aggregate("AVG", windspeed_column, avg_column_name)
 
         # Add grouping columns conditionally
-        group_by_columns = []
-        # Include year in the SELECT clause if yearly is True
         if group_by_year:
-            select_clause.append("year")
-            group_by_columns.append("year")
+            plan.group("year")
         
         if group_by_month:
-            select_clause.append("CAST(mohr AS INT) / 100 AS month")
-            group_by_columns.append("CAST(mohr AS INT) / 100")
+            plan.group(MOHR_MONTH, "month")
         
         if group_by_hour:
-            select_clause.append("CAST(mohr AS INT) % 100 AS hour")
-            group_by_columns.append("CAST(mohr AS INT) % 100")
+            plan.group(MOHR_HOUR, "hour")
         
         # Ensure the order_by column is in the SELECT clause
-        if order_by and order_by.lower() not in [col.split(" AS ")[-1] for col in select_clause]:
-            raise ValueError(f"The order_by column '{order_by}' must be included in the SELECT statement. Here are the selected columns for this query: {', '.join(select_clause)}")
-        
-        query = f"SELECT {', '.join(select_clause)} FROM {self.athena_table_name} WHERE 1=1"
+        if order_by:
+            plan.order(order_by, order_direction)
         
         # Add filters for location
         if lat is not None and long is not None:
-            index = self.find_nearest_location(lat, long)
-            query += f" AND index IN ('{index}')"
+            self._apply_location_filter(plan, lat, long)
         
         if varset:
-            query += f" AND varset = '{varset}'"
-        
-        if group_by_columns:
-            query += f" GROUP BY {', '.join(group_by_columns)}"
-        
-        # Add ORDER BY clause if specified
-        if order_by:
-            if order_direction.upper() not in ['ASC', 'DESC']:
-                raise ValueError("Invalid order_direction. Use 'ASC' or 'DESC'.")
-            query += f" ORDER BY {order_by} {order_direction.upper()}"
+            plan.where_in("varset", varset)
         
         # Execute the query and return the result as a DataFrame
-        result_df = self.query_athena(query, reduce_poll=True)
+        result_df = self.query_athena(plan, reduce_poll=True)
         return result_df
     
     def fetch_timeseries_1224(self,
@@ -539,7 +542,9 @@ class WTKLedClient1224(client_base):
         heights: list[float] = None, 
         years: list[int] = None,
         n_nearest = 1,
-        varset: str = "all") -> pd.DataFrame:
+        varset: str = "all",
+        interpolation: str = None,
+        idw_power: float = 2.0) -> pd.DataFrame:
         """
         Fetch windspeed and wind direction time series for a given latitude, longitude, and height(s).
         Optionally, filter the data by specific year(s) and fetch data for the nearest location(s).
@@ -556,6 +561,10 @@ class WTKLedClient1224(client_base):
         :type n_nearest: int
         :param varset: Variable set to filter data. Default is "all".
         :type varset: str
+        :param interpolation: 'idw' or 'bilinear' to interpolate the series at (`lat`, `long`) from the surrounding grid locations instead of returning the series of the nearest one(s). `n_nearest` then sets the number of neighbours (default 4 for IDW, 8 for bilinear). Default is None.
+        :type interpolation: str or None
+        :param idw_power: Power of the inverse distance weights. Default is 2.
+        :type idw_power: float
         :return: A pandas DataFrame containing windspeed and wind direction time series data.
         :rtype: pandas.DataFrame
         """
@@ -583,6 +592,16 @@ class WTKLedClient1224(client_base):
             if not all(isinstance(year, int) for year in years):
                 raise ValueError("All elements in 'years' must be integers.")
         
+        if interpolation is not None:
+            result_df = self.fetch_timeseries_interpolated_1224(
+                [lat], [long], heights, years,
+                method=interpolation,
+                n_nearest=n_nearest if n_nearest > 1 else None,
+                idw_power=idw_power,
+                varset=varset
+            )
+            return result_df.drop(columns='site')
+
         self._reset_index_(lat,long)
         
         # Find the nearest relevant columns for the specified height
@@ -597,44 +616,84 @@ class WTKLedClient1224(client_base):
         
 
         # Construct the query
-        columns_str = ', '.join(columns)
-        query = f"SELECT {columns_str} FROM {self.default_athena_table_name} WHERE 1=1"
+        plan = QueryPlan(self.default_athena_table_name, columns)
 
         # Add years filter if provided
         if years:
-            years_list = ', '.join([f"'{year}'" for year in years])
-            query += f" AND year IN ({years_list})"
+            plan.where_in("year", years)
 
         # Add location filter
         try:
-            if n_nearest == 1:
-                index = self.find_nearest_location(lat, long)
-                query += f" AND index IN ('{index}')"
-            else:
-                indexes = self.find_n_nearest_locations(lat, long, n_nearest)
-                if indexes:
-                    index_list = ', '.join([f"'{idx}'" for idx in indexes])
-                    query += f" AND index IN ({index_list})"
+            self._apply_location_filter(plan, lat, long, n_nearest)
         except Exception as e:
             raise RuntimeError("Failed to process location-based filtering for given lat and long.") from e
         
         if varset:
-            query += f" AND varset = '{varset}'"
+            plan.where_in("varset", varset)
 
         # Execute the query
         try:
-            result_df = self.query_athena(query)
+            result_df = self.query_athena(plan)
         except Exception as e:
             raise RuntimeError("Failed to execute query and fetch results.") from e
 
         return result_df
+
+    def fetch_timeseries_interpolated_1224(self,
+        lats: list[float],
+        longs: list[float],
+        heights: list[float],
+        years: list[int] = None,
+        method: str = 'idw',
+        n_nearest: int = None,
+        idw_power: float = 2.0,
+        varset: str = "all") -> pd.DataFrame:
+        """
+        Fetch windspeed and wind direction 12x24 series interpolated at many sites from their surrounding grid locations.
+        The series of all neighbours are fetched once, in chunked `index IN (...)` queries, and blended for all sites and timestamps at once.
+        Wind directions are blended as unit vectors.
+
+        :param lats: Latitudes of the sites.
+        :type lats: list[float] or numpy.ndarray
+        :param longs: Longitudes of the sites.
+        :type longs: list[float] or numpy.ndarray
+        :param heights: List of heights (e.g., [10.0, 50.0]) for which wind data should be retrieved.
+        :type heights: list[float]
+        :param years: List of years to filter the data. Optional.
+        :type years: list[int] or None
+        :param method: 'idw' (inverse distance weighting) or 'bilinear'. Sites without a neighbour in every quadrant fall back to IDW. Default is 'idw'.
+        :type method: str
+        :param n_nearest: Number of neighbours per site, between 1 and 16. Default is 4 for IDW and 8 for bilinear.
+        :type n_nearest: int or None
+        :param idw_power: Power of the inverse distance weights. Default is 2.
+        :type idw_power: float
+        :param varset: Variable set to filter data. Default is "all".
+        :type varset: str
+        :return: A pandas DataFrame with a 'site' column (position of the site in `lats`), 'year', 'mohr' and the interpolated columns.
+        :rtype: pandas.DataFrame
+        """
+        if not heights or not isinstance(heights, list):
+            raise TypeError("Parameter 'heights' must be a non-empty list.")
+
+        self._reset_index_(lats, longs)
+
+        columns = [col for col in self.find_relevant_columns(heights) if col.startswith('windspeed') or col.startswith('winddirection')]
+        if not columns:
+            raise ValueError("Could not find relevant columns for 'windspeed' or 'winddirection' at the specified height.")
+
+        return self._fetch_interpolated_timeseries(
+            lats, longs, columns, ['year', 'mohr'], years,
+            method=method, n_nearest=n_nearest, idw_power=idw_power, varset=varset
+        )
     
     def fetch_windspeed_map_1224(self, 
         height: float = None, 
         year: int = None,
         month: int = None,
         hour: int = None,
-        varset: str = "all")-> pd.DataFrame:
+        varset: str = "all",
+        unload: bool = False,
+        region=None)-> pd.DataFrame:
         """
         Fetch windspeed map data for specified height for a specific year, month and hour.
 
@@ -648,6 +707,10 @@ class WTKLedClient1224(client_base):
         :type hour: int
         :param varset: Variable set to filter data. Default is "all".
         :type varset: str
+        :param unload: If True, results are retrieved through an UNLOAD to Parquet instead of parsing the CSV result. Faster and lighter on memory for large results. Default is False.
+        :type unload: bool
+        :param region: Bounding box (min_long, min_lat, max_long, max_lat), list of (long, lat) polygon vertices, GeoJSON polygon or shapely geometry. Only the grid locations inside it are queried, in chunked `index IN (...)` queries. Default is None.
+        :type region: tuple, list, dict or None
         :return: A pandas DataFrame containing windspeed map data.
         :rtype: pandas.DataFrame
         """
@@ -675,7 +738,7 @@ class WTKLedClient1224(client_base):
             if not isinstance(hour, int) or not 1<=hour<=24:
                 raise ValueError("Parameter 'hour' must be a integer with range (1-24).")
         
-        self._reset_index_(None,None)
+        self._reset_index_(None,None,region)
         
         # Find the nearest relevant columns for the specified height
         try:
@@ -688,27 +751,26 @@ class WTKLedClient1224(client_base):
         
 
         # Construct the query
-        columns_str = ', '.join(columns)
-        
-        query = f"SELECT {columns_str}"
-        query += f", regexp_extract(\"$path\", '.*/index=([^/]+)/.*', 1) AS index"
-        query += f" FROM {self.athena_table_name} WHERE 1=1"
-
-        if year:
-            query += f" AND year = '{year}'"
-
-        if month:
-            query += f" AND CAST(mohr AS INT) / 100 = {month}"
+        plan = QueryPlan(self.athena_table_name, columns)
+        if region is None:
+            plan.add_select(INDEX_FROM_PATH, "index")
+        else:
+            plan.add_select("index")
 
-        if hour:
-            query += f" AND CAST(mohr AS INT) % 100 = {hour}"
+        plan.where_in("year", year)
+        plan.where_in(MOHR_MONTH, month, quote=False)
+        plan.where_in(MOHR_HOUR, hour, quote=False)
 
         if varset:
-            query += f" AND varset = '{varset}'"
+            plan.where_in("varset", varset)
+
+        if region is not None:
+            self._apply_region_filter(plan, region)
+            return self.query_athena_split(plan, unload=unload)
 
         # Execute the query
         try:
-            result_df = self.query_athena(query, return_result_location=True)
+            result_df = self.query_athena(plan, return_result_location=True, unload=unload)
         except Exception as e:
             raise RuntimeError("Failed to execute query and fetch results.") from e
 
@@ -719,7 +781,9 @@ class WTKLedClient1224(client_base):
         year: int = None,
         month: int = None,
         hour: int = None,
-        varset: str = "all")-> pd.DataFrame:
+        varset: str = "all",
+        unload: bool = False,
+        region=None)-> pd.DataFrame:
         """
         Fetch winddirection map data for specified height, year, month and hour.
 
@@ -734,6 +798,10 @@ class WTKLedClient1224(client_base):
         :return: A pandas DataFrame containing winddirection map data.
         :param varset: Variable set to filter data. Default is "all".
         :type varset: str
+        :param unload: If True, results are retrieved through an UNLOAD to Parquet instead of parsing the CSV result. Faster and lighter on memory for large results. Default is False.
+        :type unload: bool
+        :param region: Bounding box (min_long, min_lat, max_long, max_lat), list of (long, lat) polygon vertices, GeoJSON polygon or shapely geometry. Only the grid locations inside it are queried, in chunked `index IN (...)` queries. Default is None.
+        :type region: tuple, list, dict or None
         :rtype: pandas.DataFrame
         """
         # Validate heights
@@ -760,7 +828,7 @@ class WTKLedClient1224(client_base):
             if not isinstance(hour, int) or not 1<=hour<=24:
                 raise ValueError("Parameter 'hour' must be a integer with range (1-24).")
         
-        self._reset_index_(None,None)
+        self._reset_index_(None,None,region)
         
         # Find the nearest relevant columns for the specified height
         try:
@@ -773,27 +841,26 @@ class WTKLedClient1224(client_base):
         
 
         # Construct the query
-        columns_str = ', '.join(columns)
-        
-        query = f"SELECT {columns_str}"
-        query += f", regexp_extract(\"$path\", '.*/index=([^/]+)/.*', 1) AS index"
-        query += f" FROM {self.athena_table_name} WHERE 1=1"
-
-        if year:
-            query += f" AND year = '{year}'"
+        plan = QueryPlan(self.athena_table_name, columns)
+        if region is None:
+            plan.add_select(INDEX_FROM_PATH, "index")
+        else:
+            plan.add_select("index")
 
-        if month:
-            query += f" AND CAST(mohr AS INT) / 100 = {month}"
+        plan.where_in("year", year)
+        plan.where_in(MOHR_MONTH, month, quote=False)
+        plan.where_in(MOHR_HOUR, hour, quote=False)
 
-        if hour:
-            query += f" AND CAST(mohr AS INT) % 100 = {hour}"
-        
         if varset:
-            query += f" AND varset = '{varset}'"
+            plan.where_in("varset", varset)
+
+        if region is not None:
+            self._apply_region_filter(plan, region)
+            return self.query_athena_split(plan, unload=unload)
 
         # Execute the query
         try:
-            result_df = self.query_athena(query, return_result_location=True)
+            result_df = self.query_athena(plan, return_result_location=True, unload=unload)
         except Exception as e:
             raise RuntimeError("Failed to execute query and fetch results.") from e
 
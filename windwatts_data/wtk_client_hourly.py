@@ -1,14 +1,18 @@
 import os
+import numpy as np
 import pandas as pd
-from io import BytesIO
+from .air_density import density_adjusted_windspeed, power_density
 from .client_base import client_base
+from .energy import PowerCurve, energy_summary, energy_yield, hours_per_row
+from .query_builder import INDEX_FROM_PATH, QueryPlan, time_filter_predicates, time_part_expression
+from .downloader import PARQUET_OUTPUT_FORMATS, consolidate_dataset, download_objects, parquet_transform
 
 
 class WTKLedClientHourly(client_base):
     
-    def __init__(self, config_path : str = None):
+    def __init__(self, config_path : str = None, lazy: bool = False):
         # Load configuration from a file if provided
-        super().__init__(config_path, data='wtk')
+        super().__init__(config_path, data='wtk', lazy=lazy)
         
     def download_hourly_data(self,
         years: list[int]= None,
@@ -16,10 +20,16 @@ class WTKLedClientHourly(client_base):
         long: float= None,
         n_nearest: int = 1,
         varset: str = 'all',
-        local_dir: str = 'downloads'
+        local_dir: str = 'downloads',
+        max_workers: int = 8,
+        max_retries: int = 3,
+        output_format: str = 'csv',
+        consolidate_dir: str = None
         ) -> list[str]:
         """
-        Download CSV.GZ files containing timeseries data at specific location(s) for specific year(s).
+        Download files containing timeseries data at specific location(s) for specific year(s).
+        The source objects are Parquet; with output_format='parquet' they are streamed to disk as is, without being decoded.
+        Files are downloaded concurrently; files already present in `local_dir` are skipped and a manifest.json is kept there so an interrupted download can be resumed by calling this function again.
 
         :param years: List of years (e.g., [2001, 2002]) for which data should be downloaded.(Required)
         :type years: list[int] or None
@@ -33,9 +43,17 @@ class WTKLedClientHourly(client_base):
         :type varset: str
         :param local_dir: Local directory to save the downloaded files. Default is 'downloads'.(Optional)
         :type local_dir: str
+        :param max_workers: Maximum number of concurrent downloads. Default is 8.(Optional)
+        :type max_workers: int
+        :param max_retries: Number of retries per file with exponential backoff. Default is 3.(Optional)
+        :type max_retries: int
+        :param output_format: Format of the local files: 'parquet', 'feather', 'csv.gz' or 'csv'. Default is 'csv'.(Optional)
+        :type output_format: str
+        :param consolidate_dir: If given, all downloaded index-years are also written to one local Parquet dataset in this directory, partitioned as year=<year>/index=<index>.(Optional)
+        :type consolidate_dir: str or None
         :raises TypeError: If `lat` or `long` or `years` is None.
         :raises ValueError: If `years` is not a list of integers, if `lat` or `long` are not valid numbers, 
-                            or if `n_nearest` is not between 1 and 16.
+                            if `n_nearest` is not between 1 and 16, or if `output_format` is unknown.
         :raises RuntimeError: If the local directory cannot be created or if the nearest location(s) cannot be determined.
         :return: A list of file paths for the successfully downloaded files.
         :rtype: list[str]
@@ -58,6 +76,8 @@ class WTKLedClientHourly(client_base):
         if not (1 <= n_nearest <= 16):
             raise ValueError("Parameter 'n_nearest' must be between 1 and 16.")
         
+        transform = parquet_transform(output_format)
+
         try:
             if not os.path.exists(local_dir):
                 os.makedirs(local_dir)
@@ -74,32 +94,29 @@ class WTKLedClientHourly(client_base):
             raise RuntimeError(f"Failed to determine nearest locations: {e}")
 
         # Step 2: Construct and download files
-        downloaded_files = []
-        for index in indexes:
-            for year in years:
-                s3_key = f"ts-parquet/year={year}/varset={varset}/index={index}/{index}_{year}_{varset}.parquet"
-                local_csv_path = os.path.join(local_dir, f"{index}_{year}_{varset}.csv")
-            try:
-                print(f"Downloading {s3_key} from S3...")
-                
-                # Stream Parquet file from S3
-                response = self.s3.get_object(Bucket=self.bucket_name, Key=s3_key)
-                parquet_data = response['Body'].read()
-                
-                # Convert Parquet to DataFrame
-                parquet_buffer = BytesIO(parquet_data)
-                try:
-                    df = pd.read_parquet(parquet_buffer)
-                    
-                    # Save as CSV
-                    df.to_csv(local_csv_path, index=False)
-                    downloaded_files.append(local_csv_path)
-                    print(f"Converted and saved CSV file: {local_csv_path}")
-                finally:
-                    # Clear the buffer
-                    parquet_buffer.close()
-            except Exception as e:
-                print(f"Failed to process {s3_key}: {str(e)}")
+        extension = PARQUET_OUTPUT_FORMATS[output_format]
+        file_names = {
+            f"{index}_{year}_{varset}.{extension}": (index, year)
+            for index in indexes
+            for year in years
+        }
+        tasks = [
+            (f"ts-parquet/year={year}/varset={varset}/index={index}/{index}_{year}_{varset}.parquet", file_name)
+            for file_name, (index, year) in file_names.items()
+        ]
+        downloaded_files = download_objects(
+            self.s3, self.bucket_name, tasks, local_dir,
+            max_workers=max_workers,
+            max_retries=max_retries,
+            transform=transform
+        )
+
+        # Step 3: Optionally merge the index-years into one partitioned dataset
+        if consolidate_dir is not None:
+            consolidate_dataset(
+                [(path, *file_names[os.path.basename(path)]) for path in downloaded_files],
+                consolidate_dir
+            )
 
         return downloaded_files
     
@@ -121,7 +138,11 @@ class WTKLedClientHourly(client_base):
         group_by_day: bool = False,
         order_by: str = None,
         order_direction: str = 'ASC',
-        varset: str = 'all'
+        varset: str = 'all',
+        chunksize: int = None,
+        region=None,
+        interpolation: str = None,
+        idw_power: float = 2.0
         ) -> pd.DataFrame:
         """
         Calculate a specified statistic (e.g., AVG, SUM) for selected columns or columns with specific height.
@@ -163,6 +184,14 @@ class WTKLedClientHourly(client_base):
         :type order_direction: str, optional
         :param varset: Variable set to filter the data. Default is 'all'.(Takes only default value for now)
         :type varset: str
+        :param chunksize: If given, the result is streamed and a generator of DataFrames with at most `chunksize` rows is returned instead of one DataFrame. Default is None.
+        :type chunksize: int or None
+        :param region: Bounding box (min_long, min_lat, max_long, max_lat), list of (long, lat) polygon vertices, GeoJSON polygon or shapely geometry. Only the grid locations inside it are queried, in chunked `index IN (...)` queries. Cannot be combined with `lat` and `long`. Default is None.
+        :type region: tuple, list, dict or None
+        :param interpolation: 'idw' or 'bilinear' to interpolate the statistic at (`lat`, `long`) from the surrounding grid locations instead of using the nearest one. `n_nearest` then sets the number of neighbours (default 4 for IDW, 8 for bilinear). Only AVG and SUM can be interpolated. Default is None.
+        :type interpolation: str or None
+        :param idw_power: Power of the inverse distance weights. Default is 2.
+        :type idw_power: float
         :return: A pandas DataFrame containing the statistical results based on the specified filters and groupings.
         :rtype: pandas.DataFrame
         """
@@ -210,7 +239,15 @@ class WTKLedClientHourly(client_base):
                 raise ValueError("Specify either 'columns' or 'heights', not both.")
 
 
-        self._reset_index_(lat,long)
+        self._validate_region(region, lat, long)
+
+        if interpolation is not None:
+            if lat is None or long is None:
+                raise ValueError("Parameters 'lat' and 'long' must be provided for interpolation.")
+            if statistic.upper() not in ('AVG', 'SUM'):
+                raise ValueError("Only the 'AVG' and 'SUM' statistics can be interpolated.")
+
+        self._reset_index_(lat,long,region)
         
         # Ensure all requested columns exist
         if columns is not None:
@@ -231,81 +268,65 @@ class WTKLedClientHourly(client_base):
             columns = self.find_relevant_columns(heights)
 
         # Construct the SELECT clause for statistical computation
-        select_clause = [f"{statistic}({col}) AS {col}_{statistic.lower()}" for col in columns]
+        plan = QueryPlan(self.athena_table_name)
+        for col in columns:
+            plan.add_aggregate(statistic, col, f"{col}_{statistic.lower()}")
         
         # Add grouping columns conditionally
-        group_by_columns = []
-        
-        if n_nearest > 1 and group_by_index:
-            select_clause.append("index")
-            group_by_columns.append("index")
+        if ((n_nearest > 1 or region is not None) and group_by_index) or interpolation is not None:
+            plan.group("index")
         
         if group_by_year:
-            select_clause.append("year")
-            group_by_columns.append("year")
+            plan.group("year")
         
         if group_by_month:
-            select_clause.append("SUBSTRING(CAST(time_index AS VARCHAR), 5, 2) AS month")
-            group_by_columns.append("SUBSTRING(CAST(time_index AS VARCHAR), 5, 2)")
+            plan.group(time_part_expression('month'), "month")
         
         if group_by_day:
-            select_clause.append("SUBSTRING(CAST(time_index AS VARCHAR), 7, 2) AS day")
-            group_by_columns.append("SUBSTRING(CAST(time_index AS VARCHAR), 7, 2)")
+            plan.group(time_part_expression('day'), "day")
         
         if group_by_hour:
-            select_clause.append("SUBSTRING(CAST(time_index AS VARCHAR), 9, 2) AS hour")
-            group_by_columns.append("SUBSTRING(CAST(time_index AS VARCHAR), 9, 2)")
+            plan.group(time_part_expression('hour'), "hour")
         
         # Ensure the order_by column is in the SELECT clause
-        if order_by and order_by.lower() not in [col.split(" AS ")[-1] for col in select_clause]:
-            raise ValueError(f"The order_by column '{order_by}' must be included in the SELECT statement. Here are the selected columns for this query: {', '.join(select_clause)}")
-        
-        query = f"SELECT {', '.join(select_clause)} FROM {self.athena_table_name} WHERE 1=1"
+        if order_by:
+            plan.order(order_by, order_direction)
         
         # Add filters for location
-        if lat is not None and long is not None:
+        if interpolation is not None:
+            codes, weights = self._interpolation_neighbours(
+                [lat], [long], interpolation, n_nearest if n_nearest > 1 else None, idw_power
+            )
+            plan.where_in("index", codes[0])
+        elif lat is not None and long is not None:
             try:
-                if n_nearest == 1:
-                    index = self.find_nearest_location(lat, long)
-                    query += f" AND index IN ('{index}')"
-                else:
-                    indexes = self.find_n_nearest_locations(lat, long, n_nearest)
-                    if indexes:
-                        index_list = ', '.join([f"'{idx}'" for idx in indexes])
-                        query += f" AND index IN ({index_list})"
+                self._apply_location_filter(plan, lat, long, n_nearest)
             except Exception as e:
                 raise RuntimeError("Failed to process location-based filtering for given lat and long.") from e
 
         # Add filters for years
         if years:
-            years_list = ', '.join([f"'{year}'" for year in years])
-            query += f" AND year IN ({years_list})"
+            plan.where_in("year", years)
 
-        if months:
-            month_list = ', '.join([f"'{month:02}'" for month in months])
-            query += f" AND SUBSTRING(CAST(time_index AS VARCHAR), 5, 2) IN ({month_list})"
-
-        if days:
-            day_list = ', '.join([f"'{day:02}'" for day in days])
-            query += f" AND SUBSTRING(CAST(time_index AS VARCHAR), 7, 2) IN ({day_list})"
-
-        if hours:
-            hour_list = ', '.join([f"'{hour:02}'" for hour in hours])
-            query += f" AND SUBSTRING(CAST(time_index AS VARCHAR), 9, 2) IN ({hour_list})"
+        # Month, day and hour filters as range predicates on time_index, which Athena can push down. Without a year
+        # filter the ranges are expanded over the years of the table; no year partition filter is added.
+        for predicate in time_filter_predicates(self._table_years(years), months, days, hours):
+            plan.where(predicate)
         
         if varset:
-            query += f" AND varset = '{varset}'"
-        
-        if group_by_columns:
-            query += f" GROUP BY {', '.join(group_by_columns)}"
-        
-        result_df = self.query_athena(query)
+            plan.where_in("varset", varset)
         
-        # Add ORDER BY clause if specified
-        if order_by:
-            if order_direction.upper() not in ['ASC', 'DESC']:
-                raise ValueError("Invalid order_direction. Use 'ASC' or 'DESC'.")
-            query += f" ORDER BY {order_by} {order_direction.upper()}"
+        if region is not None:
+            self._apply_region_filter(plan, region)
+            return self.query_athena_split(plan, chunksize=chunksize)
+
+        if interpolation is not None:
+            result_df = self._blend_statistic(plan, self.query_athena(plan), codes, weights)
+            return self._frame_chunks(result_df, chunksize) if chunksize else result_df
+
+        if chunksize:
+            return self.query_athena_iter(plan, chunksize=chunksize)
+        result_df = self.query_athena(plan)
         
         return result_df
     
@@ -373,53 +394,34 @@ class WTKLedClientHourly(client_base):
         
         # Construct the SELECT clause
         avg_column_name = f"{windspeed_column}_avg"  # Reflect height in the column name
-        select_clause = [f"AVG({windspeed_column}) AS {avg_column_name}"]
+        plan = QueryPlan(self.athena_table_name).add_aggregate("AVG", windspeed_column, avg_column_name)
         
         # Add grouping columns conditionally
-        group_by_columns = []
-        
         if group_by_year:
-            select_clause.append("year")
-            group_by_columns.append("year")
+            plan.group("year")
         
         if group_by_month:
-            select_clause.append("SUBSTRING(CAST(time_index AS VARCHAR), 5, 2) AS month")
-            group_by_columns.append("SUBSTRING(CAST(time_index AS VARCHAR), 5, 2)")
+            plan.group(time_part_expression('month'), "month")
         
         if group_by_day:
-            select_clause.append("SUBSTRING(CAST(time_index AS VARCHAR), 7, 2) AS day")
-            group_by_columns.append("SUBSTRING(CAST(time_index AS VARCHAR), 7, 2)")
+            plan.group(time_part_expression('day'), "day")
         
         if group_by_hour:
-            select_clause.append("SUBSTRING(CAST(time_index AS VARCHAR), 9, 2) AS hour")
-            group_by_columns.append("SUBSTRING(CAST(time_index AS VARCHAR), 9, 2)")
-        
+            plan.group(time_part_expression('hour'), "hour")
         
         # Ensure the order_by column is in the SELECT clause
-        if order_by and order_by.lower() not in [col.split(" AS ")[-1] for col in select_clause]:
-            raise ValueError(f"The order_by column '{order_by}' must be included in the SELECT statement. Here are the selected columns for this query: {', '.join(select_clause)}")
-        
-        query = f"SELECT {', '.join(select_clause)} FROM {self.athena_table_name} WHERE 1=1"
+        if order_by:
+            plan.order(order_by, order_direction)
         
         # Add filters for location
         if lat is not None and long is not None:
-            index = self.find_nearest_location(lat, long)
-            query += f" AND index IN ('{index}')"
+            self._apply_location_filter(plan, lat, long)
         
         if varset:
-            query += f" AND varset = '{varset}'"
-        
-        if group_by_columns:
-            query += f" GROUP BY {', '.join(group_by_columns)}"
-        
-        # Add ORDER BY clause if specified
-        if order_by:
-            if order_direction.upper() not in ['ASC', 'DESC']:
-                raise ValueError("Invalid order_direction. Use 'ASC' or 'DESC'.")
-            query += f" ORDER BY {order_by} {order_direction.upper()}"
+            plan.where_in("varset", varset)
         
         # Execute the query and return the result as a DataFrame
-        result_df = self.query_athena(query)
+        result_df = self.query_athena(plan)
         return result_df
     
     def fetch_timeseries(self,
@@ -428,7 +430,9 @@ class WTKLedClientHourly(client_base):
         heights: list[float] = None, 
         years: list[int] = None, 
         n_nearest = 1,
-        varset: str = "all") -> pd.DataFrame:
+        varset: str = "all",
+        interpolation: str = None,
+        idw_power: float = 2.0) -> pd.DataFrame:
         """
         Fetch windspeed and wind direction time series for a given latitude, longitude, and height(s).
         Optionally, filter the data by specific year(s) and fetch data for the nearest location(s).
@@ -445,6 +449,10 @@ class WTKLedClientHourly(client_base):
         :type n_nearest: int
         :param varset: Variable set to filter the data. Default is 'all'.(Takes only default value for now)
         :type varset: str
+        :param interpolation: 'idw' or 'bilinear' to interpolate the series at (`lat`, `long`) from the surrounding grid locations instead of returning the series of the nearest one(s). `n_nearest` then sets the number of neighbours (default 4 for IDW, 8 for bilinear). Default is None.
+        :type interpolation: str or None
+        :param idw_power: Power of the inverse distance weights. Default is 2.
+        :type idw_power: float
         :return: A pandas DataFrame containing windspeed and wind direction time series data.
         :rtype: pandas.DataFrame
         """
@@ -472,6 +480,16 @@ class WTKLedClientHourly(client_base):
             if not all(isinstance(year, int) for year in years):
                 raise ValueError("All elements in 'years' must be integers.")
         
+        if interpolation is not None:
+            result_df = self.fetch_timeseries_interpolated(
+                [lat], [long], heights, years,
+                method=interpolation,
+                n_nearest=n_nearest if n_nearest > 1 else None,
+                idw_power=idw_power,
+                varset=varset
+            )
+            return result_df.drop(columns='site')
+
         self._reset_index_(lat,long)
         
         # Find the nearest relevant columns for the specified height
@@ -486,44 +504,236 @@ class WTKLedClientHourly(client_base):
         
 
         # Construct the query
-        columns_str = ', '.join(columns)
-        query = f"SELECT {columns_str} FROM {self.default_athena_table_name} WHERE 1=1"
+        plan = QueryPlan(self.default_athena_table_name, columns)
 
         # Add years filter if provided
         if years:
-            years_list = ', '.join([f"'{year}'" for year in years])
-            query += f" AND year IN ({years_list})"
+            plan.where_in("year", years)
 
         # Add location filter
         try:
-            if n_nearest == 1:
-                index = self.find_nearest_location(lat, long)
-                query += f" AND index IN ('{index}')"
-            else:
-                indexes = self.find_n_nearest_locations(lat, long, n_nearest)
-                if indexes:
-                    index_list = ', '.join([f"'{idx}'" for idx in indexes])
-                    query += f" AND index IN ({index_list})"
+            self._apply_location_filter(plan, lat, long, n_nearest)
         except Exception as e:
             raise RuntimeError("Failed to process location-based filtering for given lat and long.") from e
         
         if varset:
-                query += f" AND varset = '{varset}'"
+            plan.where_in("varset", varset)
         # Execute the query
         try:
-            result_df = self.query_athena(query)
+            result_df = self.query_athena(plan)
         except Exception as e:
             raise RuntimeError("Failed to execute query and fetch results.") from e
 
         return result_df
 
+    def fetch_timeseries_interpolated(self,
+        lats: list[float],
+        longs: list[float],
+        heights: list[float],
+        years: list[int] = None,
+        method: str = 'idw',
+        n_nearest: int = None,
+        idw_power: float = 2.0,
+        varset: str = "all") -> pd.DataFrame:
+        """
+        Fetch windspeed and wind direction time series interpolated at many sites from their surrounding grid locations.
+        The series of all neighbours are fetched once, in chunked `index IN (...)` queries, and blended for all sites and timestamps at once.
+        Wind directions are blended as unit vectors.
+
+        :param lats: Latitudes of the sites.
+        :type lats: list[float] or numpy.ndarray
+        :param longs: Longitudes of the sites.
+        :type longs: list[float] or numpy.ndarray
+        :param heights: List of heights (e.g., [10.0, 50.0]) for which wind data should be retrieved.
+        :type heights: list[float]
+        :param years: List of years to filter the data. Optional.
+        :type years: list[int] or None
+        :param method: 'idw' (inverse distance weighting) or 'bilinear'. Sites without a neighbour in every quadrant fall back to IDW. Default is 'idw'.
+        :type method: str
+        :param n_nearest: Number of neighbours per site, between 1 and 16. Default is 4 for IDW and 8 for bilinear.
+        :type n_nearest: int or None
+        :param idw_power: Power of the inverse distance weights. Default is 2.
+        :type idw_power: float
+        :param varset: Variable set to filter the data. Default is 'all'.(Takes only default value for now)
+        :type varset: str
+        :return: A pandas DataFrame with a 'site' column (position of the site in `lats`), 'year', 'time_index' and the interpolated columns.
+        :rtype: pandas.DataFrame
+        """
+        if not heights or not isinstance(heights, list):
+            raise TypeError("Parameter 'heights' must be a non-empty list.")
+
+        self._reset_index_(lats, longs)
+
+        columns = [col for col in self.find_relevant_columns(heights) if col.startswith('windspeed') or col.startswith('winddirection')]
+        if not columns:
+            raise ValueError("Could not find relevant columns for 'windspeed' or 'winddirection' at the specified height.")
+
+        return self._fetch_interpolated_timeseries(
+            lats, longs, columns, ['year', 'time_index'], years,
+            method=method, n_nearest=n_nearest, idw_power=idw_power, varset=varset
+        )
+
+    def compute_aep(self,
+        lat: float = None,
+        long: float = None,
+        height: float = None,
+        turbines = 'NREL 5MW',
+        years: list[int] = None,
+        method: str = 'linear',
+        varset: str = "all",
+        air_density_correction: bool = False) -> dict:
+        """
+        Estimate the gross annual energy production (AEP), capacity factor and monthly and hourly energy of turbines
+        from the hourly windspeed at the nearest location and the given hub height.
+
+        Only the windspeed columns bracketing the hub height are fetched and interpolated with the given vertical profile.
+        Every hour is evaluated on the power curves, so this is the more accurate counterpart of the 12x24 estimate of
+        `WindwattsWTKClient.fetch_aep_at_height`. With `air_density_correction` the hourly windspeed is normalized to the
+        standard air density the power curves refer to, using the hourly air density at hub height.
+
+        :param lat: Latitude of the location. This parameter is required.
+        :type lat: float
+        :param long: Longitude of the location. This parameter is required.
+        :type long: float
+        :param height: Hub height in meters. This parameter is required.
+        :type height: float
+        :param turbines: Reference turbine name ('NREL 5MW', 'IEA 3.4MW', 'IEA 15MW'), a PowerCurve, or a list of them. Default is 'NREL 5MW'.
+        :type turbines: str, PowerCurve or list
+        :param years: List of years to filter the data. Optional.
+        :type years: list[int] or None
+        :param method: Vertical profile used for interpolation, one of 'linear', 'log' or 'power'. Default is 'linear'.
+        :type method: str
+        :param varset: Variable set to filter the data. Default is 'all'.(Takes only default value for now)
+        :type varset: str
+        :param air_density_correction: Correct the windspeed for the air density at hub height. Default is False.
+        :type air_density_correction: bool
+        :return: Dictionary with 'aep' (turbine, aep_mwh, capacity_factor), 'monthly_energy' and 'hourly_energy'
+            (turbine, month or hour, energy_mwh, capacity_factor) lists; energies in MWh rounded to 2 decimals.
+        :rtype: dict
+        """
+        if lat is None or long is None:
+            raise TypeError("Parameters 'lat' and 'long' must be provided.")
+        if not isinstance(height, (int, float)):
+            raise TypeError("Parameter 'height' must be a numeric value (int or float).")
+        if years is not None and (not isinstance(years, list) or not all(isinstance(year, int) for year in years)):
+            raise TypeError("Parameter 'years' must be a list of integers.")
+        curves = [PowerCurve.parse(turbine) for turbine in (turbines if isinstance(turbines, list) else [turbines])]
+
+        self._reset_index_(lat, long)
+
+        columns = self._columns_for_heights([height])
+        if not columns:
+            raise ValueError("Could not find windspeed columns around the specified height.")
+        if air_density_correction:
+            columns += self._air_density_columns([height])
+
+        plan = QueryPlan(self.default_athena_table_name, columns + ['year', 'time_index'])
+        if years:
+            plan.where_in("year", years)
+        try:
+            self._apply_location_filter(plan, lat, long, 1)
+        except Exception as e:
+            raise RuntimeError("Failed to process location-based filtering for given lat and long.") from e
+        if varset:
+            plan.where_in("varset", varset)
+
+        try:
+            result_df = self.query_athena(plan)
+        except Exception as e:
+            raise RuntimeError("Failed to execute query and fetch results.") from e
+        if result_df.empty:
+            raise RuntimeError("No data available for the given location.")
+
+        try:
+            windspeeds, densities = self._hub_height_conditions(result_df, [height], method, air_density_correction)
+            windspeed = windspeeds[:, 0] if densities is None else density_adjusted_windspeed(windspeeds[:, 0], densities[:, 0])
+            # time_index is YYYYMMDDHH
+            time_index = result_df['time_index'].astype(np.int64).to_numpy()
+            years = time_index // 1000000
+            result = energy_yield(windspeed, years, time_index // 10000 % 100, time_index % 100, hours_per_row(years), curves)
+        except Exception as e:
+            raise RuntimeError(f"Failed to calculate energy production at {height}m.") from e
+        return energy_summary(result, curves)
+
+    def fetch_air_density_timeseries(self,
+        lat: float = None,
+        long: float = None,
+        heights: list[float] = None,
+        years: list[int] = None,
+        method: str = 'linear',
+        varset: str = "all") -> pd.DataFrame:
+        """
+        Fetch hourly air density, windspeed, density-adjusted windspeed and wind power density at the nearest location and the given height(s).
+
+        Only the windspeed, temperature and pressure columns around the requested heights are fetched. The windspeed
+        is interpolated with the given vertical profile, the temperature linearly and the pressure log-linearly in
+        height, all from one array of the fetched columns; the air density follows from the ideal gas law.
+
+        :param lat: Latitude of the location. This parameter is required.
+        :type lat: float
+        :param long: Longitude of the location. This parameter is required.
+        :type long: float
+        :param heights: List of heights (e.g., [80, 100]). This parameter is required.
+        :type heights: list[float]
+        :param years: List of years to filter the data. Optional.
+        :type years: list[int] or None
+        :param method: Vertical profile used for windspeed interpolation, one of 'linear', 'log' or 'power'. Default is 'linear'.
+        :type method: str
+        :param varset: Variable set to filter the data. Default is 'all'.(Takes only default value for now)
+        :type varset: str
+        :return: A pandas DataFrame with 'year', 'time_index' and, per height, 'air_density_{h}m' (kg/m^3),
+            'windspeed_{h}m' and 'density_adjusted_windspeed_{h}m' (m/s) and 'power_density_{h}m' (W/m^2).
+        :rtype: pandas.DataFrame
+        """
+        if lat is None or long is None:
+            raise TypeError("Parameters 'lat' and 'long' must be provided.")
+        if not heights or not isinstance(heights, list):
+            raise TypeError("Parameter 'heights' must be a non-empty list.")
+        if not all(isinstance(height, (int, float)) for height in heights):
+            raise ValueError("All elements in 'heights' must be numeric values (int or float).")
+        if years is not None and (not isinstance(years, list) or not all(isinstance(year, int) for year in years)):
+            raise TypeError("Parameter 'years' must be a list of integers.")
+
+        self._reset_index_(lat, long)
+
+        plan = QueryPlan(self.default_athena_table_name, self._columns_for_heights(heights) + self._air_density_columns(heights) + ['year', 'time_index'])
+        if years:
+            plan.where_in("year", years)
+        try:
+            self._apply_location_filter(plan, lat, long, 1)
+        except Exception as e:
+            raise RuntimeError("Failed to process location-based filtering for given lat and long.") from e
+        if varset:
+            plan.where_in("varset", varset)
+
+        try:
+            result_df = self.query_athena(plan)
+        except Exception as e:
+            raise RuntimeError("Failed to execute query and fetch results.") from e
+
+        try:
+            windspeeds, densities = self._hub_height_conditions(result_df, heights, method, with_air_density=True)
+        except Exception as e:
+            raise RuntimeError("Failed to calculate the air density at the specified heights.") from e
+
+        output = {'year': result_df['year'].to_numpy(), 'time_index': result_df['time_index'].to_numpy()}
+        for i, height in enumerate(heights):
+            label = f"{height:g}m"
+            output[f"air_density_{label}"] = densities[:, i]
+            output[f"windspeed_{label}"] = windspeeds[:, i]
+            output[f"density_adjusted_windspeed_{label}"] = density_adjusted_windspeed(windspeeds[:, i], densities[:, i])
+            output[f"power_density_{label}"] = power_density(windspeeds[:, i], densities[:, i])
+        return pd.DataFrame(output).sort_values('time_index', ignore_index=True)
+
     def fetch_windspeed_map(self, 
         height: float = None, 
         year: int = None,
         month: int = None,
         day: int = None,
         hour: int = None,
-        varset: str = "all") -> pd.DataFrame:
+        varset: str = "all",
+        unload: bool = False,
+        region=None) -> pd.DataFrame:
         """
         Fetch windspeed map for a given height and filter by speific year, month, day and hour.
 
@@ -539,6 +749,10 @@ class WTKLedClientHourly(client_base):
         :type hour: int
         :param varset: Variable set to filter the data. Default is 'all'.(Takes only default value for now)
         :type varset: str
+        :param unload: If True, results are retrieved through an UNLOAD to Parquet instead of parsing the CSV result. Faster and lighter on memory for large results. Default is False.
+        :type unload: bool
+        :param region: Bounding box (min_long, min_lat, max_long, max_lat), list of (long, lat) polygon vertices, GeoJSON polygon or shapely geometry. Only the grid locations inside it are queried, in chunked `index IN (...)` queries. Default is None.
+        :type region: tuple, list, dict or None
         :return: A pandas DataFrame containing windspeed map data.
         :rtype: pandas.DataFrame
         
@@ -565,7 +779,7 @@ class WTKLedClientHourly(client_base):
 
         # Validate `hour`
         if hour is not None:
-            if not isinstance(hour, int) or not 1<=hour<=24:
+            if not isinstance(hour, int) or not 0<=hour<=23:
                 raise ValueError("Parameter 'hour' must be a integer with range (0-23).")
         
         # Validate `day`
@@ -573,7 +787,7 @@ class WTKLedClientHourly(client_base):
             if not isinstance(day, int) or not 1<=day<=31:
                 raise ValueError("Parameter 'day' must be a integer with range (1-31).")
         
-        self._reset_index_(None,None)
+        self._reset_index_(None,None,region)
         
         # Find the nearest relevant columns for the specified height
         try:
@@ -586,30 +800,28 @@ class WTKLedClientHourly(client_base):
         
 
         # Construct the query
-        columns_str = ', '.join(columns)
-        
-        query = f"SELECT {columns_str}"
-        query += f", regexp_extract(\"$path\", '.*/index=([^/]+)/.*', 1) AS index"
-        query += f" FROM {self.athena_table_name} WHERE 1=1"
-
-        if year:
-            query += f" AND year = '{year}'"
-
-        if month:
-            query += f" AND SUBSTRING(CAST(time_index AS VARCHAR), 5, 2) = '{month:02}'"
+        plan = QueryPlan(self.athena_table_name, columns)
+        if region is None:
+            plan.add_select(INDEX_FROM_PATH, "index")
+        else:
+            plan.add_select("index")
 
-        if day:
-            query += f" AND SUBSTRING(CAST(time_index AS VARCHAR), 7, 2) = '{day:02}'"
+        plan.where_in("year", year)
 
-        if hour:
-            query += f" AND SUBSTRING(CAST(time_index AS VARCHAR), 9, 2) = '{hour:02}'"
+        # A single hour of the year is a single range predicate on time_index
+        for predicate in time_filter_predicates([year], [month], [day], [hour]):
+            plan.where(predicate)
         
         if varset:
-            query += f" AND varset = '{varset}'"
+            plan.where_in("varset", varset)
+
+        if region is not None:
+            self._apply_region_filter(plan, region)
+            return self.query_athena_split(plan, unload=unload)
 
         # Execute the query
         try:
-            result_df = self.query_athena(query, return_result_location=True)
+            result_df = self.query_athena(plan, return_result_location=True, unload=unload)
         except Exception as e:
             raise RuntimeError("Failed to execute query and fetch results.") from e
 
@@ -621,7 +833,9 @@ class WTKLedClientHourly(client_base):
         month: int = None,
         day: int = None,
         hour: int = None,
-        varset: str = "all") -> pd.DataFrame:
+        varset: str = "all",
+        unload: bool = False,
+        region=None) -> pd.DataFrame:
         """
         Fetch winddirection map for a given height and filter by speific year, month, day and hour.
 
@@ -637,6 +851,10 @@ class WTKLedClientHourly(client_base):
         :type hour: int
         :param varset: Variable set to filter the data. Default is 'all'.(Takes only default value for now)
         :type varset: str
+        :param unload: If True, results are retrieved through an UNLOAD to Parquet instead of parsing the CSV result. Faster and lighter on memory for large results. Default is False.
+        :type unload: bool
+        :param region: Bounding box (min_long, min_lat, max_long, max_lat), list of (long, lat) polygon vertices, GeoJSON polygon or shapely geometry. Only the grid locations inside it are queried, in chunked `index IN (...)` queries. Default is None.
+        :type region: tuple, list, dict or None
         :return: A pandas DataFrame containing windspeed map data.
         :rtype: pandas.DataFrame
         
@@ -663,7 +881,7 @@ class WTKLedClientHourly(client_base):
 
         # Validate `hour`
         if hour is not None:
-            if not isinstance(hour, int) or not 1<=hour<=24:
+            if not isinstance(hour, int) or not 0<=hour<=23:
                 raise ValueError("Parameter 'hour' must be a integer with range (0-23).")
         
         # Validate `day`
@@ -671,7 +889,7 @@ class WTKLedClientHourly(client_base):
             if not isinstance(day, int) or not 1<=day<=31:
                 raise ValueError("Parameter 'day' must be a integer with range (1-31).")
         
-        self._reset_index_(None,None)
+        self._reset_index_(None,None,region)
         
         # Find the nearest relevant columns for the specified height
         try:
@@ -684,30 +902,28 @@ class WTKLedClientHourly(client_base):
         
 
         # Construct the query
-        columns_str = ', '.join(columns)
-        
-        query = f"SELECT {columns_str}"
-        query += f", regexp_extract(\"$path\", '.*/index=([^/]+)/.*', 1) AS index"
-        query += f" FROM {self.athena_table_name} WHERE 1=1"
-
-        if year:
-            query += f" AND year = '{year}'"
-
-        if month:
-            query += f" AND SUBSTRING(CAST(time_index AS VARCHAR), 5, 2) = '{month:02}'"
+        plan = QueryPlan(self.athena_table_name, columns)
+        if region is None:
+            plan.add_select(INDEX_FROM_PATH, "index")
+        else:
+            plan.add_select("index")
 
-        if day:
-            query += f" AND SUBSTRING(CAST(time_index AS VARCHAR), 7, 2) = '{day:02}'"
+        plan.where_in("year", year)
 
-        if hour:
-            query += f" AND SUBSTRING(CAST(time_index AS VARCHAR), 9, 2) = '{hour:02}'"
+        # A single hour of the year is a single range predicate on time_index
+        for predicate in time_filter_predicates([year], [month], [day], [hour]):
+            plan.where(predicate)
         
         if varset:
-            query += f" AND varset = '{varset}'"
+            plan.where_in("varset", varset)
+
+        if region is not None:
+            self._apply_region_filter(plan, region)
+            return self.query_athena_split(plan, unload=unload)
 
         # Execute the query
         try:
-            result_df = self.query_athena(query, return_result_location=True)
+            result_df = self.query_athena(plan, return_result_location=True, unload=unload)
         except Exception as e:
             raise RuntimeError("Failed to execute query and fetch results.") from e
 
@@ -723,7 +939,10 @@ class WTKLedClientHourly(client_base):
         long: float = None,
         heights: list[float] = None,
         n_nearest: int = 1,
-        varset: str = "all") -> pd.DataFrame:
+        varset: str = "all",
+        unload: bool = False,
+        chunksize: int = None,
+        region=None) -> pd.DataFrame:
         """
         Generalized function to fetch filtered data(timeseries and map), given filters based on location(s), time and height(s).
 
@@ -747,6 +966,12 @@ class WTKLedClientHourly(client_base):
         :type n_nearest: int
         :param varset: Variable set to filter data. Default is "all".
         :type varset: str
+        :param unload: If True, results are retrieved through an UNLOAD to Parquet instead of parsing the CSV result. Faster and lighter on memory for large results. Default is False.
+        :type unload: bool
+        :param chunksize: If given, the result is streamed and a generator of DataFrames with at most `chunksize` rows is returned instead of one DataFrame. Default is None.
+        :type chunksize: int or None
+        :param region: Bounding box (min_long, min_lat, max_long, max_lat), list of (long, lat) polygon vertices, GeoJSON polygon or shapely geometry. Only the grid locations inside it are queried, in chunked `index IN (...)` queries. Cannot be combined with `lat` and `long`. Default is None.
+        :type region: tuple, list, dict or None
         :return: A pandas DataFrame containing the filtered data(map or timeseries) based on the specified parameters.
         :rtype: pandas.DataFrame
         """
@@ -795,7 +1020,9 @@ class WTKLedClientHourly(client_base):
                 raise ValueError("Please specify either 'columns' or 'heights', not both.")
 
         
-        self._reset_index_(lat,long)
+        self._validate_region(region, lat, long)
+
+        self._reset_index_(lat,long,region)
         
         # Ensure all requested columns exist
         if columns is not None:
@@ -817,49 +1044,36 @@ class WTKLedClientHourly(client_base):
                 raise RuntimeError("Failed to find relevant columns for specified heights.") from e
 
         # Construct the SELECT clause
-        columns_str = ', '.join(columns)
-        
-        query = f"SELECT {columns_str}"
-        if lat is None and long is None:
-            query += f", regexp_extract(\"$path\", '.*/index=([^/]+)/.*', 1) AS index"
+        plan = QueryPlan(self.athena_table_name, columns)
+        if lat is None and long is None and region is None:
+            plan.add_select(INDEX_FROM_PATH, "index")
         else:
-            query += f", index"
-        query += f" FROM {self.athena_table_name} WHERE 1=1"
+            plan.add_select("index")
 
         if years:
-            years_list = ', '.join([f"'{year}'" for year in years])
-            query += f" AND year IN ({years_list})"
-
-        if months:
-            month_list = ', '.join([f"'{month:02}'" for month in months])
-            query += f" AND SUBSTRING(CAST(time_index AS VARCHAR), 5, 2) IN ({month_list})"
-
-        if days:
-            day_list = ', '.join([f"'{day:02}'" for day in days])
-            query += f" AND SUBSTRING(CAST(time_index AS VARCHAR), 7, 2) IN ({day_list})"
+            plan.where_in("year", years)
 
-        if hours:
-            hour_list = ', '.join([f"'{hour:02}'" for hour in hours])
-            query += f" AND SUBSTRING(CAST(time_index AS VARCHAR), 9, 2) IN ({hour_list})"
+        # Month, day and hour filters as range predicates on time_index, which Athena can push down. Without a year
+        # filter the ranges are expanded over the years of the table; no year partition filter is added.
+        for predicate in time_filter_predicates(self._table_years(years), months, days, hours):
+            plan.where(predicate)
         
         if varset:
-            query += f" AND varset = '{varset}'"
+            plan.where_in("varset", varset)
         
+        if region is not None:
+            self._apply_region_filter(plan, region)
+            return self.query_athena_split(plan, unload=unload, chunksize=chunksize)
+
         if lat is not None and long is not None:
-            if n_nearest == 1:
-                index = self.find_nearest_location(lat, long)
-                if not index:
-                    raise ValueError("No valid nearest location found.")
-                query += f" AND index = '{index}'"
-            else:
-                indexes = self.find_n_nearest_locations(lat, long, n_nearest)
-                if not indexes:
-                    raise ValueError("No valid nearest locations found.")
-                index_list = ', '.join([f"'{idx}'" for idx in indexes])
-                query += f" AND index IN ({index_list})"
+            self._apply_location_filter(plan, lat, long, n_nearest)
             
-            result_df = self.query_athena(query)
+            if chunksize:
+                return self.query_athena_iter(plan, chunksize=chunksize, unload=unload)
+            result_df = self.query_athena(plan, unload=unload)
         else:
-            result_df = self.query_athena(query,return_result_location=True)
+            if chunksize:
+                return self.query_athena_iter(plan, chunksize=chunksize, unload=unload)
+            result_df = self.query_athena(plan, return_result_location=True, unload=unload)
         
         return result_df
\ No newline at end of file